@@ -1,79 +1,208 @@
 import os
+import re
+import copy
+import time
+import atexit
 import uuid
 import logging
 import json
-from datetime import datetime
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 import openai
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, make_response
+from flask import Flask, Response, g, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import requests
+from db.card_record import CardRecord
+from db.card_store import CardStore, decode_cursor, encode_cursor, iter_pages
+from db.repository import create_repository
+from db.review_log import ReviewLog
+from services.batching import estimate_tokens, generate_in_batches, split_json_array
+from services.cache import AnswerCache, LRUCache, answer_cache_key
+from services.health import HealthMonitor
+from services.http_clients import get_session, provider_timeout, request_with_retries
+from services.ingestion import CONVERTIBLE_FORMATS, IngestCheckpoint, convert_to_text, ingest_document, iter_chunks
+from services.jobs import FINISHED_STATUSES, JobManager, JobQueueFull
+from services.llm import (
+    PRIORITY_BULK, PRIORITY_INTERACTIVE, OpenAILegacyProvider, RateLimited, create_llm_client
+)
+from services.log_config import configure_logging, payload
+from services.metrics import (
+    CONTENT_TYPE, HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS, PROVIDER_LATENCY, REGISTRY, STORAGE_LATENCY,
+    cache_collector
+)
+from services.scheduler import review_quality, score_quality, sm2_schedule
 
 # Load environment variables
 load_dotenv()
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
-# File paths for persistent storage
-DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
-DECKS_FILE = os.path.join(DATA_DIR, 'decks.json')
-FLASHCARDS_FILE = os.path.join(DATA_DIR, 'flashcards.json')
+# Directory for persistent storage
+DATA_DIR = os.getenv("STUDYBUDDY_DATA_DIR", os.path.join(os.path.dirname(__file__), 'data'))
 
 # Create data directory if it doesn't exist
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
-# Load data from files or initialize empty
+# Storage backend: "json" rewrites both data files on every save, "journal"
+# appends each change to a write-ahead log that is periodically compacted into
+# them, "sqlite" stores everything in an embedded SQLite database
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")
+repository = create_repository(STORAGE_BACKEND, DATA_DIR)
+
+# The full-text search index is saved next to the data so unchanged cards are
+# not tokenized again on the next start
+SEARCH_INDEX_PATH = os.path.join(DATA_DIR, 'search_index.json') if STORAGE_BACKEND != "memory" else None
+SEARCH_INDEX_SAVE_INTERVAL = float(os.getenv("SEARCH_INDEX_SAVE_INTERVAL", "60"))
+repository.bind(lambda: {"decks": decks, "flashcards": flashcards})
+
+# Every review and score event is appended to a columnar log for deck analytics
+# (kept on disk next to the data unless the memory backend is used)
+REVIEW_LOG_PATH = os.path.join(DATA_DIR, 'review_log.bin') if STORAGE_BACKEND != "memory" else None
+review_log = ReviewLog(REVIEW_LOG_PATH)
+atexit.register(review_log.close)
+
+# "compact" keeps cards as slotted CardRecord objects (interned deck ids and
+# types, integer timestamps) instead of one dict per card
+COMPACT_CARDS = os.getenv("CARD_RECORDS", "compact") == "compact"
+
+# Load data from storage or initialize empty
 def load_data():
     global decks, flashcards
     try:
-        if os.path.exists(DECKS_FILE):
-            with open(DECKS_FILE, 'r') as f:
-                decks = json.load(f)
-        else:
-            decks = {}
-            
-        if os.path.exists(FLASHCARDS_FILE):
-            with open(FLASHCARDS_FILE, 'r') as f:
-                flashcards = json.load(f)
-        else:
-            flashcards = {}
-            
+        collections = repository.load()
+        decks = collections["decks"]
+        flashcards = CardStore(compact=COMPACT_CARDS)
+        if SEARCH_INDEX_PATH:
+            flashcards.search.restore(SEARCH_INDEX_PATH)
+        flashcards.update(migrate_cards(collections["flashcards"]))
+        flashcards.search.forget_restored()
     except Exception as e:
-        logger.error(f"Error loading data: {str(e)}")
+        logger.error("Error loading data: %s", e)
         decks = {}
-        flashcards = {}
+        flashcards = CardStore(compact=COMPACT_CARDS)
 
-# Save data to files
-def save_data():
+def migrate_answer(stored_answer):
+    """Convert an answer saved as a JSON string by older versions to its structured form"""
+    if not isinstance(stored_answer, str):
+        return stored_answer
+    if stored_answer.strip().startswith("{"):
+        try:
+            return json.loads(stored_answer)
+        except json.JSONDecodeError:
+            pass
+    return {"answer": stored_answer, "explanation": ""}
+
+def migrate_cards(cards: dict) -> dict:
+    """Bring cards loaded from disk to the current in-memory format"""
+    for card in cards.values():
+        card["answer"] = migrate_answer(card.get("answer"))
+    return cards
+
+# Save data to storage. ``changes`` lists the (collection, key) pairs touched by
+# the caller; the journal and sqlite backends only write those, the json backend rewrites everything.
+def save_data(changes=None):
+    try:
+        with STORAGE_LATENCY.time(operation="save"):
+            repository.save({"decks": decks, "flashcards": flashcards}, changes)
+    except Exception as e:
+        logger.error("Error saving data: %s", e)
+
+def read_deck_page(deck_id: str, after=None, limit=None):
+    """Keyset page of a deck, read from storage when the backend serves reads and from memory otherwise"""
+    page = repository.deck_page(deck_id, after, limit)
+    return page if page is not None else flashcards.deck_page(deck_id, after, limit)
+
+def record_review_events(events: list):
+    """Add reviews to the analytics log and the storage backend's review history, if it has one"""
+    try:
+        review_log.append(events)
+    except Exception as e:
+        logger.error("Error logging reviews: %s", e)
     try:
-        with open(DECKS_FILE, 'w') as f:
-            json.dump(decks, f, indent=2)
-        with open(FLASHCARDS_FILE, 'w') as f:
-            json.dump(flashcards, f, indent=2)
+        repository.record_reviews(events)
     except Exception as e:
-        logger.error(f"Error saving data: {str(e)}")
+        logger.error("Error recording reviews: %s", e)
+
+def review_event(card: dict, correct=None, score=None, reviewed_at=None) -> dict:
+    return {
+        "card_id": card["id"],
+        "deck_id": card["deck_id"],
+        "reviewed_at": reviewed_at if reviewed_at is not None else datetime.now().timestamp(),
+        "correct": correct,
+        "score": score
+    }
 
 # Initialize data
-load_data()
+with STORAGE_LATENCY.time(operation="load"):
+    load_data()
+
+def persist_search_index():
+    """Save the search index if it changed since the last save"""
+    if not SEARCH_INDEX_PATH or not flashcards.search.dirty:
+        return
+    try:
+        flashcards.search.save(SEARCH_INDEX_PATH)
+    except OSError as e:
+        logger.warning("Could not save search index: %s", e)
+
+def search_index_saver():
+    while True:
+        time.sleep(SEARCH_INDEX_SAVE_INTERVAL)
+        persist_search_index()
+
+if SEARCH_INDEX_PATH:
+    threading.Thread(target=search_index_saver, name="search-index-saver", daemon=True).start()
+    atexit.register(persist_search_index)
 
 app = Flask(__name__)
 
+# Compact card records are converted to the API shape only when serialized
+_default_json = app.json.default
+
+def json_default(value):
+    if isinstance(value, CardRecord):
+        return value.to_dict()
+    return _default_json(value)
+
+app.json.default = json_default
+
 # Configure CORS
 CORS(app, resources={
     r"/*": {
         "origins": ["http://localhost:3000"],
         "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         "allow_headers": ["Content-Type", "Accept"],
-        "expose_headers": ["Content-Type"],
+        "expose_headers": ["Content-Type", "ETag", "Last-Modified"],
         "supports_credentials": True,
         "max_age": 3600
     }
 })
 
+# Request metrics: latency and status per route template, plus in-flight requests
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    HTTP_LATENCY.observe(time.perf_counter() - g.get("request_started", time.perf_counter()),
+                         route=route, method=request.method)
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error):
+    if "request_started" in g:
+        HTTP_IN_FLIGHT.dec()
+
 # Add CORS headers to all responses
 @app.after_request
 def after_request(response):
@@ -83,22 +212,91 @@ def after_request(response):
     response.headers.add('Access-Control-Allow-Credentials', 'true')
     return response
 
-# Configure OpenAI
+# Configure OpenAI: requests go through a shared keep-alive session with an
+# explicit timeout, and transient failures are retried with jittered backoff
 openai.api_key = os.getenv("OPENAI_API_KEY")
+openai.requestssession = get_session("openai")
+OPENAI_TIMEOUT = provider_timeout("openai", 60)
+
+# Completions go through the provider selected by LLM_PROVIDER, within the
+# LLM_RPM/LLM_TPM quota, with interactive calls admitted ahead of bulk ones
+llm = create_llm_client(lambda: OpenAILegacyProvider(OPENAI_TIMEOUT), "gpt-4")
+
+# Bump when the answer prompts change so stale cached answers are not served
+PROMPT_VERSION = "1"
 
-# Initialize Google Custom Search API
+answer_cache = AnswerCache(
+    os.getenv("ANSWER_CACHE_DIR", os.path.join(DATA_DIR, 'answer_cache')),
+    max_memory_entries=int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+    max_disk_entries=int(os.getenv("ANSWER_CACHE_DISK_SIZE", "10000")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+)
+
+# Google Custom Search is called over its REST endpoint with the shared
+# keep-alive session of the "google_search" provider
+GOOGLE_SEARCH_URL = os.getenv("GOOGLE_SEARCH_URL", "https://www.googleapis.com/customsearch/v1")
+GOOGLE_SEARCH_TIMEOUT = provider_timeout("google_search", 10)
+
+search_cache = LRUCache(
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+)
+
+
+def check_openai():
+    """Validate the OpenAI key by listing models, which spends no tokens"""
+    if not openai.api_key:
+        return False, "OPENAI_API_KEY is not set"
+    openai.Model.list()
+    return True, "API key is valid"
+
+def check_google_search():
+    """Custom Search has no free validation call, so only report whether it is configured"""
+    missing = [name for name in ("GOOGLE_API_KEY", "GOOGLE_CSE_ID") if not os.getenv(name)]
+    if missing:
+        return False, f"{', '.join(missing)} not set"
+    return True, "Configured"
+
+# Provider checks run in the background; /health/providers serves the last results
+provider_health = HealthMonitor(
+    {"openai": check_openai, "google_search": check_google_search},
+    interval=float(os.getenv("HEALTH_CHECK_INTERVAL", "300"))
+)
+provider_health.start()
+
+def search_cache_key(query: str, num_results: int) -> str:
+    """Normalize a query so rephrasings differing only in case, spacing or punctuation share results"""
+    words = re.sub(r"[^\w\s]", " ", query.lower()).split()
+    return f"{num_results}:{' '.join(words)}"
 
 def search_web(query: str, num_results: int = 3) -> dict:
     """Search the web using Google Custom Search API and return formatted results and sources"""
+    key = search_cache_key(query, num_results)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return copy.deepcopy(cached)
+
+    started = time.perf_counter()
+    outcome = "error"
     try:
-        service = build("customsearch", "v1", developerKey=os.getenv("GOOGLE_API_KEY"))
-        result = service.cse().list(
-            q=query,
-            cx=os.getenv("GOOGLE_CSE_ID"),
-            num=num_results
-        ).execute()
+        response = request_with_retries(
+            "google_search",
+            "GET",
+            GOOGLE_SEARCH_URL,
+            timeout=GOOGLE_SEARCH_TIMEOUT,
+            params={
+                "key": os.getenv("GOOGLE_API_KEY"),
+                "cx": os.getenv("GOOGLE_CSE_ID"),
+                "q": query,
+                "num": num_results
+            }
+        )
+        response.raise_for_status()
+        result = response.json()
+        outcome = "ok"
 
         if "items" not in result:
+            search_cache.set(key, {"snippets": "No search results found.", "sources": []})
             return {"snippets": "No search results found.", "sources": []}
 
         # Format the search results with sources
@@ -112,16 +310,21 @@ def search_web(query: str, num_results: int = 3) -> dict:
             formatted_results.append(f"[{i}] {snippet}")
             sources.append({"number": i, "title": title, "url": link})
 
-        return {
+        search_results = {
             "snippets": "\n".join(formatted_results),
             "sources": sources
         }
-    except HttpError as e:
-        logger.error(f"Google Search API error: {str(e)}")
+        search_cache.set(key, copy.deepcopy(search_results))
+        return search_results
+    except requests.HTTPError as e:
+        logger.error("Google Search API error: %s", e)
         return {"snippets": "Error performing web search.", "sources": []}
     except Exception as e:
-        logger.error(f"Unexpected error in web search: {str(e)}")
+        logger.error("Unexpected error in web search: %s", e)
         return {"snippets": "Error performing web search.", "sources": []}
+    finally:
+        PROVIDER_LATENCY.observe(time.perf_counter() - started, provider="google_search",
+                                 operation="search_web", outcome=outcome)
 
 def parse_multiple_choice(answer: str) -> dict:
     """Parse multiple choice answer into structured format"""
@@ -153,99 +356,120 @@ def parse_multiple_choice(answer: str) -> dict:
             "explanation": explanation
         }
         
-        logger.debug(f"Parsed multiple choice answer: {response}")
+        logger.debug("Parsed multiple choice answer: %s", payload(response))
         return response
         
     except Exception as e:
-        logger.error(f"Error parsing multiple choice answer: {str(e)}")
-        logger.error(f"Answer text was: {answer}")
+        logger.error("Error parsing multiple choice answer: %s", e)
+        logger.error("Answer text was: %s", payload(answer))
         return None
 
-def generate_answer(question: str, card_type: str = "basic") -> dict:
-    """Generate an answer using OpenAI API with web search enhancement"""
-    try:
-        logger.info(f"Starting generate_answer for question: {question}, type: {card_type}")
-        
-        # Perform web search for current information
-        search_results = search_web(question)
-        web_results = search_results["snippets"]
-        sources = search_results["sources"]
-        
-        logger.info(f"Web search results: {web_results}")
-        
-        current_date = datetime.now().strftime("%B %Y")
-        
-        current_context = f"""You are answering this question in {current_date}. 
-        Here is current information from web search:
-        {web_results}
-        
-        Use both the web search results and your knowledge to provide the most accurate and up-to-date answer.
-        If the web search provides more current information than your knowledge, prioritize the web results.
-        
-        Important: When using information from the search results, cite your sources using numbers in brackets [1], [2], etc."""
+def build_answer_messages(question: str, card_type: str, web_results: str) -> list:
+    """Build the chat messages asking for a structured answer of the given card type"""
+    current_date = datetime.now().strftime("%B %Y")
+    
+    current_context = f"""You are answering this question in {current_date}. 
+    Here is current information from web search:
+    {web_results}
+    
+    Use both the web search results and your knowledge to provide the most accurate and up-to-date answer.
+    If the web search provides more current information than your knowledge, prioritize the web results.
+    
+    Important: When using information from the search results, cite your sources using numbers in brackets [1], [2], etc."""
+    
+    # Create a system prompt based on card type
+    if card_type == "basic":
+        system_prompt = f"""You are a knowledgeable tutor. {current_context}
+        Provide a clear, concise, and accurate answer to the question, with citations.
+        Format your response as a JSON object with this structure:
+        {{"answer": "Your answer text here", "explanation": "Optional explanation"}}
         
-        # Create a system prompt based on card type
-        if card_type == "basic":
-            system_prompt = f"""You are a knowledgeable tutor. {current_context}
-            Provide a clear, concise, and accurate answer to the question, with citations.
-            Format your response as a JSON object with this structure:
-            {{"answer": "Your answer text here", "explanation": "Optional explanation"}}
-            
-            Example response:
-            {{"answer": "The speed of light is approximately 299,792,458 meters per second [1]", "explanation": "This is a fundamental constant in physics that defines the upper limit for how fast anything can travel in the universe."}}"""
-            
-        elif card_type == "definition":
-            system_prompt = f"""You are a dictionary. {current_context}
-            Provide a clear, concise, and accurate definition, with citations if from web sources.
-            Format your response as a JSON object with this structure:
-            {{"answer": "Your definition here", "explanation": "Optional etymology or additional context"}}"""
-            
-        elif card_type == "multiple_choice":
-            system_prompt = f"""You are a test creator. {current_context}
-            Create a multiple choice question with exactly 4 options.
-            Format your response as a JSON object with this structure:
-            {{
-                "options": ["option1", "option2", "option3", "option4"],
-                "correct_answer": "The correct option text",
-                "explanation": "Why this answer is correct"
-            }}"""
-        else:
-            system_prompt = f"""You are a helpful tutor. {current_context}
-            Provide a clear, concise, and accurate answer, with citations.
-            Format your response as a JSON object with this structure:
-            {{"answer": "Your answer text here", "explanation": "Optional explanation"}}"""
-            
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": question}
-        ]
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=500
-        )
+        Example response:
+        {{"answer": "The speed of light is approximately 299,792,458 meters per second [1]", "explanation": "This is a fundamental constant in physics that defines the upper limit for how fast anything can travel in the universe."}}"""
         
-        answer_text = response.choices[0].message.content.strip()
-        logger.info(f"Raw answer: {answer_text}")
+    elif card_type == "definition":
+        system_prompt = f"""You are a dictionary. {current_context}
+        Provide a clear, concise, and accurate definition, with citations if from web sources.
+        Format your response as a JSON object with this structure:
+        {{"answer": "Your definition here", "explanation": "Optional etymology or additional context"}}"""
         
-        try:
-            # Try to parse the response as JSON
-            answer_data = json.loads(answer_text)
-            logger.info(f"Parsed answer data: {answer_data}")
-            return {"answer": answer_data, "sources": sources}
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse answer as JSON: {str(e)}")
-            # Fallback: wrap the raw text in a basic structure
-            fallback_answer = {
-                "answer": answer_text,
-                "explanation": "No structured explanation available"
-            }
-            return {"answer": fallback_answer, "sources": sources}
+    elif card_type == "multiple_choice":
+        system_prompt = f"""You are a test creator. {current_context}
+        Create a multiple choice question with exactly 4 options.
+        Format your response as a JSON object with this structure:
+        {{
+            "options": ["option1", "option2", "option3", "option4"],
+            "correct_answer": "The correct option text",
+            "explanation": "Why this answer is correct"
+        }}"""
+    else:
+        system_prompt = f"""You are a helpful tutor. {current_context}
+        Provide a clear, concise, and accurate answer, with citations.
+        Format your response as a JSON object with this structure:
+        {{"answer": "Your answer text here", "explanation": "Optional explanation"}}"""
         
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": question}
+    ]
+    return messages
+
+def parse_answer_text(answer_text: str, sources: list) -> dict:
+    """Turn the model's reply into a generate_answer result, tolerating non-JSON replies"""
+    try:
+        # Try to parse the response as JSON
+        answer_data = json.loads(answer_text)
+        logger.info("Parsed answer data: %s", payload(answer_data))
+        return {"answer": answer_data, "sources": sources}
+    except json.JSONDecodeError as e:
+        logger.error("Failed to parse answer as JSON: %s", e)
+        # Fallback: wrap the raw text in a basic structure
+        fallback_answer = {
+            "answer": answer_text,
+            "explanation": "No structured explanation available"
+        }
+        return {"answer": fallback_answer, "sources": sources}
+
+def _generate_answer(question: str, card_type: str = "basic", priority: int = PRIORITY_INTERACTIVE) -> dict:
+    """Generate an answer using OpenAI API with web search enhancement"""
+    logger.info("Starting generate_answer for question: %s, type: %s", payload(question), card_type)
+    
+    # Perform web search for current information
+    search_results = search_web(question)
+    web_results = search_results["snippets"]
+    sources = search_results["sources"]
+    
+    logger.info("Web search results: %s", payload(web_results))
+    
+    messages = build_answer_messages(question, card_type, web_results)
+    
+    completion = llm.complete(
+        messages,
+        max_tokens=500,
+        priority=priority,
+        operation="generate_answer",
+        temperature=0.7
+    )
+    
+    answer_text = completion.text.strip()
+    logger.info("Raw answer: %s", payload(answer_text))
+    
+    return parse_answer_text(answer_text, sources)
+
+def generate_answer(question: str, card_type: str = "basic", priority: int = PRIORITY_INTERACTIVE) -> dict:
+    """Generate an answer, reusing a cached answer for the same question and card type.
+
+    Raises ``RateLimited`` when the provider quota stays exhausted, so callers
+    can ask the client to retry instead of storing an error answer.
+    """
+    try:
+        key = answer_cache_key(question, card_type, PROMPT_VERSION)
+        return answer_cache.get_or_compute(key, lambda: _generate_answer(question, card_type, priority))
+
+    except RateLimited:
+        raise
     except Exception as e:
-        logger.error(f"Error in generate_answer: {str(e)}")
+        logger.error("Error in generate_answer: %s", e)
         return {
             "answer": {
                 "answer": f"Error generating answer: {str(e)}",
@@ -254,14 +478,323 @@ def generate_answer(question: str, card_type: str = "basic") -> dict:
             "sources": []
         }
 
-# In-memory storage
-decks = {}
-flashcards = {}
+# Upper bound on concurrent answer generations within one batch request
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# Batched generation packs several questions of one card type into a single
+# completion request; batches are closed when their estimated prompt plus
+# completion size would exceed the token budget
+ANSWER_BATCH_SIZE = int(os.getenv("ANSWER_BATCH_SIZE", "8"))
+ANSWER_BATCH_TOKEN_BUDGET = int(os.getenv("ANSWER_BATCH_TOKEN_BUDGET", "6000"))
+ANSWER_TOKENS_PER_CARD = int(os.getenv("ANSWER_TOKENS_PER_CARD", "300"))
+
+def build_batch_answer_messages(questions: list, card_type: str, search_results: list) -> list:
+    """Build one request answering several numbered questions of the same card type"""
+    web_results = "\n\n".join(
+        f"Search results for question {i}:\n{result['snippets']}"
+        for i, result in enumerate(search_results)
+    )
+    system_prompt = build_answer_messages("", card_type, web_results)[0]["content"]
+    system_prompt += """
+        You will receive several numbered questions. Answer each one independently, citing only
+        the search results for that question.
+        Reply with a JSON array holding one object per question. Each object has the structure
+        described above plus an "index" field with the question number, e.g. [{"index": 0, ...}, {"index": 1, ...}]"""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": "\n".join(f"{i}. {question}" for i, question in enumerate(questions))}
+    ]
+
+def _generate_answer_batch(questions: list, card_type: str, search_results: list) -> list:
+    """Answer several questions with one completion; returns None for questions missing from the reply"""
+    logger.info("Generating %s %s answers in one request", len(questions), card_type)
+    completion = llm.complete(
+        build_batch_answer_messages(questions, card_type, search_results),
+        max_tokens=ANSWER_TOKENS_PER_CARD * len(questions),
+        priority=PRIORITY_BULK,
+        operation="generate_answer_batch",
+        temperature=0.7
+    )
+    answers = split_json_array(completion.text, len(questions))
+
+    results = []
+    for question, answer, search in zip(questions, answers, search_results):
+        if answer is None:
+            results.append(None)
+            continue
+        result = {"answer": answer, "sources": search["sources"]}
+        answer_cache.set(answer_cache_key(question, card_type, PROMPT_VERSION), result)
+        results.append(result)
+    return results
+
+def generate_answers(items: list, concurrency: int = BATCH_CONCURRENCY) -> list:
+    """Generate answers for ``(question, card_type)`` pairs, packing cache misses into batched requests"""
+    results = [None] * len(items)
+    misses = []
+    for index, (question, card_type) in enumerate(items):
+        cached = answer_cache.get(answer_cache_key(question, card_type, PROMPT_VERSION))
+        if cached is not None:
+            results[index] = cached
+        else:
+            misses.append(index)
+    if not misses:
+        return results
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        searches = dict(zip(misses, executor.map(lambda index: search_web(items[index][0]), misses)))
+        for card_type in dict.fromkeys(items[index][1] for index in misses):
+            group = [index for index in misses if items[index][1] == card_type]
+            generated = generate_in_batches(
+                [items[index][0] + searches[index]["snippets"] for index in group],
+                lambda batch: _generate_answer_batch(
+                    [items[group[i]][0] for i in batch],
+                    card_type,
+                    [searches[group[i]] for i in batch]
+                ),
+                lambda i: generate_answer(*items[group[i]], priority=PRIORITY_BULK),
+                token_budget=ANSWER_BATCH_TOKEN_BUDGET,
+                max_batch_size=ANSWER_BATCH_SIZE,
+                tokens_per_item=ANSWER_TOKENS_PER_CARD,
+                overhead=estimate_tokens(build_answer_messages("", card_type, "")[0]["content"]),
+                map_fn=executor.map
+            )
+            for i, answer in generated.items():
+                results[group[i]] = answer
+    return results
+
+def quota_exhausted_response(error: RateLimited):
+    """503 asking the client to retry once the provider quota has recovered"""
+    response = jsonify({"error": f"AI provider quota exhausted: {str(error)}"})
+    response.headers["Retry-After"] = str(max(1, round(error.retry_after or 30)))
+    return response, 503
+
+def make_card(question: str, card_type: str, deck_id: str, answer: dict = None) -> dict:
+    """Build a new flashcard record"""
+    now = datetime.now().isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "question": question,
+        "answer": answer,
+        "type": card_type,
+        "deck_id": deck_id,
+        "created_at": now,
+        "updated_at": now,
+        "total_reviews": 0,
+        "correct_reviews": 0,
+        "accuracy": 0
+    }
+
+def normalize_answer(answer: dict) -> dict:
+    """Convert a generate_answer result to the structured answer stored on a card"""
+    answer_data = answer["answer"]
+    if isinstance(answer_data, dict):
+        # For multiple choice or structured answers
+        return answer_data
+    # For basic text answers, wrap in a structured format
+    return {
+        "answer": answer_data,
+        "explanation": answer.get("explanation", "")
+    }
+
+# Estimated question similarity above which a card is reported as a near-duplicate,
+# and above which POST /flashcards may reuse its answer when asked to
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.6"))
+DUPLICATE_REUSE_THRESHOLD = float(os.getenv("DUPLICATE_REUSE_THRESHOLD", "0.85"))
+
+def find_duplicates(deck_id: str, question: str, exclude: str = None) -> list:
+    """Return the deck's near-duplicates of a question, most similar first"""
+    duplicates = []
+    for card_id, score in flashcards.duplicates.query(deck_id, question, DUPLICATE_THRESHOLD, exclude):
+        card = flashcards.get(card_id)
+        if card is not None:
+            duplicates.append({"id": card_id, "question": card["question"], "type": card["type"],
+                               "similarity": round(score, 3)})
+    return duplicates
+
+def reusable_answer(duplicates: list, card_type: str):
+    """Return the answer of the closest answered duplicate of the same type, if close enough"""
+    for duplicate in duplicates:
+        if duplicate["similarity"] < DUPLICATE_REUSE_THRESHOLD:
+            break
+        card = flashcards.get(duplicate["id"])
+        if card is not None and card["type"] == card_type and not card.get("status") and card.get("answer"):
+            return duplicate["id"], copy.deepcopy(card["answer"])
+    return None, None
+
+# Serialized /decks/<id>/flashcards bodies, reused until the deck changes
+deck_payloads = LRUCache(max_entries=int(os.getenv("DECK_PAYLOAD_CACHE_SIZE", "256")))
+
+jobs = JobManager(
+    max_workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_pending=int(os.getenv("JOB_QUEUE_SIZE", "100"))
+)
+
+def fill_pending_card(job_id: str, card_id: str, question: str, card_type: str) -> dict:
+    """Job body: generate the answer of a card created in async mode
+
+    ``question`` and ``card_type`` are the values the job was queued for; if the
+    card was edited, deleted or handed to another job meanwhile the generated
+    answer is stale and is discarded instead of being written onto the card.
+    """
+    def is_current(card) -> bool:
+        return (
+            card is not None
+            and card.get("status") == "pending"
+            and card.get("job_id") in (None, job_id)
+            and card["question"] == question
+            and card["type"] == card_type
+        )
+
+    if flashcards.get(card_id) is None:
+        raise ValueError(f"Flashcard {card_id} was deleted before its answer was generated")
+    try:
+        answer = generate_answer(question, card_type, priority=PRIORITY_BULK)
+    except RateLimited:
+        card = flashcards.get(card_id)
+        if is_current(card):
+            card["status"] = "failed"
+            flashcards.touch(card["deck_id"])
+            save_data([("flashcards", card_id)])
+        raise
+    # The card may have been edited or deleted while the answer was generated
+    card = flashcards.get(card_id)
+    if not is_current(card):
+        logger.info("Discarding answer of job %s: flashcard %s changed while it ran", job_id, card_id)
+        return {"card": dict(card) if card is not None else None, "discarded": True}
+    if not answer or not answer.get("answer"):
+        card["status"] = "failed"
+        flashcards.touch(card["deck_id"])
+        save_data([("flashcards", card_id)])
+        raise ValueError("Failed to generate answer")
+    card["answer"] = normalize_answer(answer)
+    card["updated_at"] = datetime.now().isoformat()
+    card.pop("status", None)
+    card.pop("job_id", None)
+    flashcards.refresh(card_id)
+    save_data([("flashcards", card_id)])
+    logger.info("Generated answer for pending flashcard %s", card_id)
+
+    return {"card": dict(card)}
+
+# Uploaded documents and their checkpoints stay here until ingestion succeeds,
+# so an interrupted ingestion can be resumed
+INGEST_DIR = os.path.join(DATA_DIR, 'ingest')
+INGEST_CHUNK_CHARS = int(os.getenv("INGEST_CHUNK_CHARS", "4000"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+INGEST_QUESTIONS_PER_CHUNK = int(os.getenv("INGEST_QUESTIONS_PER_CHUNK", "3"))
+
+def ingest_path(ingest_id: str, suffix: str) -> str:
+    return os.path.join(INGEST_DIR, f"{ingest_id}.{suffix}")
+
+def generate_chunk_cards(text: str, num_questions: int = INGEST_QUESTIONS_PER_CHUNK) -> list:
+    """Ask for question/answer pairs covering one chunk of a document"""
+    system_prompt = f"""You create study flashcards from the document excerpt the user sends.
+    Write up to {num_questions} question/answer pairs about the most important facts of the excerpt.
+    Reply with a JSON array of objects with this structure:
+    [{{"index": 0, "question": "Question text", "answer": "Answer text", "explanation": "Optional explanation"}}]"""
+    completion = llm.complete(
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": text}
+        ],
+        max_tokens=ANSWER_TOKENS_PER_CARD * num_questions,
+        priority=PRIORITY_BULK,
+        operation="generate_chunk_cards",
+        temperature=0.7
+    )
+    items = split_json_array(completion.text, num_questions)
+    return [item for item in items if item and item.get("question") and item.get("answer")]
+
+def run_ingestion(job_id: str, ingest_id: str, deck_id: str, source_format: str = "txt") -> dict:
+    """Job body: stream an uploaded document through chunking and generation into a deck"""
+    path = ingest_path(ingest_id, 'txt')
+    if not os.path.exists(path):
+        jobs.update(job_id, progress={"stage": "converting"})
+        convert_to_text(ingest_path(ingest_id, source_format), source_format, path)
+    total_bytes = os.path.getsize(path)
+    checkpoint = IngestCheckpoint(ingest_path(ingest_id, 'done'))
+    bytes_read = 0
+
+    def store(items: list) -> int:
+        if deck_id not in decks:
+            raise ValueError(f"Deck {deck_id} was deleted during ingestion")
+        changes = []
+        for item in items:
+            card = make_card(item["question"], "basic", deck_id, {
+                "answer": str(item["answer"]),
+                "explanation": str(item.get("explanation", ""))
+            })
+            flashcards[card["id"]] = card
+            changes.append(("flashcards", card["id"]))
+        if changes:
+            save_data(changes)
+        return len(changes)
+
+    def progress(counts: dict):
+        jobs.update(job_id, progress={**counts, "bytes_read": bytes_read, "total_bytes": total_bytes})
+
+    with open(path, 'rb') as f:
+        def lines():
+            nonlocal bytes_read
+            for line in f:
+                bytes_read += len(line)
+                yield line.decode('utf-8', errors='replace')
+
+        counts = ingest_document(
+            iter_chunks(lines(), INGEST_CHUNK_CHARS),
+            generate_chunk_cards,
+            store,
+            checkpoint=checkpoint,
+            progress=progress,
+            max_workers=INGEST_WORKERS
+        )
+
+    if counts["failed"] == 0:
+        for suffix in ('txt', 'done', 'json') + CONVERTIBLE_FORMATS:
+            if os.path.exists(ingest_path(ingest_id, suffix)):
+                os.remove(ingest_path(ingest_id, suffix))
+    logger.info("Ingestion %s into deck %s finished: %s", ingest_id, deck_id, counts)
+    return {"ingest_id": ingest_id, "deck_id": deck_id, **counts}
+
+# ingest id -> id of the job currently working on it
+ingest_jobs = {}
+
+def start_ingestion(ingest_id: str, deck_id: str, source_format: str = "txt"):
+    running = jobs.get(ingest_jobs.get(ingest_id, ""))
+    if running is not None and running["status"] not in FINISHED_STATUSES:
+        return jsonify({"error": "Ingestion is already running", "job": running}), 409
+    try:
+        job = jobs.submit(run_ingestion, ingest_id, deck_id, source_format, kind="ingest")
+    except JobQueueFull:
+        return jsonify({"error": "Too many pending jobs, try again later", "ingest_id": ingest_id}), 503
+    ingest_jobs[ingest_id] = job["id"]
+    logger.info("Queued ingestion %s for deck %s as job %s", ingest_id, deck_id, job['id'])
+    return jsonify({"ingest_id": ingest_id, "job": job}), 202
 
 @app.route("/", methods=["GET"])
 def home():
     return jsonify({"message": "Welcome to SmartStudy Flashcards API!"})
 
+REGISTRY.add_collector(cache_collector({
+    "answer": answer_cache.info,
+    "search": search_cache.info,
+    "deck_payload": deck_payloads.info
+}))
+REGISTRY.add_collector(lambda: [(
+    "studybuddy_storage_bytes_written_total", "counter", "Bytes written by the storage backend",
+    [({"backend": STORAGE_BACKEND}, repository.bytes_written)]
+)])
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Prometheus metrics"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+@app.route("/health/providers", methods=["GET"])
+def get_provider_health():
+    """Get the cached result of the latest background provider checks"""
+    return jsonify(provider_health.results())
+
 @app.route("/decks", methods=["GET", "POST", "OPTIONS"])
 @app.route("/decks/", methods=["GET", "POST", "OPTIONS"])
 def get_or_create_deck():
@@ -278,7 +811,7 @@ def get_or_create_deck():
     
     try:
         data = request.get_json()
-        logger.debug(f"Creating deck with data: {data}")
+        logger.debug("Creating deck with data: %s", payload(data))
         
         # Validate required fields
         required_fields = ["name"]
@@ -301,8 +834,8 @@ def get_or_create_deck():
         
         # Store deck
         decks[deck_id] = new_deck
-        save_data()
-        logger.info(f"Created deck: {new_deck}")
+        save_data([("decks", deck_id)])
+        logger.info("Created deck: %s", payload(new_deck))
         
         return jsonify(new_deck), 201
         
@@ -314,7 +847,7 @@ def get_or_create_deck():
 @app.route("/decks/<deck_id>", methods=["GET", "DELETE", "OPTIONS"])
 def handle_deck(deck_id):
     """Handle deck operations"""
-    logger.info(f"Handling {request.method} request for deck {deck_id}")
+    logger.info("Handling %s request for deck %s", request.method, deck_id)
     
     if request.method == "GET":
         if deck_id not in decks:
@@ -323,31 +856,29 @@ def handle_deck(deck_id):
         
     elif request.method == "DELETE":
         try:
-            logger.info(f"Processing DELETE request for deck {deck_id}")
+            logger.info("Processing DELETE request for deck %s", deck_id)
             
             if deck_id not in decks:
-                logger.warning(f"Deck {deck_id} not found")
+                logger.warning("Deck %s not found", deck_id)
                 return jsonify({"error": "Deck not found"}), 404
                 
             # Delete all cards in the deck
-            cards_to_delete = [card_id for card_id, card in flashcards.items() if card["deck_id"] == deck_id]
-            for card_id in cards_to_delete:
-                logger.info(f"Deleting card {card_id}")
-                del flashcards[card_id]
+            cards_to_delete = flashcards.delete_deck_cards(deck_id)
+            logger.info("Deleted %s cards from deck %s", len(cards_to_delete), deck_id)
                 
             # Delete the deck
             deck = decks.pop(deck_id)
-            logger.info(f"Deleted deck: {deck}")
+            logger.info("Deleted deck: %s", payload(deck))
             
             # Save changes to files
-            save_data()
+            save_data([("decks", deck_id)] + [("flashcards", card_id) for card_id in cards_to_delete])
             
             response = {
                 "message": "Deck deleted successfully",
                 "deck_id": deck_id,
                 "cards_deleted": len(cards_to_delete)
             }
-            logger.info(f"Delete response: {response}")
+            logger.info("Delete response: %s", payload(response))
             return jsonify(response), 200
             
         except Exception as e:
@@ -357,7 +888,7 @@ def handle_deck(deck_id):
             
     # Handle OPTIONS request
     elif request.method == "OPTIONS":
-        logger.info(f"Handling OPTIONS request for deck {deck_id}")
+        logger.info("Handling OPTIONS request for deck %s", deck_id)
         response = make_response()
         response.headers.add("Access-Control-Allow-Methods", "GET, DELETE, OPTIONS")
         response.headers.add("Access-Control-Allow-Headers", "Content-Type, Accept")
@@ -369,28 +900,261 @@ def get_deck_flashcards(deck_id):
     try:
         if deck_id not in decks:
             return jsonify({"error": "Deck not found"}), 404
+
+        try:
+            after = decode_cursor(request.args["after"]) if request.args.get("after") else None
+            limit = int(request.args["limit"]) if request.args.get("limit") else None
+        except ValueError as e:
+            return jsonify({"error": f"Invalid pagination parameters: {str(e)}"}), 400
+        if limit is not None and limit < 1:
+            return jsonify({"error": "limit must be positive"}), 400
+
+        # Stream one card per line so large decks never sit in memory as one payload
+        wants_ndjson = (request.args.get("format") == "ndjson"
+                        or request.accept_mimetypes.best == "application/x-ndjson")
+        if wants_ndjson:
+            def stream():
+                for card in iter_pages(lambda key, size: read_deck_page(deck_id, key, size), after, limit):
+                    yield app.json.dumps(card) + "\n"
+            return Response(stream_with_context(stream()), mimetype="application/x-ndjson")
+
+        # Keyset pagination over the deck's stable card order
+        if after is not None or limit is not None:
+            cards, next_key = read_deck_page(deck_id, after, limit)
+            return jsonify({
+                "cards": cards,
+                "next_cursor": encode_cursor(next_key) if next_key is not None else None
+            })
             
-        # Get all cards for this deck
-        deck_cards = []
-        for card in flashcards.values():
-            if card["deck_id"] == deck_id:
-                try:
-                    # Parse the answer if it's a string and looks like JSON
-                    if isinstance(card["answer"], str):
-                        if card["answer"].strip().startswith("{"):
-                            card["answer"] = json.loads(card["answer"])
-                except json.JSONDecodeError:
-                    # If the answer is not valid JSON, keep it as is
-                    logger.debug(f"Non-JSON answer for card {card['id']}: {card['answer']}")
-                deck_cards.append(card)
-                
-        logger.debug(f"Returning {len(deck_cards)} cards for deck {deck_id}")
-        return jsonify(deck_cards)
+        # Serve the cached body while the deck is unchanged
+        version, modified_at = flashcards.deck_version(deck_id)
+        cached = deck_payloads.get(deck_id)
+        if cached is None or cached["version"] != version:
+            deck_cards = flashcards.deck_cards(deck_id)
+            body = app.json.dumps(deck_cards).encode('utf-8')
+            cached = {
+                "version": version,
+                "body": body,
+                "etag": hashlib.sha1(body).hexdigest(),
+                "last_modified": datetime.fromtimestamp(modified_at, tz=timezone.utc)
+            }
+            deck_payloads.set(deck_id, cached)
+            logger.debug("Serialized %s cards for deck %s", len(deck_cards), deck_id)
+
+        response = Response(cached["body"], mimetype="application/json")
+        response.set_etag(cached["etag"])
+        response.last_modified = cached["last_modified"]
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
         
     except Exception as e:
-        logger.error(f"Error getting flashcards for deck {deck_id}: {str(e)}")
+        logger.error("Error getting flashcards for deck %s: %s", deck_id, e)
         return jsonify({"error": str(e)}), 500
 
+@app.route("/decks/<deck_id>/due", methods=["GET"])
+def get_due_flashcards(deck_id):
+    """Get the cards of a deck that are due for review, earliest first"""
+    if deck_id not in decks:
+        return jsonify({"error": "Deck not found"}), 404
+    try:
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if limit < 1:
+        return jsonify({"error": "limit must be positive"}), 400
+
+    now = datetime.now().timestamp()
+    due = repository.due_cards(deck_id, limit, now)
+    if due is not None:
+        cards, next_due = due
+    else:
+        card_ids, next_due = flashcards.due.due(deck_id, limit, now)
+        cards = [flashcards[card_id] for card_id in card_ids]
+    return jsonify({
+        "cards": cards,
+        "next_due_at": datetime.fromtimestamp(next_due).isoformat() if next_due is not None else None
+    })
+
+@app.route("/stats", methods=["GET"])
+def get_stats():
+    """Get global and per-deck card and review totals"""
+    stats = flashcards.stats.totals()
+    stats["total_decks"] = len(decks)
+    stats["decks"] = {deck_id: flashcards.stats.deck(deck_id) for deck_id in decks}
+    return jsonify(stats)
+
+@app.route("/decks/<deck_id>/stats", methods=["GET"])
+def get_deck_stats(deck_id):
+    """Get card and review totals for a deck"""
+    if deck_id not in decks:
+        return jsonify({"error": "Deck not found"}), 404
+    stats = flashcards.stats.deck(deck_id)
+    stats["deck_id"] = deck_id
+    return jsonify(stats)
+
+# Bucket sizes of the accuracy-over-time series of GET /decks/<id>/analytics
+ANALYTICS_BUCKETS = {"day": 86400, "week": 7 * 86400}
+
+@app.route("/decks/<deck_id>/analytics", methods=["GET"])
+def get_deck_analytics(deck_id):
+    """Accuracy over time, retention curve, difficulty distribution and hardest cards from a deck's review history"""
+    if deck_id not in decks:
+        return jsonify({"error": "Deck not found"}), 404
+    bucket = request.args.get("bucket", "day")
+    if bucket not in ANALYTICS_BUCKETS:
+        return jsonify({"error": f"bucket must be one of: {', '.join(ANALYTICS_BUCKETS)}"}), 400
+    since = request.args.get("since")
+    try:
+        if since:
+            # Epoch seconds/milliseconds or an ISO timestamp
+            since = parse_event_time(float(since) if re.fullmatch(r"\d+(\.\d*)?", since) else since)
+        else:
+            since = None
+        limit = max(1, min(int(request.args.get("limit", 10)), 100))
+        min_reviews = int(request.args.get("min_reviews", 3))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid analytics parameters: {str(e)}"}), 400
+
+    questions = {}
+
+    def in_deck(card_id):
+        # Reviews of cards deleted or moved since stay in the log
+        card = flashcards.get(card_id)
+        if card is None or card.get("deck_id") != deck_id:
+            return False
+        questions[card_id] = card.get("question")
+        return True
+
+    started = time.perf_counter()
+    analytics = review_log.deck_analytics(deck_id, ANALYTICS_BUCKETS[bucket], since, min_reviews, limit, in_deck)
+    took_ms = (time.perf_counter() - started) * 1000
+    for entry in analytics["hardest_cards"]:
+        entry["question"] = questions[entry["card_id"]]
+    analytics.update({"deck_id": deck_id, "bucket": bucket, "took_ms": round(took_ms, 3)})
+    return jsonify(analytics)
+
+@app.route("/search", methods=["GET"])
+def search_flashcards():
+    """Full-text search over card questions and answers, optionally within one deck"""
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Missing query parameter: q"}), 400
+    deck_id = request.args.get("deck_id") or None
+    if deck_id is not None and deck_id not in decks:
+        return jsonify({"error": "Deck not found"}), 404
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 100))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    started = time.perf_counter()
+    matches = flashcards.search.search(query, deck_id, limit)
+    took_ms = (time.perf_counter() - started) * 1000
+    results = [
+        {"card": flashcards[card_id], "score": round(score, 4)}
+        for card_id, score in matches if card_id in flashcards
+    ]
+    return jsonify({"query": query, "deck_id": deck_id, "results": results, "took_ms": round(took_ms, 3)})
+
+@app.route("/decks/<deck_id>/duplicates", methods=["GET"])
+def get_deck_duplicates(deck_id):
+    """Get clusters of cards in a deck whose questions are near-duplicates"""
+    if deck_id not in decks:
+        return jsonify({"error": "Deck not found"}), 404
+    try:
+        threshold = float(request.args.get("threshold", DUPLICATE_THRESHOLD))
+    except ValueError:
+        return jsonify({"error": "threshold must be a number"}), 400
+
+    clusters = []
+    for card_ids in flashcards.duplicates.clusters(deck_id, threshold):
+        cards = [flashcards[card_id] for card_id in card_ids if card_id in flashcards]
+        if len(cards) > 1:
+            clusters.append([{"id": card["id"], "question": card["question"]} for card in cards])
+    return jsonify({"deck_id": deck_id, "threshold": threshold, "clusters": clusters})
+
+@app.route("/decks/<deck_id>/ingest", methods=["POST", "OPTIONS"])
+def ingest_document_into_deck(deck_id):
+    """Create cards from an uploaded text, PDF or DOCX document (multipart ``file`` or raw text body) in the background"""
+    if request.method == "OPTIONS":
+        response = jsonify({})
+        response.headers.add('Access-Control-Allow-Methods', 'POST')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        return response
+
+    try:
+        if deck_id not in decks:
+            return jsonify({"error": "Deck not found"}), 404
+
+        # Spool the upload to disk so it is never held in memory as a whole
+        ingest_id = str(uuid.uuid4())
+        os.makedirs(INGEST_DIR, exist_ok=True)
+        upload = request.files.get("file")
+        extension = os.path.splitext(upload.filename or "")[1].lower().lstrip(".") if upload is not None else ""
+        source_format = extension if extension in CONVERTIBLE_FORMATS else "txt"
+        path = ingest_path(ingest_id, source_format)
+        if upload is not None:
+            upload.save(path)
+        else:
+            with open(path, 'wb') as f:
+                while True:
+                    block = request.stream.read(65536)
+                    if not block:
+                        break
+                    f.write(block)
+        if os.path.getsize(path) == 0:
+            os.remove(path)
+            return jsonify({"error": "Document is empty"}), 400
+
+        with open(ingest_path(ingest_id, 'json'), 'w') as f:
+            json.dump({"deck_id": deck_id, "format": source_format, "created_at": datetime.now().isoformat()}, f)
+        return start_ingestion(ingest_id, deck_id, source_format)
+
+    except Exception as e:
+        error_msg = f"Error ingesting document: {str(e)}"
+        logger.error(error_msg)
+        return jsonify({"error": error_msg}), 500
+
+@app.route("/ingest/<ingest_id>/resume", methods=["POST", "OPTIONS"])
+def resume_ingestion(ingest_id):
+    """Restart an interrupted ingestion, skipping the chunks it already turned into cards"""
+    if request.method == "OPTIONS":
+        response = jsonify({})
+        response.headers.add('Access-Control-Allow-Methods', 'POST')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        return response
+
+    if not re.fullmatch(r"[0-9a-f-]{36}", ingest_id) or not os.path.exists(ingest_path(ingest_id, 'json')):
+        return jsonify({"error": "Ingestion not found"}), 404
+    with open(ingest_path(ingest_id, 'json'), 'r') as f:
+        meta = json.load(f)
+    if meta["deck_id"] not in decks:
+        return jsonify({"error": "Deck not found"}), 404
+    return start_ingestion(ingest_id, meta["deck_id"], meta.get("format", "txt"))
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Get the status of a background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/events", methods=["GET"])
+def job_events(job_id):
+    """Stream job status changes as Server-Sent Events until the job finishes"""
+    if jobs.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream():
+        for job in jobs.events(job_id):
+            if job is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.route("/flashcards", methods=["POST", "OPTIONS"])
 @app.route("/flashcards/", methods=["POST", "OPTIONS"])
 def create_flashcard():
@@ -404,7 +1168,7 @@ def create_flashcard():
 
     try:
         data = request.get_json()
-        logger.debug(f"Creating flashcard: {data}")
+        logger.debug("Creating flashcard: %s", payload(data))
         
         # Validate required fields
         required_fields = ["question", "deck_id", "type"]
@@ -416,60 +1180,228 @@ def create_flashcard():
         if data["deck_id"] not in decks:
             return jsonify({"error": "Deck not found"}), 404
         
+        # Create flashcard
+        new_card = make_card(data["question"], data["type"], data["deck_id"])
+        card_id = new_card["id"]
+
+        # Flag rephrasings of questions already in the deck
+        duplicates = find_duplicates(data["deck_id"], data["question"])
+        extra = {"duplicates": duplicates} if duplicates else {}
+
+        # Optionally reuse the answer of a near-identical card instead of generating one
+        if request.args.get("reuse_duplicates") in ("1", "true") or data.get("reuse_duplicates"):
+            source_id, answer = reusable_answer(duplicates, data["type"])
+            if source_id is not None:
+                new_card["answer"] = answer
+                flashcards[card_id] = new_card
+                save_data([("flashcards", card_id)])
+                logger.info("Created flashcard %s reusing the answer of %s", card_id, source_id)
+                return jsonify({**new_card, **extra, "answer_reused_from": source_id}), 201
+
+        # In async mode store the card as pending and let a worker fill in the answer
+        if request.args.get("async") in ("1", "true") or data.get("async"):
+            new_card["answer"] = {"answer": "", "explanation": ""}
+            new_card["status"] = "pending"
+            flashcards[card_id] = new_card
+            try:
+                job = jobs.submit(fill_pending_card, card_id, data["question"], data["type"], kind="generate_answer")
+            except JobQueueFull:
+                flashcards.pop(card_id, None)
+                return jsonify({"error": "Too many pending flashcards, try again later"}), 503
+            # The store may hold a compact copy of the card, so record the job there
+            new_card = flashcards[card_id]
+            new_card["job_id"] = job["id"]
+            flashcards.touch(new_card["deck_id"])
+            save_data([("flashcards", card_id)])
+            logger.info("Queued answer generation job %s for flashcard %s", job['id'], card_id)
+
+            response = jsonify({"job_id": job["id"], "card": new_card, **extra})
+            response.headers["Location"] = f"/jobs/{job['id']}"
+            return response, 202
+
         # Generate answer
-        answer = generate_answer(data["question"], data["type"])
+        try:
+            answer = generate_answer(data["question"], data["type"])
+        except RateLimited as e:
+            return quota_exhausted_response(e)
         if not answer or not answer.get("answer"):
             return jsonify({"error": "Failed to generate answer"}), 500
             
-        logger.debug(f"Generated answer: {answer}")
-        
-        # Create flashcard
-        card_id = str(uuid.uuid4())
-        
-        # Handle the answer format
-        answer_data = answer["answer"]
-        if isinstance(answer_data, dict):
-            # For multiple choice or structured answers
-            answer_json = json.dumps(answer_data)
-        else:
-            # For basic text answers, wrap in a structured format
-            answer_json = json.dumps({
-                "answer": answer_data,
-                "explanation": answer.get("explanation", "")
-            })
+        logger.debug("Generated answer: %s", payload(answer))
         
-        new_card = {
-            "id": card_id,
-            "question": data["question"],
-            "answer": answer_json,
-            "type": data["type"],
-            "deck_id": data["deck_id"],
-            "created_at": datetime.now().isoformat(),
-            "updated_at": datetime.now().isoformat(),
-            "total_reviews": 0,
-            "correct_reviews": 0,
-            "accuracy": 0
-        }
+        new_card["answer"] = normalize_answer(answer)
         
         # Store flashcard
         flashcards[card_id] = new_card
-        save_data()
-        logger.info(f"Created flashcard: {new_card}")
-        
-        # Return the card with parsed answer
-        return_card = dict(new_card)
-        if isinstance(answer_data, dict):
-            return_card["answer"] = answer_data
-        else:
-            return_card["answer"] = json.loads(answer_json)
+        save_data([("flashcards", card_id)])
+        logger.info("Created flashcard: %s", payload(new_card))
         
-        return jsonify(return_card), 201
+        return jsonify({**new_card, **extra}), 201
         
     except Exception as e:
         error_msg = f"Error creating flashcard: {str(e)}"
         logger.error(error_msg)
         return jsonify({"error": error_msg}), 500
 
+@app.route("/decks/<deck_id>/flashcards:batch", methods=["POST", "OPTIONS"])
+def batch_flashcards(deck_id):
+    """Create or update many flashcards of a deck with a single storage commit"""
+    if request.method == "OPTIONS":
+        response = jsonify({})
+        response.headers.add('Access-Control-Allow-Methods', 'POST')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        return response
+
+    try:
+        if deck_id not in decks:
+            return jsonify({"error": "Deck not found"}), 404
+
+        data = request.get_json()
+        if not isinstance(data, dict) or not isinstance(data.get("cards"), list):
+            return jsonify({"error": "Request body must contain a list of cards"}), 400
+        items = data["cards"]
+        concurrency = data.get("concurrency", BATCH_CONCURRENCY)
+        if isinstance(concurrency, bool) or not isinstance(concurrency, int):
+            return jsonify({"error": "concurrency must be an integer"}), 400
+        concurrency = max(1, min(concurrency, BATCH_CONCURRENCY))
+        logger.info("Saving batch of %s flashcards for deck %s", len(items), deck_id)
+
+        # Validate every item and work out which ones need a new answer
+        results = [None] * len(items)
+        to_generate = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {"index": index, "status": 400, "error": "Card must be an object"}
+                continue
+            missing = [field for field in ("question", "type") if field not in item]
+            if missing:
+                results[index] = {"index": index, "status": 400, "error": f"Missing required field: {missing[0]}"}
+                continue
+            current_card = flashcards.get(item["id"]) if item.get("id") else None
+            if item.get("id") and current_card is None:
+                results[index] = {"index": index, "status": 404, "error": "Flashcard not found"}
+                continue
+            if current_card is not None and current_card["deck_id"] != deck_id:
+                results[index] = {"index": index, "status": 400, "error": "Flashcard belongs to another deck"}
+                continue
+            if (current_card is None or item["question"] != current_card["question"]
+                    or item["type"] != current_card["type"]):
+                to_generate.append(index)
+
+        # Generate answers in batched requests with bounded concurrency
+        answers = {}
+        if to_generate:
+            generated = generate_answers(
+                [(items[index]["question"], items[index]["type"]) for index in to_generate],
+                concurrency
+            )
+            answers = dict(zip(to_generate, generated))
+
+        # Apply all changes, then commit storage once
+        changes = []
+        now = datetime.now().isoformat()
+        for index, item in enumerate(items):
+            if results[index] is not None:
+                continue
+            answer = answers.get(index)
+            if answer is not None and not answer.get("answer"):
+                results[index] = {"index": index, "status": 500, "error": "Failed to generate answer"}
+                continue
+
+            current_card = flashcards.get(item["id"]) if item.get("id") else None
+            if current_card is None:
+                card = make_card(item["question"], item["type"], deck_id, normalize_answer(answer))
+                card_id = card["id"]
+                status = 201
+            else:
+                card_id = current_card["id"]
+                card = dict(current_card)
+                card.update({
+                    "question": item["question"],
+                    "type": item["type"],
+                    "deck_id": deck_id,
+                    "updated_at": now
+                })
+                if answer is not None:
+                    card["answer"] = normalize_answer(answer)
+                status = 200
+
+            flashcards[card_id] = card
+            changes.append(("flashcards", card_id))
+            results[index] = {"index": index, "status": status, "card": card}
+
+        if changes:
+            save_data(changes)
+
+        summary = {
+            "created": sum(1 for result in results if result["status"] == 201),
+            "updated": sum(1 for result in results if result["status"] == 200),
+            "failed": sum(1 for result in results if result["status"] >= 400)
+        }
+        logger.info("Batch for deck %s: %s", deck_id, summary)
+        return jsonify({"results": results, **summary}), 200
+
+    except RateLimited as e:
+        return quota_exhausted_response(e)
+    except Exception as e:
+        error_msg = f"Error saving flashcard batch: {str(e)}"
+        logger.error(error_msg)
+        return jsonify({"error": error_msg}), 500
+
+@app.route("/flashcards/stream", methods=["POST", "OPTIONS"])
+def create_flashcard_stream():
+    """Create a flashcard, streaming the answer tokens as Server-Sent Events while they are generated"""
+    if request.method == "OPTIONS":
+        response = jsonify({})
+        response.headers.add('Access-Control-Allow-Methods', 'POST')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        return response
+
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid request data"}), 400
+    for field in ["question", "deck_id", "type"]:
+        if field not in data:
+            return jsonify({"error": f"Missing required field: {field}"}), 400
+    if data["deck_id"] not in decks:
+        return jsonify({"error": "Deck not found"}), 404
+
+    question, card_type, deck_id = data["question"], data["type"], data["deck_id"]
+
+    def sse(event: str, payload: dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    def stream():
+        try:
+            key = answer_cache_key(question, card_type, PROMPT_VERSION)
+            answer = answer_cache.get(key)
+            if answer is None:
+                search_results = search_web(question)
+                messages = build_answer_messages(question, card_type, search_results["snippets"])
+                parts = []
+                for delta in llm.stream(messages, max_tokens=500, operation="stream_answer", temperature=0.7):
+                    parts.append(delta)
+                    yield sse("token", {"text": delta})
+                answer = parse_answer_text("".join(parts).strip(), search_results["sources"])
+                answer_cache.set(key, answer)
+
+            # Persist the card only once the whole answer has arrived
+            new_card = make_card(question, card_type, deck_id, normalize_answer(answer))
+            flashcards[new_card["id"]] = new_card
+            save_data([("flashcards", new_card["id"])])
+            logger.info("Created streamed flashcard: %s", new_card['id'])
+            yield sse("done", new_card)
+        except Exception as e:
+            error_msg = f"Error creating flashcard: {str(e)}"
+            logger.error(error_msg)
+            yield sse("error", {"error": error_msg})
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route("/flashcards/<card_id>", methods=["DELETE", "PUT", "OPTIONS"])
 def handle_flashcard(card_id):
     """Handle flashcard operations"""
@@ -486,7 +1418,7 @@ def handle_flashcard(card_id):
                 
             # Delete the card
             deleted_card = flashcards.pop(card_id)
-            save_data()
+            save_data([("flashcards", card_id)])
             
             return jsonify({
                 "message": "Flashcard deleted successfully",
@@ -503,7 +1435,7 @@ def handle_flashcard(card_id):
             return jsonify({"error": "Flashcard not found"}), 404
 
         data = request.get_json()
-        logger.debug(f"Updating flashcard {card_id} with data: {data}")
+        logger.debug("Updating flashcard %s with data: %s", card_id, payload(data))
         
         # Validate required fields
         required_fields = ["question", "type", "deck_id"]
@@ -513,41 +1445,29 @@ def handle_flashcard(card_id):
         
         # Generate new answer if question or type changed
         current_card = flashcards[card_id]
+        updated_card = dict(current_card)
         if data["question"] != current_card["question"] or data["type"] != current_card["type"]:
-            answer = generate_answer(data["question"], data["type"])
-        else:
-            answer = {"answer": current_card["answer"], "sources": []}
+            updated_card["answer"] = normalize_answer(generate_answer(data["question"], data["type"]))
+            # The new answer supersedes any answer still being generated in async mode
+            updated_card.pop("status", None)
+            updated_card.pop("job_id", None)
         
-        # Update flashcard
-        updated_card = {
-            "id": card_id,
+        # Update flashcard, keeping its review history and schedule
+        updated_card.update({
             "question": data["question"],
-            "answer": json.dumps(answer["answer"]) if isinstance(answer["answer"], dict) else json.dumps({
-                "answer": answer["answer"],
-                "explanation": answer.get("explanation", "")
-            }),
             "type": data["type"],
             "deck_id": data["deck_id"],
-            "created_at": current_card.get("created_at", datetime.now().isoformat()),
-            "updated_at": datetime.now().isoformat(),
-            "total_reviews": current_card.get("total_reviews", 0),
-            "correct_reviews": current_card.get("correct_reviews", 0),
-            "accuracy": current_card.get("accuracy", 0)
-        }
+            "updated_at": datetime.now().isoformat()
+        })
         
         flashcards[card_id] = updated_card
-        save_data()
-        logger.info(f"Successfully updated flashcard with ID: {card_id}")
-        
-        # Return the card with parsed answer
-        return_card = dict(updated_card)
-        if isinstance(answer["answer"], dict):
-            return_card["answer"] = answer["answer"]
-        else:
-            return_card["answer"] = json.loads(updated_card["answer"])
+        save_data([("flashcards", card_id)])
+        logger.info("Successfully updated flashcard with ID: %s", card_id)
         
-        return jsonify(return_card), 200
+        return jsonify(updated_card), 200
         
+    except RateLimited as e:
+        return quota_exhausted_response(e)
     except Exception as e:
         error_msg = f"Error updating flashcard: {str(e)}"
         logger.error(error_msg)
@@ -569,16 +1489,19 @@ def update_review_status(card_id):
         card["total_reviews"] = card.get("total_reviews", 0) + 1
         if data.get("correct", False):
             card["correct_reviews"] = card.get("correct_reviews", 0) + 1
+        flashcards.stats.record_review(card["deck_id"], data.get("correct", False))
         
         # Calculate accuracy
         card["accuracy"] = (card["correct_reviews"] / card["total_reviews"]) * 100
         
-        # Update last reviewed timestamp
+        # Update last reviewed timestamp and schedule the next review
         card["last_reviewed"] = datetime.now().isoformat()
+        card.update(sm2_schedule(card, review_quality(data.get("correct", False))))
         
         # Save changes
         flashcards[card_id] = card
-        save_data()
+        save_data([("flashcards", card_id)])
+        record_review_events([review_event(card, correct=bool(data.get("correct", False)))])
         
         return jsonify(card), 200
         
@@ -601,10 +1524,14 @@ def update_difficulty(card_id):
         # Update difficulty score
         card = flashcards[card_id]
         card["difficulty_score"] = data["score"]
+        quality = score_quality(data["score"])
+        if quality is not None:
+            card.update(sm2_schedule(card, quality))
         
         # Save changes
         flashcards[card_id] = card
-        save_data()
+        save_data([("flashcards", card_id)])
+        record_review_events([review_event(card, score=data["score"])])
         
         return jsonify(card), 200
         
@@ -613,5 +1540,93 @@ def update_difficulty(card_id):
         logger.error(error_msg)
         return jsonify({"error": error_msg}), 500
 
+def parse_event_time(value) -> float:
+    """Accept epoch milliseconds/seconds or an ISO timestamp; raises ValueError otherwise"""
+    if value is None:
+        return datetime.now().timestamp()
+    if isinstance(value, bool):
+        raise ValueError("timestamp must be a number or ISO string")
+    if isinstance(value, (int, float)):
+        # Browsers send Date.now() in milliseconds
+        return value / 1000 if value > 1e11 else float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+@app.route("/reviews:batch", methods=["POST", "OPTIONS"])
+def batch_reviews():
+    """Apply many review/score events atomically with a single storage commit"""
+    if request.method == "OPTIONS":
+        response = jsonify({})
+        response.headers.add('Access-Control-Allow-Methods', 'POST')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        return response
+
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict) or not isinstance(data.get("events"), list):
+            return jsonify({"error": "Request body must contain a list of events"}), 400
+
+        # Validate everything before touching any card so the batch applies all-or-nothing
+        events = []
+        errors = []
+        for index, event in enumerate(data["events"]):
+            if not isinstance(event, dict):
+                errors.append({"index": index, "error": "Event must be an object"})
+                continue
+            if event.get("card_id") not in flashcards:
+                errors.append({"index": index, "error": "Flashcard not found"})
+                continue
+            if "correct" not in event and "score" not in event:
+                errors.append({"index": index, "error": "Event needs correct or score"})
+                continue
+            try:
+                reviewed_at = parse_event_time(event.get("timestamp"))
+            except (TypeError, ValueError) as e:
+                errors.append({"index": index, "error": f"Invalid timestamp: {str(e)}"})
+                continue
+            events.append((reviewed_at, index, event))
+        if errors:
+            return jsonify({"error": "Invalid review events", "events": errors}), 400
+
+        # Apply in time order to copies of the cards, then swap them in together
+        events.sort(key=lambda item: (item[0], item[1]))
+        updated = {}
+        history = []
+        for reviewed_at, _, event in events:
+            card_id = event["card_id"]
+            card = updated.get(card_id)
+            if card is None:
+                card = updated[card_id] = dict(flashcards[card_id])
+            reviewed_time = datetime.fromtimestamp(reviewed_at)
+            correct = None
+            if "correct" in event:
+                correct = bool(event["correct"])
+                card["total_reviews"] = card.get("total_reviews", 0) + 1
+                if correct:
+                    card["correct_reviews"] = card.get("correct_reviews", 0) + 1
+                card["last_reviewed"] = reviewed_time.isoformat()
+                card.update(sm2_schedule(card, review_quality(correct), reviewed_time))
+            if "score" in event:
+                card["difficulty_score"] = event["score"]
+                quality = score_quality(event["score"])
+                if quality is not None:
+                    card.update(sm2_schedule(card, quality, reviewed_time))
+            history.append(review_event(card, correct, event.get("score"), reviewed_at))
+
+        for card_id, card in updated.items():
+            if card.get("total_reviews"):
+                card["accuracy"] = (card.get("correct_reviews", 0) / card["total_reviews"]) * 100
+            flashcards[card_id] = card
+
+        save_data([("flashcards", card_id) for card_id in updated])
+        record_review_events(history)
+        logger.info("Applied %s review events to %s cards", len(events), len(updated))
+
+        return jsonify({"applied": len(events), "cards": list(updated.values())}), 200
+
+    except Exception as e:
+        error_msg = f"Error applying review batch: {str(e)}"
+        logger.error(error_msg)
+        return jsonify({"error": error_msg}), 500
+
 if __name__ == "__main__":
     app.run(debug=True, port=8000)
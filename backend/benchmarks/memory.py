@@ -0,0 +1,53 @@
+"""Memory per card of the card representations a CardStore can hold.
+
+Run from ``backend/``::
+
+    python -m benchmarks.memory --cards 200000
+
+Cards are round-tripped through JSON first, like cards loaded from disk, so
+every card starts with its own copies of the deck id and type strings.
+"""
+import gc
+import sys
+import json
+import argparse
+import tracemalloc
+from typing import Any, Dict
+
+from benchmarks.seed import synthetic_data
+from db.card_record import CardRecord
+
+
+def measure(cards_json: str, convert) -> int:
+    """Bytes still allocated after decoding ``cards_json`` and converting every card"""
+    gc.collect()
+    tracemalloc.start()
+    cards = {card_id: convert(card) for card_id, card in json.loads(cards_json).items()}
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del cards
+    return size
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=100000)
+    parser.add_argument("--decks", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    _, cards = synthetic_data(args.cards, args.decks, args.seed)
+    cards_json = json.dumps({card["id"]: card for card in cards})
+
+    results: Dict[str, Any] = {"cards": args.cards}
+    for name, convert in (("dict", lambda card: card), ("compact", CardRecord)):
+        size = measure(cards_json, convert)
+        results[name] = {"total_mb": round(size / 2 ** 20, 1), "bytes_per_card": round(size / args.cards)}
+    results["saved"] = f"{1 - results['compact']['bytes_per_card'] / results['dict']['bytes_per_card']:.0%}"
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""Load and latency benchmark for the Flask (app.py) and FastAPI (main.py) backends.
+
+Run from ``backend/``::
+
+    python -m benchmarks.run --cards 100000 --decks 500 --requests 500
+
+Each app runs in its own process against a synthetic data set, with OpenAI and
+Google Custom Search replaced by local stub servers. Results (throughput and
+p50/p95/p99 latency per endpoint) are written as JSON; pass ``--compare`` with
+an earlier result file to flag regressions.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import itertools
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+
+APPS = ("flask", "fastapi")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure(call: Callable[[int], int], requests: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    """Time ``requests`` calls of ``call(i)`` (which returns an HTTP status) after ``warmup`` untimed ones"""
+    for i in range(warmup):
+        call(-1 - i)
+
+    def timed(i):
+        started = time.perf_counter()
+        status = call(i)
+        return time.perf_counter() - started, status
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = list(executor.map(timed, range(requests)))
+    else:
+        samples = [timed(i) for i in range(requests)]
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in samples)
+    return {
+        "requests": requests,
+        "errors": sum(1 for _, status in samples if status >= 400),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(latencies[-1], 3)
+    }
+
+
+def _flask_target(args):
+    started = time.perf_counter()
+    import app as flask_app
+    startup = time.perf_counter() - started
+    client = flask_app.app.test_client()
+
+    def request(method, path, body=None):
+        return client.open(path, method=method, json=body).status_code
+
+    return flask_app.decks, flask_app.flashcards, lambda deck: deck, request, startup, flask_app.review_log
+
+
+def _fastapi_target(args):
+    started = time.perf_counter()
+    import main as fastapi_app
+    from fastapi.testclient import TestClient
+    startup = time.perf_counter() - started
+    client = TestClient(fastapi_app.app)
+
+    def request(method, path, body=None):
+        return client.request(method, path, json=body).status_code
+
+    # main.py has no review endpoints
+    return fastapi_app.decks, fastapi_app.flashcards, fastapi_app.Deck.model_validate, request, startup, None
+
+
+def run_worker(args) -> Dict[str, Any]:
+    """Benchmark one app in this process (environment already prepared by ``main``)"""
+    sys.path.insert(0, BACKEND_DIR)
+    from benchmarks.seed import synthetic_data, synthetic_reviews
+
+    decks, flashcards, to_deck, request, startup, review_log = (
+        _flask_target if args.worker == "flask" else _fastapi_target)(args)
+
+    seeded = 0.0
+    if args.storage == "memory":
+        started = time.perf_counter()
+        deck_records, cards = synthetic_data(args.cards, args.decks, args.seed)
+        for deck_id, deck in deck_records.items():
+            decks[deck_id] = to_deck(deck)
+        for card in cards:
+            flashcards[card["id"]] = card
+        seeded = time.perf_counter() - started
+    if review_log is not None and args.reviews:
+        started = time.perf_counter()
+        pairs = [(card_id, flashcards[card_id]["deck_id"]) for card_id in itertools.islice(flashcards.keys(), 100000)]
+        events = synthetic_reviews(pairs, args.reviews, args.seed)
+        while True:
+            chunk = list(itertools.islice(events, 10000))
+            if not chunk:
+                break
+            review_log.append(chunk)
+        seeded += time.perf_counter() - started
+
+    rng = random.Random(args.seed)
+    deck_ids = [deck_id for deck_id in decks if flashcards.deck_card_ids(deck_id)] or list(decks)
+    card_ids = list(itertools.islice(flashcards.keys(), 10000))
+    picks = {name: [rng.choice(pool) for _ in range(args.requests + args.warmup)]
+             for name, pool in (("deck", deck_ids), ("card", card_ids))}
+
+    scenarios = {
+        "list_decks": lambda i: request("GET", "/decks"),
+        "deck_cards": lambda i: request("GET", f"/decks/{picks['deck'][i]}/flashcards"),
+        "deck_cards_page": lambda i: request("GET", f"/decks/{picks['deck'][i]}/flashcards?limit=50"),
+        "create_card": lambda i: request("POST", "/flashcards", {
+            "question": f"Benchmark question {i} about {rng.random()}",
+            "type": "basic",
+            "deck_id": picks["deck"][i]
+        }),
+    }
+    if review_log is not None:
+        scenarios["review"] = lambda i: request(
+            "POST", f"/flashcards/{picks['card'][i]}/reviewed", {"correct": i % 3 != 0})
+        scenarios["deck_analytics"] = lambda i: request("GET", f"/decks/{picks['deck'][i]}/analytics")
+
+    endpoints = {}
+    for name, call in scenarios.items():
+        if args.endpoints and name not in args.endpoints:
+            continue
+        endpoints[name] = measure(call, args.requests, args.concurrency, args.warmup)
+    return {
+        "startup_s": round(startup, 3),
+        "seed_s": round(seeded, 3),
+        "cards": len(flashcards),
+        "decks": len(decks),
+        "endpoints": endpoints
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Endpoints whose p95 grew by more than ``threshold`` (a fraction) over the baseline"""
+    regressions = []
+    for app_name, result in results["apps"].items():
+        base_endpoints = baseline.get("apps", {}).get(app_name, {}).get("endpoints", {})
+        for name, stats in result.get("endpoints", {}).items():
+            base = base_endpoints.get(name)
+            if not base or not base["p95_ms"]:
+                continue
+            change = stats["p95_ms"] / base["p95_ms"] - 1
+            stats["p95_change"] = round(change, 3)
+            if change > threshold:
+                regressions.append(f"{app_name} {name}: p95 {base['p95_ms']}ms -> {stats['p95_ms']}ms "
+                                   f"(+{change:.0%})")
+    return regressions
+
+
+def print_table(results: Dict[str, Any]):
+    print(f"{'app':8} {'endpoint':16} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for app_name, result in results["apps"].items():
+        if "error" in result:
+            print(f"{app_name:8} failed: {result['error']}")
+            continue
+        for name, stats in result["endpoints"].items():
+            print(f"{app_name:8} {name:16} {stats['throughput_rps']:>9} {stats['p50_ms']:>9} "
+                  f"{stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['errors']:>7}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--apps", nargs="+", choices=APPS, default=list(APPS))
+    parser.add_argument("--cards", type=int, default=10000, help="synthetic cards to seed")
+    parser.add_argument("--decks", type=int, default=100, help="decks the cards are spread over")
+    parser.add_argument("--storage", default="memory", choices=("memory", "json", "journal", "sqlite"),
+                        help="STORAGE_BACKEND of the benchmarked apps")
+    parser.add_argument("--reviews", type=int, default=0,
+                        help="synthetic review events logged before the run (app.py only)")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=1, help="client threads per endpoint")
+    parser.add_argument("--endpoints", nargs="+", help="only run these scenarios")
+    parser.add_argument("--provider-latency", type=float, default=0.0,
+                        help="seconds the OpenAI/Google stubs wait before replying")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to check for p95 regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="p95 growth (fraction) reported as a regression")
+    # app.py uses the openai 0.28 SDK and main.py the 1.x one, so each may need its own environment
+    parser.add_argument("--flask-python", default=sys.executable, help="interpreter running app.py")
+    parser.add_argument("--fastapi-python", default=sys.executable, help="interpreter running main.py")
+    parser.add_argument("--worker", choices=APPS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return 0
+
+    from benchmarks.seed import seed_repository
+    from benchmarks.stubs import StubProviders
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **{key: getattr(args, key) for key in ("cards", "decks", "reviews", "storage", "requests", "warmup",
+                                                    "concurrency", "provider_latency", "seed")}
+        },
+        "apps": {}
+    }
+    worker_args = list(argv if argv is not None else sys.argv[1:])
+    with StubProviders(latency=args.provider_latency) as stubs:
+        for app_name in args.apps:
+            with tempfile.TemporaryDirectory(prefix=f"studybuddy-bench-{app_name}-") as data_dir:
+                if args.storage != "memory":
+                    seed_repository(args.storage, data_dir, args.cards, args.decks, args.seed)
+                env = dict(os.environ, **stubs.env(), **{
+                    "STUDYBUDDY_DATA_DIR": data_dir,
+                    "STORAGE_BACKEND": args.storage,
+                    "ANSWER_CACHE_DIR": os.path.join(data_dir, 'answer_cache'),
+                    "HEALTH_CHECK_INTERVAL": "0",
+                    "SEARCH_INDEX_SAVE_INTERVAL": "3600",
+                    "LOG_LEVEL": "WARNING",
+                })
+                proc = subprocess.run(
+                    [getattr(args, f"{app_name}_python"), "-m", "benchmarks.run", *worker_args, "--worker", app_name],
+                    cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+                )
+                if proc.returncode != 0:
+                    results["apps"][app_name] = {"error": proc.stderr.strip().splitlines()[-1:]}
+                    continue
+                results["apps"][app_name] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        differing = [key for key in ("cards", "decks", "storage", "concurrency", "provider_latency")
+                     if baseline.get("meta", {}).get(key) != results["meta"][key]]
+        if differing:
+            print(f"Note: baseline was run with different settings ({', '.join(differing)})")
+        results["regressions"] = regressions
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print_table(results)
+    print(f"\nResults written to {output}")
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+from db.repository import create_repository
+
+CARD_TYPES = ("basic", "definition", "multiple_choice")
+_TOPICS = ("photosynthesis", "the French revolution", "binary search", "plate tectonics", "supply and demand",
+           "the krebs cycle", "Newton's second law", "recursion", "the Treaty of Versailles", "entropy")
+_FORMS = ("What is {}?", "Explain {}.", "Why does {} matter?", "Give an example of {}.", "Summarize {}.")
+
+
+def _deck(rng: random.Random, index: int) -> Dict[str, Any]:
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "name": f"Deck {index}",
+        "description": f"Synthetic deck {index}",
+        "is_public": True,
+        "created_at": datetime(2024, 1, 1).isoformat()
+    }
+
+
+def _card(rng: random.Random, index: int, deck_id: str, now: datetime) -> Dict[str, Any]:
+    created = now - timedelta(days=rng.randint(1, 365))
+    total = rng.randint(0, 20)
+    correct = rng.randint(0, total)
+    card = {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "question": f"{rng.choice(_FORMS).format(rng.choice(_TOPICS))} (#{index})",
+        "answer": {"answer": f"Synthetic answer {index}", "explanation": ""},
+        "type": rng.choice(CARD_TYPES),
+        "deck_id": deck_id,
+        "created_at": created.isoformat(),
+        "updated_at": created.isoformat(),
+        "total_reviews": total,
+        "correct_reviews": correct,
+        "accuracy": (correct / total) * 100 if total else 0
+    }
+    if total:
+        card["last_reviewed"] = (created + timedelta(days=rng.randint(0, 30))).isoformat()
+        card["due_at"] = (now + timedelta(days=rng.randint(-30, 30))).isoformat()
+    return card
+
+
+def synthetic_data(num_cards: int, num_decks: int, seed: int = 0) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """Decks and a lazily generated stream of cards spread over them; the same seed yields the same data"""
+    rng = random.Random(seed)
+    decks = {deck["id"]: deck for deck in (_deck(rng, i) for i in range(num_decks))}
+    deck_ids = list(decks)
+    now = datetime(2025, 1, 1)
+
+    def cards():
+        card_rng = random.Random(seed + 1)
+        for i in range(num_cards):
+            yield _card(card_rng, i, deck_ids[i % len(deck_ids)], now)
+
+    return decks, cards()
+
+
+def synthetic_reviews(cards: List[Tuple[str, str]], count: int, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """``count`` review/score events in time order over ``(card_id, deck_id)`` pairs, spread over a year"""
+    rng = random.Random(seed + 2)
+    started = datetime(2024, 1, 1).timestamp()
+    step = 365 * 86400 / max(count, 1)
+    for i in range(count):
+        card_id, deck_id = rng.choice(cards)
+        scored = rng.random() < 0.1
+        yield {
+            "card_id": card_id,
+            "deck_id": deck_id,
+            "reviewed_at": started + i * step,
+            "correct": None if scored else rng.random() < 0.7,
+            "score": rng.randint(1, 3) if scored else None
+        }
+
+
+def seed_repository(storage: str, data_dir: str, num_cards: int, num_decks: int, seed: int = 0):
+    """Write a synthetic data set where a benchmarked app using ``storage`` will load it"""
+    decks, cards = synthetic_data(num_cards, num_decks, seed)
+    # The journal backend starts from the JSON snapshot files
+    repository = create_repository("json" if storage == "journal" else storage, data_dir)
+    repository.save({"decks": decks, "flashcards": {card["id"]: card for card in cards}})
+    repository.close()
@@ -0,0 +1,91 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class _ProviderHandler(BaseHTTPRequestHandler):
+    """Answers the OpenAI and Google Custom Search calls the backends make"""
+
+    protocol_version = "HTTP/1.1"
+    # Keep-alive replies would otherwise wait on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body: dict):
+        time.sleep(self.server.latency)
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path.endswith("/models"):
+            self._reply({"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model", "owned_by": "stub"}]})
+        elif path.endswith("/customsearch/v1"):
+            self._reply({"items": [
+                {"title": f"Result {i}", "link": f"https://example.com/{i}", "snippet": f"Synthetic snippet {i}."}
+                for i in range(1, 4)
+            ]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if not urlparse(self.path).path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        content = json.dumps({"answer": "A synthetic answer [1]", "explanation": "Served by the benchmark stub."})
+        self._reply({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "gpt-3.5-turbo",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 250, "completion_tokens": 40, "total_tokens": 290}
+        })
+
+
+class StubProviders:
+    """Local HTTP server standing in for OpenAI and Google Custom Search.
+
+    Every reply is delayed by ``latency`` seconds so provider round trips can
+    be simulated without network access or API keys.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ProviderHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self._thread = threading.Thread(target=self.server.serve_forever, name="provider-stubs", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict:
+        """Environment pointing both backends at the stubs"""
+        return {
+            "OPENAI_API_KEY": "sk-benchmark",
+            "OPENAI_API_BASE": f"{self.url}/v1",
+            "OPENAI_BASE_URL": f"{self.url}/v1",
+            "GOOGLE_API_KEY": "benchmark",
+            "GOOGLE_CSE_ID": "benchmark",
+            "GOOGLE_SEARCH_URL": f"{self.url}/customsearch/v1",
+        }
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,215 @@
+import sys
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, Optional, Union
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Fields kept as they are; ``type`` and ``deck_id`` repeat across many cards and are interned
+_PLAIN = ("id", "question", "answer", "type", "deck_id", "total_reviews", "correct_reviews", "accuracy")
+_INTERNED = frozenset(("type", "deck_id"))
+# ISO timestamps are stored as integer microseconds since the epoch
+_TIMESTAMPS = {
+    "created_at": "_created_at",
+    "updated_at": "_updated_at",
+    "last_reviewed": "_last_reviewed",
+    "due_at": "_due_at",
+}
+_FIELD_ORDER = ("id", "question", "answer", "type", "deck_id", "created_at", "updated_at",
+                "total_reviews", "correct_reviews", "accuracy", "last_reviewed", "due_at")
+# (key, slot descriptor, is a timestamp) in serialization order; filled in below the class
+_LAYOUT = []
+
+
+def encode_timestamp(value: Any) -> Any:
+    """Integer microseconds for a naive ISO timestamp that converts back unchanged; other values as given"""
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is not None:
+        return value
+    delta = parsed - _EPOCH
+    micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    if decode_timestamp(micros) != value:
+        # e.g. date-only strings or other precisions; keep the original text
+        return value
+    return micros
+
+
+# "YYYY-MM-DDT" prefixes by day number; cards cluster on few days, so this stays small
+_DAY_PREFIXES: Dict[int, str] = {}
+_MICROS_PER_DAY = 86400 * 1000000
+
+
+def _format_micros(micros: int) -> str:
+    """``(_EPOCH + timedelta(microseconds=micros)).isoformat()`` without building a datetime"""
+    days, micros = divmod(micros, _MICROS_PER_DAY)
+    prefix = _DAY_PREFIXES.get(days)
+    if prefix is None:
+        try:
+            day = _EPOCH + timedelta(days=days)
+        except OverflowError:
+            return (_EPOCH + timedelta(microseconds=days * _MICROS_PER_DAY + micros)).isoformat()
+        prefix = f"{day.year:04d}-{day.month:02d}-{day.day:02d}T"
+        if len(_DAY_PREFIXES) < 10000:
+            _DAY_PREFIXES[days] = prefix
+    seconds, micros = divmod(micros, 1000000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if micros:
+        return f"{prefix}{hours:02d}:{minutes:02d}:{seconds:02d}.{micros:06d}"
+    return f"{prefix}{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def decode_timestamp(value: Any) -> Any:
+    if type(value) is int:
+        return _format_micros(value)
+    return value
+
+
+class CardRecord(MutableMapping):
+    """Compact flashcard behaving like the card dict it replaces.
+
+    Known fields live in ``__slots__`` (an unset slot means the key is absent),
+    ``deck_id``/``type`` strings are interned and timestamps are kept as epoch
+    microseconds; anything else (SM-2 fields, ``status``...) goes to a small
+    overflow dict. Reads return the API shape, so ``card["created_at"]`` is
+    still an ISO string and ``to_dict`` yields exactly the original dict.
+    """
+
+    __slots__ = _PLAIN + tuple(_TIMESTAMPS.values()) + ("_extra",)
+
+    def __init__(self, card: Optional[Dict[str, Any]] = None):
+        self._extra = None
+        if card:
+            for key, value in card.items():
+                self[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        slot = _TIMESTAMPS.get(key)
+        try:
+            if slot is not None:
+                return decode_timestamp(object.__getattribute__(self, slot))
+            if key in _PLAIN:
+                return object.__getattribute__(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key: str, value: Any):
+        slot = _TIMESTAMPS.get(key)
+        if slot is not None:
+            object.__setattr__(self, slot, encode_timestamp(value))
+        elif key in _PLAIN:
+            if key in _INTERNED and type(value) is str:
+                value = sys.intern(value)
+            object.__setattr__(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        slot = _TIMESTAMPS.get(key, key if key in _PLAIN else None)
+        if slot is not None:
+            try:
+                object.__delattr__(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+            return
+        if self._extra is None:
+            raise KeyError(key)
+        del self._extra[key]
+        if not self._extra:
+            self._extra = None
+
+    def __contains__(self, key: object) -> bool:
+        slot = _TIMESTAMPS.get(key, key if key in _PLAIN else None)
+        if slot is not None:
+            return hasattr(self, slot)
+        return self._extra is not None and key in self._extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __iter__(self) -> Iterator[str]:
+        for key in _FIELD_ORDER:
+            if hasattr(self, _TIMESTAMPS.get(key, key)):
+                yield key
+        if self._extra is not None:
+            yield from list(self._extra)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (CardRecord, dict)):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"CardRecord({self.to_dict()!r})"
+
+    def __copy__(self) -> "CardRecord":
+        return CardRecord(self.to_dict())
+
+    def __deepcopy__(self, memo: dict) -> "CardRecord":
+        import copy
+        return CardRecord(copy.deepcopy(self.to_dict(), memo))
+
+    def __reduce__(self):
+        return (CardRecord, (self.to_dict(),))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The API (and storage) shape of the card"""
+        card = {}
+        for key, descriptor, is_timestamp in _LAYOUT:
+            try:
+                value = descriptor.__get__(self)
+            except AttributeError:
+                continue
+            if is_timestamp and type(value) is int:
+                value = _format_micros(value)
+            card[key] = value
+        if self._extra is not None:
+            card.update(self._extra)
+        return card
+
+    # Attribute access used by the index helpers (card_deck_id, card_sort_key, card_due_timestamp)
+    @property
+    def created_at(self) -> Optional[str]:
+        return self.get("created_at")
+
+    @property
+    def updated_at(self) -> Optional[str]:
+        return self.get("updated_at")
+
+    @property
+    def last_reviewed(self) -> Optional[str]:
+        return self.get("last_reviewed")
+
+    @property
+    def due_at(self) -> Optional[str]:
+        return self.get("due_at")
+
+
+_LAYOUT.extend(
+    (key, CardRecord.__dict__[_TIMESTAMPS.get(key, key)], key in _TIMESTAMPS) for key in _FIELD_ORDER
+)
+
+
+def compact_card(card: Union[Dict[str, Any], Any]) -> Any:
+    """Convert a card dict into a ``CardRecord``; records and model objects are returned unchanged"""
+    if type(card) is dict:
+        return CardRecord(card)
+    return card
@@ -0,0 +1,285 @@
+import json
+import time
+import base64
+import bisect
+import itertools
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .card_record import compact_card
+from .deck_stats import DeckStats
+from .due_queue import DueQueue, card_due_timestamp
+from .near_duplicates import NearDuplicateIndex
+from .search_index import SearchIndex
+
+
+def card_deck_id(card: Any) -> Optional[str]:
+    """Return the deck id of a card stored either as a dict or as a model object"""
+    if isinstance(card, dict):
+        return card.get("deck_id")
+    return getattr(card, "deck_id", None)
+
+
+def card_question(card: Any) -> str:
+    if isinstance(card, dict):
+        return card.get("question") or ""
+    return getattr(card, "question", None) or ""
+
+
+def card_text(card: Any) -> str:
+    """Searchable text of a card: its question plus every string in its answer"""
+    answer = card.get("answer") if isinstance(card, dict) else getattr(card, "answer", None)
+    parts = [card_question(card)]
+    stack = [answer]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, str):
+            parts.append(value)
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+    return "\n".join(parts)
+
+
+def card_sort_key(card_id: str, card: Any) -> Tuple[str, str]:
+    """Stable position of a card within its deck: creation time, then id"""
+    if isinstance(card, dict):
+        created_at = card.get("created_at")
+    else:
+        created_at = getattr(card, "created_at", None)
+    return (created_at or "", card_id)
+
+
+def encode_cursor(key: Tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Parse a pagination cursor; raises ValueError if it is malformed"""
+    try:
+        created_at, card_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return (str(created_at), str(card_id))
+
+
+def iter_pages(fetch_page: Callable[[Optional[Tuple[str, str]], int], Tuple[List[Any], Optional[Tuple[str, str]]]],
+               after: Optional[Tuple[str, str]] = None, limit: Optional[int] = None,
+               chunk_size: int = 500) -> Iterator[Any]:
+    """Yield the cards of successive keyset pages from ``fetch_page(after, size)``"""
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = chunk_size if remaining is None else min(chunk_size, remaining)
+        cards, after = fetch_page(after, size)
+        yield from cards
+        if remaining is not None:
+            remaining -= len(cards)
+        if after is None:
+            return
+
+
+class CardStore(dict):
+    """Flashcard mapping that keeps a ``deck_id -> card ids`` index in sync.
+
+    Behaves like the plain ``{card_id: card}`` dict it replaces (including JSON
+    serialization), but deck-scoped reads and cascading deletes only touch the
+    cards of that deck instead of scanning every card in the system. Card and
+    review counters per deck are kept in ``stats``, due times in ``due``,
+    question signatures for near-duplicate lookups in ``duplicates``, an
+    inverted index of the card text in ``search``, and
+    every change to a deck bumps its version so serialized deck payloads can be
+    cached. Each deck's cards are also kept sorted by ``card_sort_key`` so they
+    can be paged with keyset cursors. With ``compact`` set, card dicts are
+    stored as ``CardRecord`` objects, so callers must read a card back from
+    the store before changing it in place. Writes and the deck index reads
+    that depend on them hold ``_lock``, as the job, batch and ingestion
+    workers write from background threads.
+    """
+
+    def __init__(self, cards: Optional[Dict[str, Any]] = None, compact: bool = False):
+        super().__init__()
+        self.compact = compact
+        self._by_deck: Dict[str, Dict[str, None]] = {}
+        self._order: Dict[str, List[Tuple[str, str]]] = {}
+        self.stats = DeckStats()
+        self.due = DueQueue()
+        self.duplicates = NearDuplicateIndex()
+        self.search = SearchIndex()
+        self._versions = itertools.count(1)
+        self._deck_versions: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.RLock()
+        if cards:
+            self.update(cards)
+
+    def _index(self, card_id: str, card: Any):
+        deck_id = card_deck_id(card)
+        self._by_deck.setdefault(deck_id, {})[card_id] = None
+        bisect.insort(self._order.setdefault(deck_id, []), card_sort_key(card_id, card))
+        self.stats.add_card(deck_id, card)
+        self.due.schedule(deck_id, card_id, card_due_timestamp(card))
+        self.duplicates.add(deck_id, card_id, card_question(card))
+        self.search.add(deck_id, card_id, card_text(card))
+        self.touch(deck_id)
+
+    def _unindex(self, card_id: str, card: Any, deck_id: Optional[str] = None):
+        if deck_id is None:
+            deck_id = card_deck_id(card)
+        deck_cards = self._by_deck.get(deck_id)
+        if deck_cards is not None:
+            deck_cards.pop(card_id, None)
+            if not deck_cards:
+                del self._by_deck[deck_id]
+        self._remove_order_key(deck_id, card_sort_key(card_id, card))
+        self.stats.remove_card(deck_id, card)
+        self.due.remove(card_id)
+        self.duplicates.remove(card_id)
+        self.search.remove(card_id)
+        self.touch(deck_id)
+
+    def _reindex(self, card_id: str, old: Any, card: Any):
+        """Update the indexes of a card replaced within the same deck.
+
+        Review and score updates take this path, so the sort order, question
+        signature and search terms are only rebuilt when their input changed.
+        """
+        deck_id = card_deck_id(card)
+        old_key, key = card_sort_key(card_id, old), card_sort_key(card_id, card)
+        if old_key != key:
+            self._remove_order_key(deck_id, old_key)
+            bisect.insort(self._order.setdefault(deck_id, []), key)
+        self.stats.remove_card(deck_id, old)
+        self.stats.add_card(deck_id, card)
+        self.due.schedule(deck_id, card_id, card_due_timestamp(card))
+        self.duplicates.add(deck_id, card_id, card_question(card))
+        self.search.add(deck_id, card_id, card_text(card))
+        self.touch(deck_id)
+
+    def _remove_order_key(self, deck_id: Optional[str], key: Tuple[str, str]):
+        order = self._order.get(deck_id)
+        if order is None:
+            return
+        position = bisect.bisect_left(order, key)
+        if position < len(order) and order[position] == key:
+            del order[position]
+        if not order:
+            del self._order[deck_id]
+
+    def __setitem__(self, card_id: str, card: Any):
+        if self.compact:
+            card = compact_card(card)
+        with self._lock:
+            old = dict.get(self, card_id)
+            if old is not None and card_deck_id(old) == card_deck_id(card):
+                super().__setitem__(card_id, card)
+                self._reindex(card_id, old, card)
+                return
+            if old is not None:
+                self._unindex(card_id, old)
+            super().__setitem__(card_id, card)
+            self._index(card_id, card)
+
+    def __delitem__(self, card_id: str):
+        with self._lock:
+            card = dict.__getitem__(self, card_id)
+            super().__delitem__(card_id)
+            self._unindex(card_id, card)
+
+    _MISSING = object()
+
+    def pop(self, card_id: str, default: Any = _MISSING):
+        with self._lock:
+            if card_id not in self:
+                if default is CardStore._MISSING:
+                    raise KeyError(card_id)
+                return default
+            card = dict.__getitem__(self, card_id)
+            del self[card_id]
+            return card
+
+    def popitem(self):
+        with self._lock:
+            card_id, card = super().popitem()
+            self._unindex(card_id, card)
+            return card_id, card
+
+    def setdefault(self, card_id: str, default: Any = None):
+        with self._lock:
+            if card_id not in self:
+                self[card_id] = default
+            return dict.__getitem__(self, card_id)
+
+    def update(self, *args, **kwargs):
+        for card_id, card in dict(*args, **kwargs).items():
+            self[card_id] = card
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._by_deck.clear()
+            self._order.clear()
+            self.stats.clear()
+            self.due.clear()
+            self.duplicates.clear()
+            self.search.clear()
+            self._deck_versions.clear()
+
+    def refresh(self, card_id: str):
+        """Re-index the text of a card whose question or answer was changed in place"""
+        with self._lock:
+            card = dict.__getitem__(self, card_id)
+            deck_id = card_deck_id(card)
+            self.duplicates.add(deck_id, card_id, card_question(card))
+            self.search.add(deck_id, card_id, card_text(card))
+            self.touch(deck_id)
+
+    def touch(self, deck_id: Optional[str]):
+        """Mark a deck as changed, e.g. after one of its cards was mutated in place"""
+        with self._lock:
+            self._deck_versions[deck_id] = (next(self._versions), time.time())
+
+    def deck_version(self, deck_id: str) -> Tuple[int, float]:
+        """Return ``(version, modified_at)`` of a deck's card set"""
+        return self._deck_versions.get(deck_id, (0, 0.0))
+
+    def deck_card_ids(self, deck_id: str) -> List[str]:
+        with self._lock:
+            return list(self._by_deck.get(deck_id, ()))
+
+    def deck_cards(self, deck_id: str) -> List[Any]:
+        """Return the cards of a deck in their stable order"""
+        with self._lock:
+            return [dict.__getitem__(self, card_id) for _, card_id in self._order.get(deck_id, ())]
+
+    def deck_page(self, deck_id: str, after: Optional[Tuple[str, str]] = None,
+                  limit: Optional[int] = None) -> Tuple[List[Any], Optional[Tuple[str, str]]]:
+        """Return up to ``limit`` cards following the ``after`` key and the key to continue from"""
+        with self._lock:
+            order = self._order.get(deck_id, [])
+            start = bisect.bisect_right(order, after) if after is not None else 0
+            end = len(order) if limit is None else start + limit
+            keys = order[start:end]
+            cards = [dict.__getitem__(self, card_id) for _, card_id in keys]
+            next_key = keys[-1] if keys and end < len(order) else None
+        return cards, next_key
+
+    def iter_deck_cards(self, deck_id: str, after: Optional[Tuple[str, str]] = None,
+                        limit: Optional[int] = None, chunk_size: int = 500) -> Iterator[Any]:
+        """Yield a deck's cards chunk by chunk without materializing the whole deck"""
+        return iter_pages(lambda key, size: self.deck_page(deck_id, key, size), after, limit, chunk_size)
+
+    def delete_deck_cards(self, deck_id: str) -> List[str]:
+        """Remove every card of a deck and return the deleted ids"""
+        with self._lock:
+            card_ids = list(self._by_deck.pop(deck_id, ()))
+            self._order.pop(deck_id, None)
+            for card_id in card_ids:
+                self.stats.remove_card(deck_id, dict.__getitem__(self, card_id))
+                self.due.remove(card_id)
+                self.duplicates.remove(card_id)
+                self.search.remove(card_id)
+                super().__delitem__(card_id)
+            self.touch(deck_id)
+        return card_ids
+
+    def deck_ids(self) -> Iterable[str]:
+        return self._by_deck.keys()
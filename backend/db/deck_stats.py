@@ -0,0 +1,60 @@
+import threading
+from typing import Any, Dict, Optional
+
+
+def _card_counter(card: Any, name: str) -> int:
+    if isinstance(card, dict):
+        return card.get(name, 0) or 0
+    return getattr(card, name, 0) or 0
+
+
+def _accuracy(total_reviews: int, correct_reviews: int) -> float:
+    return (correct_reviews / total_reviews) * 100 if total_reviews else 0
+
+
+class DeckStats:
+    """Per-deck and global card/review counters maintained in O(1) per change"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._decks: Dict[Optional[str], Dict[str, int]] = {}
+        self._totals = {"card_count": 0, "total_reviews": 0, "correct_reviews": 0}
+
+    def _apply(self, deck_id: Optional[str], cards: int, total: int, correct: int):
+        with self._lock:
+            counters = self._decks.setdefault(
+                deck_id, {"card_count": 0, "total_reviews": 0, "correct_reviews": 0})
+            for target in (counters, self._totals):
+                target["card_count"] += cards
+                target["total_reviews"] += total
+                target["correct_reviews"] += correct
+            if counters["card_count"] == 0:
+                del self._decks[deck_id]
+
+    def add_card(self, deck_id: Optional[str], card: Any):
+        self._apply(deck_id, 1, _card_counter(card, "total_reviews"), _card_counter(card, "correct_reviews"))
+
+    def remove_card(self, deck_id: Optional[str], card: Any):
+        self._apply(deck_id, -1, -_card_counter(card, "total_reviews"), -_card_counter(card, "correct_reviews"))
+
+    def record_review(self, deck_id: Optional[str], correct: bool):
+        """Count a review of a card whose counters were incremented in place"""
+        self._apply(deck_id, 0, 1, 1 if correct else 0)
+
+    def clear(self):
+        with self._lock:
+            self._decks.clear()
+            self._totals = {"card_count": 0, "total_reviews": 0, "correct_reviews": 0}
+
+    def deck(self, deck_id: str) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._decks.get(
+                deck_id, {"card_count": 0, "total_reviews": 0, "correct_reviews": 0}))
+        counters["accuracy"] = _accuracy(counters["total_reviews"], counters["correct_reviews"])
+        return counters
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._totals)
+        counters["accuracy"] = _accuracy(counters["total_reviews"], counters["correct_reviews"])
+        return counters
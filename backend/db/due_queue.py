@@ -0,0 +1,104 @@
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def card_due_timestamp(card: Any) -> float:
+    """Due time of a card as epoch seconds; unreviewed cards are due from creation"""
+    if isinstance(card, dict):
+        due_at = card.get("due_at") or card.get("created_at")
+    else:
+        due_at = getattr(card, "due_at", None) or getattr(card, "created_at", None)
+    if not due_at:
+        return 0.0
+    try:
+        return datetime.fromisoformat(due_at).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class DueQueue:
+    """Per-deck min-heaps of ``(due time, card id)`` with lazy invalidation.
+
+    Rescheduling or removing a card leaves its old heap entry in place and
+    records the live entry in ``_entries``; stale entries are skipped when
+    popped and the heap is rebuilt once they outnumber live ones. Stale
+    entries are counted per deck so that check is O(1).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heaps: Dict[Optional[str], List[Tuple[float, int, str]]] = {}
+        self._entries: Dict[str, Tuple[Optional[str], float, int]] = {}
+        self._stale: Dict[Optional[str], int] = {}
+        self._seq = itertools.count()
+
+    def schedule(self, deck_id: Optional[str], card_id: str, due: float):
+        with self._lock:
+            seq = next(self._seq)
+            old = self._entries.get(card_id)
+            if old is not None:
+                self._stale[old[0]] = self._stale.get(old[0], 0) + 1
+                if old[0] != deck_id:
+                    self._maybe_rebuild_locked(old[0])
+            self._entries[card_id] = (deck_id, due, seq)
+            heap = self._heaps.setdefault(deck_id, [])
+            heapq.heappush(heap, (due, seq, card_id))
+            self._maybe_rebuild_locked(deck_id)
+
+    def remove(self, card_id: str):
+        with self._lock:
+            entry = self._entries.pop(card_id, None)
+            if entry is not None:
+                self._stale[entry[0]] = self._stale.get(entry[0], 0) + 1
+                self._maybe_rebuild_locked(entry[0])
+
+    def clear(self):
+        with self._lock:
+            self._heaps.clear()
+            self._entries.clear()
+            self._stale.clear()
+
+    def _is_live(self, item: Tuple[float, int, str]) -> bool:
+        entry = self._entries.get(item[2])
+        return entry is not None and entry[2] == item[1]
+
+    def _maybe_rebuild_locked(self, deck_id: Optional[str]):
+        heap = self._heaps.get(deck_id)
+        if not heap or len(heap) < 64 or 2 * self._stale.get(deck_id, 0) < len(heap):
+            return
+        live = [item for item in heap if self._is_live(item)]
+        heapq.heapify(live)
+        self._stale.pop(deck_id, None)
+        if live:
+            self._heaps[deck_id] = live
+        else:
+            del self._heaps[deck_id]
+
+    def due(self, deck_id: str, limit: int, now: float) -> Tuple[List[str], Optional[float]]:
+        """Return up to ``limit`` card ids due at ``now`` (earliest first) and the next due time after them.
+
+        Pops at most ``limit`` live entries plus the stale ones in front of them
+        and pushes the live ones back, so a fetch costs O(k log n).
+        """
+        with self._lock:
+            heap = self._heaps.get(deck_id)
+            if not heap:
+                return [], None
+            taken = []
+            next_due = None
+            while heap:
+                item = heap[0]
+                if not self._is_live(item):
+                    heapq.heappop(heap)
+                    self._stale[deck_id] = max(self._stale.get(deck_id, 0) - 1, 0)
+                    continue
+                if item[0] > now or len(taken) >= limit:
+                    next_due = item[0]
+                    break
+                taken.append(heapq.heappop(heap))
+            for item in taken:
+                heapq.heappush(heap, item)
+            return [item[2] for item in taken], next_due
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Journal:
+    """Append-only write-ahead journal with group commit and background compaction.
+
+    Every mutation is appended as one compact JSON line. Records are buffered and
+    fsynced together by a background committer thread, so concurrent writers share
+    a single fsync. Once the journal grows past ``compact_threshold`` records the
+    committer rewrites the snapshot files and truncates the journal.
+    """
+
+    def __init__(self, path: str, snapshot_files: Dict[str, str],
+                 commit_interval: float = 0.01, compact_threshold: int = 5000):
+        self.path = path
+        self.snapshot_files = snapshot_files
+        self.commit_interval = commit_interval
+        self.compact_threshold = compact_threshold
+
+        self.rotated_path = path + '.old'
+
+        self._lock = threading.Lock()
+        self._compact_lock = threading.Lock()
+        self._committed = threading.Condition(self._lock)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._appended_seq = 0
+        self._synced_seq = 0
+        self._records_since_compaction = 0
+        self.bytes_written = 0
+        self._snapshot_source: Optional[Callable[[], Dict[str, dict]]] = None
+        self._closed = False
+
+        self._committer = threading.Thread(target=self._run_committer, name="journal-committer", daemon=True)
+        self._committer.start()
+
+    def load(self) -> Dict[str, dict]:
+        """Read the snapshot files and replay the journal on top of them"""
+        collections = {}
+        for name, snapshot_path in self.snapshot_files.items():
+            if os.path.exists(snapshot_path):
+                with open(snapshot_path, 'r', encoding='utf-8') as f:
+                    collections[name] = json.load(f)
+            else:
+                collections[name] = {}
+
+        replayed = 0
+        # A journal rotated by an interrupted compaction precedes the current one
+        for journal_path in (self.rotated_path, self.path):
+            if not os.path.exists(journal_path):
+                continue
+            with open(journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A torn final write from a crash; everything before it is intact
+                        logger.warning("Ignoring truncated journal record")
+                        break
+                    target = collections.setdefault(record["c"], {})
+                    if record["op"] == "put":
+                        target[record["k"]] = record["v"]
+                    elif record["op"] == "del":
+                        target.pop(record["k"], None)
+                    replayed += 1
+
+        with self._lock:
+            self._records_since_compaction = replayed
+        logger.info("Loaded snapshot and replayed %s journal records", replayed)
+        return collections
+
+    def set_snapshot_source(self, source: Callable[[], Dict[str, dict]]):
+        """Register the callable that returns the live collections for compaction"""
+        self._snapshot_source = source
+
+    def put(self, collection: str, key: str, value: dict, wait: bool = True):
+        self._append({"op": "put", "c": collection, "k": key, "v": value}, wait)
+
+    def delete(self, collection: str, key: str, wait: bool = True):
+        self._append({"op": "del", "c": collection, "k": key}, wait)
+
+    def _append(self, record: dict, wait: bool):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self.bytes_written += len(line)
+            self._appended_seq += 1
+            self._records_since_compaction += 1
+            seq = self._appended_seq
+            if wait:
+                # Block until the committer has fsynced a group containing this record
+                while self._synced_seq < seq and not self._closed:
+                    self._committed.wait()
+
+    def commit(self):
+        """Wait until every record appended so far is part of a committed group"""
+        with self._lock:
+            seq = self._appended_seq
+            while self._synced_seq < seq and not self._closed:
+                self._committed.wait()
+
+    def _sync_locked(self):
+        if self._synced_seq == self._appended_seq:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._synced_seq = self._appended_seq
+        self._committed.notify_all()
+
+    def _run_committer(self):
+        while True:
+            time.sleep(self.commit_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                try:
+                    self._sync_locked()
+                except Exception as e:
+                    logger.error("Error committing journal: %s", e)
+                needs_compaction = self._records_since_compaction >= self.compact_threshold
+            if needs_compaction and self._snapshot_source is not None:
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error("Error compacting journal: %s", e)
+
+    def compact(self):
+        """Write the live collections as a new snapshot and truncate the journal.
+
+        Only taking the snapshot and rotating the journal happen under the lock;
+        serializing and fsyncing the snapshot run outside it so writers are not
+        stalled. Until the snapshot is in place the rotated journal stays on
+        disk and ``load`` replays it before the current one. Put records carry
+        the full value, so replaying a record that is already reflected in the
+        snapshot is harmless.
+        """
+        if self._snapshot_source is None:
+            return
+        with self._compact_lock:
+            with self._lock:
+                if os.path.exists(self.rotated_path):
+                    # A previous compaction died before its snapshot landed;
+                    # keep its records in front of the ones rotated now
+                    self._sync_locked()
+                    self._file.close()
+                    with open(self.rotated_path, 'a', encoding='utf-8') as rotated, \
+                            open(self.path, 'r', encoding='utf-8') as current:
+                        rotated.write(current.read())
+                        rotated.flush()
+                        os.fsync(rotated.fileno())
+                    os.remove(self.path)
+                else:
+                    self._sync_locked()
+                    self._file.close()
+                    os.replace(self.path, self.rotated_path)
+                self._file = open(self.path, 'w', encoding='utf-8')
+                self._records_since_compaction = 0
+                collections = {
+                    name: {key: dict(value) for key, value in list(items.items())}
+                    for name, items in self._snapshot_source().items()
+                }
+
+            for name, items in collections.items():
+                snapshot_path = self.snapshot_files[name]
+                tmp_path = snapshot_path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(items, f, separators=(',', ':'))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, snapshot_path)
+            os.remove(self.rotated_path)
+        logger.info("Compacted journal into snapshot")
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._sync_locked()
+            self._closed = True
+            self._file.close()
+            self._committed.notify_all()
@@ -1,9 +1,10 @@
 from typing import Dict
-from ..models.deck import Deck, Flashcard
+from ..models.deck import Deck
+from .card_store import CardStore
 
 # In-memory storage
 decks: Dict[str, Deck] = {}
-flashcards: Dict[str, Flashcard] = {}
+flashcards: CardStore = CardStore(compact=True)
 
 # Add a test deck on startup
 test_deck_id = "test-deck-123"
@@ -17,11 +18,11 @@ decks[test_deck_id] = test_deck
 
 # Add a test flashcard
 test_card_id = "test-card-123"
-test_card = Flashcard(
-    id=test_card_id,
-    question="What is the capital of France?",
-    answer="Paris is the capital of France.",
-    type="basic",
-    deck_id=test_deck_id
-)
+test_card = {
+    "id": test_card_id,
+    "question": "What is the capital of France?",
+    "answer": "Paris is the capital of France.",
+    "type": "basic",
+    "deck_id": test_deck_id
+}
 flashcards[test_card_id] = test_card
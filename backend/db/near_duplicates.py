@@ -0,0 +1,165 @@
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+NUM_PERMUTATIONS = 32
+BANDS = 8
+ROWS = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+# Multiplier and offset of the universal hash that spreads shingles over the bins
+_A = 0x5851F42D4C957F2D % _PRIME
+_B = 0x14057B7EF767814F % _PRIME
+
+
+def shingles(text: str) -> Set[int]:
+    """Hashed character 3-grams of the normalized question text.
+
+    Signatures are never persisted, so the process-local ``hash`` is good enough.
+    """
+    text = " ".join(_NON_WORD.sub(" ", text.lower()).split())
+    if len(text) < SHINGLE_SIZE:
+        text = text.ljust(SHINGLE_SIZE)
+    return {hash(text[i:i + SHINGLE_SIZE]) & _MAX_HASH for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """One-permutation MinHash signature with ``NUM_PERMUTATIONS`` bins.
+
+    Every shingle is hashed once and only lowers the minimum of its own bin,
+    so a signature costs one hash per shingle instead of one per shingle and
+    permutation. Empty bins borrow the value of the next filled bin to their
+    right, tagged with the distance, as in densified one-permutation hashing.
+    """
+    bins: List[Optional[int]] = [None] * NUM_PERMUTATIONS
+    for value in shingles(text):
+        mixed = (_A * value + _B) % _PRIME
+        index = mixed % NUM_PERMUTATIONS
+        mixed //= NUM_PERMUTATIONS
+        current = bins[index]
+        if current is None or mixed < current:
+            bins[index] = mixed
+    signature = list(bins)
+    for index in range(NUM_PERMUTATIONS):
+        if signature[index] is None:
+            for distance in range(1, NUM_PERMUTATIONS):
+                borrowed = bins[(index + distance) % NUM_PERMUTATIONS]
+                if borrowed is not None:
+                    signature[index] = -(borrowed * NUM_PERMUTATIONS + distance)
+                    break
+    return tuple(signature)
+
+
+def similarity(left: Tuple[int, ...], right: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(left, right) if x == y) / NUM_PERMUTATIONS
+
+
+class NearDuplicateIndex:
+    """Incremental MinHash/LSH index of card questions, scoped per deck.
+
+    Each signature is cut into ``BANDS`` bands; cards sharing any band land in
+    the same bucket and become candidates. Lookups only compare against those
+    candidates instead of every card of the deck, and ``clusters`` only visits
+    buckets holding more than one card.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signatures: Dict[str, Tuple[Optional[str], Tuple[int, ...], str]] = {}
+        self._buckets: Dict[Optional[str], Dict[Tuple[int, Tuple[int, ...]], Set[str]]] = {}
+
+    @staticmethod
+    def _bands(signature: Tuple[int, ...]):
+        for band in range(BANDS):
+            yield band, signature[band * ROWS:(band + 1) * ROWS]
+
+    def add(self, deck_id: Optional[str], card_id: str, question: str):
+        """Index a card's question; a no-op if it is already indexed with the same question"""
+        question = question or ""
+        entry = self._signatures.get(card_id)
+        if entry is not None and entry[0] == deck_id and entry[2] == question:
+            return
+        signature = minhash(question)
+        with self._lock:
+            self._remove_locked(card_id)
+            self._signatures[card_id] = (deck_id, signature, question)
+            buckets = self._buckets.setdefault(deck_id, {})
+            for key in self._bands(signature):
+                buckets.setdefault(key, set()).add(card_id)
+
+    def remove(self, card_id: str):
+        with self._lock:
+            self._remove_locked(card_id)
+
+    def _remove_locked(self, card_id: str):
+        entry = self._signatures.pop(card_id, None)
+        if entry is None:
+            return
+        deck_id, signature, _ = entry
+        buckets = self._buckets.get(deck_id, {})
+        for key in self._bands(signature):
+            members = buckets.get(key)
+            if members is not None:
+                members.discard(card_id)
+                if not members:
+                    del buckets[key]
+        if not buckets:
+            self._buckets.pop(deck_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._signatures.clear()
+            self._buckets.clear()
+
+    def query(self, deck_id: Optional[str], question: str, threshold: float = 0.6,
+              exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Return ``(card_id, similarity)`` of the deck's near-duplicates of ``question``, best first"""
+        signature = minhash(question or "")
+        with self._lock:
+            buckets = self._buckets.get(deck_id, {})
+            candidates = set()
+            for key in self._bands(signature):
+                candidates.update(buckets.get(key, ()))
+            candidates.discard(exclude)
+            matches = [(card_id, similarity(signature, self._signatures[card_id][1])) for card_id in candidates]
+        matches = [match for match in matches if match[1] >= threshold]
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def clusters(self, deck_id: Optional[str], threshold: float = 0.6) -> List[List[str]]:
+        """Group a deck's cards into clusters of near-duplicate questions (singletons omitted)"""
+        parent: Dict[str, str] = {}
+
+        def find(card_id: str) -> str:
+            while parent.setdefault(card_id, card_id) != card_id:
+                parent[card_id] = parent[parent[card_id]]
+                card_id = parent[card_id]
+            return card_id
+
+        with self._lock:
+            for members in self._buckets.get(deck_id, {}).values():
+                if len(members) < 2:
+                    continue
+                # Compare each member with one representative per cluster seen in
+                # this bucket, so a bucket of n near-identical cards costs O(n)
+                representatives: List[str] = []
+                for card_id in sorted(members):
+                    signature = self._signatures[card_id][1]
+                    for representative in representatives:
+                        if find(representative) == find(card_id) or \
+                                similarity(signature, self._signatures[representative][1]) >= threshold:
+                            parent[find(card_id)] = find(representative)
+                            break
+                    else:
+                        representatives.append(card_id)
+
+        groups: Dict[str, List[str]] = {}
+        for card_id in parent:
+            groups.setdefault(find(card_id), []).append(card_id)
+        return [sorted(group) for group in groups.values() if len(group) > 1]
@@ -0,0 +1,162 @@
+import os
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (collection, key) pairs naming the decks/cards a caller changed
+Changes = Iterable[Tuple[str, str]]
+Collections = Dict[str, Dict[str, Any]]
+
+
+def to_record(item: Any) -> Dict[str, Any]:
+    """Return the plain dict form of a deck or card (dicts, ``CardRecord`` objects or pydantic models)"""
+    if isinstance(item, dict):
+        return item
+    if hasattr(item, "to_dict"):
+        return item.to_dict()
+    return item.model_dump()
+
+
+class Repository(ABC):
+    """Persistence interface for decks, flashcards and review events.
+
+    The apps keep their working set in memory (``decks`` and a ``CardStore``);
+    a repository loads it on startup and persists the items named in
+    ``changes`` after every mutation. Backends with indexed storage also serve
+    deck pages and due cards through ``deck_page`` and ``due_cards``. Review events are history and are only
+    kept by repositories that support it. ``bytes_written`` counts the bytes
+    the repository has written since startup.
+    """
+
+    bytes_written = 0
+
+    def bind(self, source: Callable[[], Collections]):
+        """Register the callable returning the live collections (used for background snapshots)"""
+
+    @abstractmethod
+    def load(self) -> Collections:
+        """Return ``{"decks": {...}, "flashcards": {...}}``"""
+
+    @abstractmethod
+    def save(self, collections: Collections, changes: Optional[Changes] = None):
+        """Persist the changed items, or everything when ``changes`` is None"""
+
+    def record_reviews(self, events: List[Dict[str, Any]]):
+        """Append review events (card_id, deck_id, reviewed_at, correct, score)"""
+
+    def deck_page(self, deck_id: str, after: Optional[Tuple[str, str]] = None,
+                  limit: Optional[int] = None) -> Optional[Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]]:
+        """Keyset page of a deck's cards in ``card_sort_key`` order read from storage.
+
+        Returns ``(cards, next_key)`` like ``CardStore.deck_page``, or None when
+        the backend does not serve reads and the caller should use memory.
+        """
+        return None
+
+    def due_cards(self, deck_id: str, limit: int,
+                  now: float) -> Optional[Tuple[List[Dict[str, Any]], Optional[float]]]:
+        """Cards of a deck due at ``now`` (earliest first) and the next due time, or None as above"""
+        return None
+
+    def close(self):
+        pass
+
+
+class MemoryRepository(Repository):
+    """Keeps nothing; data lives only as long as the process"""
+
+    def load(self) -> Collections:
+        return {"decks": {}, "flashcards": {}}
+
+    def save(self, collections: Collections, changes: Optional[Changes] = None):
+        pass
+
+
+class JsonFileRepository(Repository):
+    """Rewrites one JSON file per collection on every save"""
+
+    def __init__(self, files: Dict[str, str]):
+        self.files = files
+
+    def load(self) -> Collections:
+        collections = {}
+        for name, path in self.files.items():
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    collections[name] = json.load(f)
+            else:
+                collections[name] = {}
+        return collections
+
+    def save(self, collections: Collections, changes: Optional[Changes] = None):
+        for name, path in self.files.items():
+            with open(path, 'w') as f:
+                json.dump({key: to_record(item) for key, item in collections[name].items()}, f, indent=2)
+                self.bytes_written += f.tell()
+
+
+class JournalRepository(Repository):
+    """Appends changes to a write-ahead journal compacted into the JSON files"""
+
+    def __init__(self, journal_path: str, files: Dict[str, str],
+                 commit_interval: float = 0.01, compact_threshold: int = 5000):
+        from .journal import Journal
+        self.journal = Journal(journal_path, files, commit_interval=commit_interval,
+                               compact_threshold=compact_threshold)
+
+    @property
+    def bytes_written(self) -> int:
+        return self.journal.bytes_written
+
+    def bind(self, source: Callable[[], Collections]):
+        self.journal.set_snapshot_source(lambda: {
+            name: {key: to_record(item) for key, item in list(items.items())}
+            for name, items in source().items()
+        })
+
+    def load(self) -> Collections:
+        return self.journal.load()
+
+    def save(self, collections: Collections, changes: Optional[Changes] = None):
+        if changes is None:
+            self.journal.compact()
+            return
+        for collection, key in changes:
+            item = collections[collection].get(key)
+            if item is None:
+                self.journal.delete(collection, key, wait=False)
+            else:
+                self.journal.put(collection, key, to_record(item), wait=False)
+        self.journal.commit()
+
+    def close(self):
+        self.journal.close()
+
+
+def create_repository(backend: str, data_dir: str) -> Repository:
+    """Build the repository selected by ``STORAGE_BACKEND``"""
+    files = {
+        "decks": os.path.join(data_dir, 'decks.json'),
+        "flashcards": os.path.join(data_dir, 'flashcards.json')
+    }
+    if backend == "memory":
+        return MemoryRepository()
+    if backend == "json":
+        return JsonFileRepository(files)
+    if backend == "journal":
+        return JournalRepository(
+            os.path.join(data_dir, 'journal.log'),
+            files,
+            commit_interval=float(os.getenv("JOURNAL_COMMIT_INTERVAL", "0.01")),
+            compact_threshold=int(os.getenv("JOURNAL_COMPACT_THRESHOLD", "5000"))
+        )
+    if backend == "sqlite":
+        from .sqlite_repository import SQLiteRepository
+        return SQLiteRepository(
+            os.getenv("SQLITE_PATH", os.path.join(data_dir, 'studybuddy.db')),
+            import_files=files
+        )
+    raise ValueError(f"Unknown storage backend: {backend}")
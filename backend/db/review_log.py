@@ -0,0 +1,384 @@
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# On-disk record; card and deck ids are codes into the id tables kept in ``<path>.ids``
+RECORD = np.dtype([("card", "<i4"), ("deck", "<i4"), ("reviewed_at", "<f8"), ("correct", "i1"), ("score", "<f4")])
+
+# Lower bounds (whole days since the card's previous review) of the retention curve bins
+RETENTION_BINS = (0, 1, 2, 4, 7, 14, 30, 60, 120)
+# Accuracy histogram bins (percent) of the difficulty distribution
+DIFFICULTY_BINS = 10
+# Monday 1970-01-05, so week buckets start on Mondays (day buckets are unaffected)
+_BUCKET_ORIGIN = 4 * 86400
+# Larger spans of accuracy-over-time buckets are counted with a sort instead of ``bincount``
+_MAX_DENSE_BUCKETS = 100000
+_NO_GAP = -1
+_MAX_GAP = np.iinfo(np.int16).max
+
+
+def _accuracy(total: np.ndarray, correct: np.ndarray) -> np.ndarray:
+    return np.divide(correct * 100, total, out=np.zeros(len(total)), where=total > 0)
+
+
+def _score(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _outcome_counts(keys: np.ndarray, outcome: np.ndarray, minlength: int = 0) -> np.ndarray:
+    """``(len, 3)`` counts of score-only, wrong and correct events per key, in one ``bincount``.
+
+    ``outcome`` is ``correct + 1`` (0 score-only, 1 wrong, 2 correct) as ``intp``;
+    ``keys`` already of type ``intp`` are overwritten.
+    """
+    combined = keys.astype(np.intp, copy=False)
+    combined *= 3
+    combined += outcome
+    counts = np.bincount(combined, minlength=minlength * 3)
+    # The last key may lack its higher outcomes
+    return np.pad(counts, (0, -len(counts) % 3)).reshape(-1, 3)
+
+
+class _DeckColumns:
+    """One deck's events, in arrays grown by doubling.
+
+    ``card`` holds codes into ``card_ids`` local to the deck; ``gap_days`` is
+    the number of whole days since the card's previous graded review, or
+    ``_NO_GAP``.
+    """
+
+    __slots__ = ("size", "reviewed_at", "card", "correct", "score", "gap_days", "card_ids", "card_codes")
+
+    def __init__(self, capacity: int = 64):
+        self.size = 0
+        self.reviewed_at = np.empty(capacity, dtype=np.float64)
+        self.card = np.empty(capacity, dtype=np.int32)
+        self.correct = np.empty(capacity, dtype=np.int8)
+        self.score = np.empty(capacity, dtype=np.float32)
+        self.gap_days = np.empty(capacity, dtype=np.int16)
+        self.card_ids: List[str] = []
+        self.card_codes: Dict[str, int] = {}
+
+    def reserve(self, count: int):
+        capacity = len(self.card)
+        if self.size + count <= capacity:
+            return
+        capacity = max(capacity, 64)
+        while capacity < self.size + count:
+            capacity *= 2
+        for name in ("reviewed_at", "card", "correct", "score", "gap_days"):
+            column = getattr(self, name)
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            setattr(self, name, grown)
+
+    def card_code(self, card_id: str) -> int:
+        code = self.card_codes.get(card_id)
+        if code is None:
+            code = self.card_codes[card_id] = len(self.card_ids)
+            self.card_ids.append(card_id)
+        return code
+
+    def view(self):
+        """Views of the filled part; appends only write past it"""
+        size = self.size
+        return (self.reviewed_at[:size], self.card[:size], self.correct[:size], self.score[:size],
+                self.gap_days[:size], self.card_ids)
+
+
+class ReviewLog:
+    """Append-only columnar log of review and score events.
+
+    Events are kept per deck in NumPy columns (epoch ``reviewed_at``, card,
+    ``correct`` as 1/0 or -1 for score-only events, ``score`` or NaN, and the
+    days since the card's previous graded review), so a deck's analytics are a
+    few ``bincount`` passes over contiguous arrays without sorting or Python
+    loops over events. Readers take views under the lock and compute without
+    holding it; rows below a deck's size are never written again.
+
+    With a ``path``, events are appended to that file as fixed-size records
+    and new card/deck ids to ``<path>.ids``, and both are replayed on startup.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._size = 0
+        self._decks: Dict[str, _DeckColumns] = {}
+        # Codes of the persisted records, and each card's latest graded review time
+        self._card_codes: Dict[str, int] = {}
+        self._card_ids: List[str] = []
+        self._deck_codes: Dict[str, int] = {}
+        self._deck_ids: List[str] = []
+        self._last_graded: Dict[str, float] = {}
+        self._events_file = None
+        self._ids_file = None
+        if path:
+            self._replay(path)
+            self._events_file = open(path, 'ab')
+            self._ids_file = open(f"{path}.ids", 'a', encoding='utf-8')
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _gap_days(self, card_id: str, reviewed_at: float) -> int:
+        last = self._last_graded.get(card_id)
+        if last is None or reviewed_at < last:
+            # Backdated batch events are not counted towards retention
+            if last is None:
+                self._last_graded[card_id] = reviewed_at
+            return _NO_GAP
+        self._last_graded[card_id] = reviewed_at
+        return min(int((reviewed_at - last) // 86400), _MAX_GAP)
+
+    def append(self, events: Iterable[Dict[str, Any]]):
+        """Add events shaped like ``review_event`` (card_id, deck_id, reviewed_at, correct, score)"""
+        events = list(events)
+        if not events:
+            return
+        with self._lock:
+            records = np.empty(len(events), dtype=RECORD) if self._events_file is not None else None
+            new_ids: List[str] = []
+            for index, event in enumerate(events):
+                card_id, deck_id = event["card_id"], event.get("deck_id") or ""
+                reviewed_at, correct = float(event["reviewed_at"]), event.get("correct")
+                correct = -1 if correct is None else int(bool(correct))
+                score = _score(event.get("score"))
+                columns = self._decks.get(deck_id)
+                if columns is None:
+                    columns = self._decks[deck_id] = _DeckColumns()
+                columns.reserve(1)
+                row = columns.size
+                columns.reviewed_at[row] = reviewed_at
+                columns.card[row] = columns.card_code(card_id)
+                columns.correct[row] = correct
+                columns.score[row] = score
+                columns.gap_days[row] = _NO_GAP if correct < 0 else self._gap_days(card_id, reviewed_at)
+                columns.size = row + 1
+                if records is not None:
+                    records[index] = (self._code(self._card_codes, self._card_ids, "c", card_id, new_ids),
+                                      self._code(self._deck_codes, self._deck_ids, "d", deck_id, new_ids),
+                                      reviewed_at, correct, score)
+            self._size += len(events)
+            if records is not None:
+                # Ids first, so every persisted record can be resolved on replay
+                if new_ids:
+                    self._ids_file.write("".join(new_ids))
+                    self._ids_file.flush()
+                self._events_file.write(records.tobytes())
+                self._events_file.flush()
+
+    @staticmethod
+    def _code(codes: Dict[str, int], ids: List[str], kind: str, value: str, new_ids: List[str]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(ids)
+            ids.append(value)
+            new_ids.append(f"{kind}\t{value}\n")
+        return code
+
+    def _replay(self, path: str):
+        ids_path = f"{path}.ids"
+        if os.path.exists(ids_path):
+            with open(ids_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    kind, separator, value = line.rstrip("\n").partition("\t")
+                    if kind == "c" and separator:
+                        self._code(self._card_codes, self._card_ids, kind, value, [])
+                    elif kind == "d" and separator:
+                        self._code(self._deck_codes, self._deck_ids, kind, value, [])
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        # A crash can leave a partial last record
+        usable = len(data) - len(data) % RECORD.itemsize
+        if usable != len(data):
+            with open(path, 'r+b') as f:
+                f.truncate(usable)
+        records = np.frombuffer(data, dtype=RECORD, count=usable // RECORD.itemsize)
+        records = records[(records["card"] < len(self._card_ids)) & (records["deck"] < len(self._deck_ids))]
+        if not len(records):
+            return
+        logger.info("Loading %s review events", len(records))
+        self._size = len(records)
+
+        # Days since each card's previous graded review, in log order (as ``append`` computes them)
+        gap_days = np.full(len(records), _NO_GAP, dtype=np.int16)
+        graded = np.flatnonzero(records["correct"] >= 0)
+        by_card = graded[np.argsort(records["card"][graded], kind="stable")]
+        cards = records["card"][by_card]
+        times = records["reviewed_at"][by_card]
+        # Latest graded time up to each event of a card (backdated events do not advance it): a running
+        # maximum of time ranks, offset per card so it restarts at every card
+        first = np.append(True, cards[1:] != cards[:-1])
+        group = np.cumsum(first) - 1
+        by_time = np.argsort(times, kind="stable")
+        rank = np.empty(len(times), dtype=np.int64)
+        rank[by_time] = np.arange(len(times))
+        offset = group * len(times)
+        latest = times[by_time[np.maximum.accumulate(offset + rank) - offset]]
+        previous = np.empty(len(times))
+        previous[1:] = latest[:-1]
+        linked = ~first & (times >= previous)
+        gaps = np.minimum((times[linked] - previous[linked]) // 86400, _MAX_GAP)
+        gap_days[by_card[linked]] = gaps.astype(np.int16)
+        last = np.append(first[1:], True)
+        self._last_graded = {self._card_ids[card]: when
+                             for card, when in zip(cards[last].tolist(), latest[last].tolist())}
+
+        order = np.argsort(records["deck"], kind="stable")
+        decks = records["deck"][order]
+        bounds = np.flatnonzero(np.append(True, decks[1:] != decks[:-1]))
+        for start, end in zip(bounds.tolist(), np.append(bounds[1:], len(order)).tolist()):
+            rows = order[start:end]
+            columns = _DeckColumns(capacity=max(64, len(rows)))
+            global_cards, local_cards = np.unique(records["card"][rows], return_inverse=True)
+            columns.card_ids = [self._card_ids[card] for card in global_cards.tolist()]
+            columns.card_codes = {card_id: code for code, card_id in enumerate(columns.card_ids)}
+            columns.reviewed_at[:len(rows)] = records["reviewed_at"][rows]
+            columns.card[:len(rows)] = local_cards
+            columns.correct[:len(rows)] = records["correct"][rows]
+            columns.score[:len(rows)] = records["score"][rows]
+            columns.gap_days[:len(rows)] = gap_days[rows]
+            columns.size = len(rows)
+            self._decks[self._deck_ids[int(decks[start])]] = columns
+
+    def deck_analytics(self, deck_id: str, bucket_seconds: float = 86400, since: Optional[float] = None,
+                       min_reviews: int = 3, limit: int = 10,
+                       keep: Optional[Callable[[str], bool]] = None) -> Dict[str, Any]:
+        """Accuracy over time, retention by review interval, difficulty distribution and hardest cards of a deck.
+
+        Only graded (``correct``) events count as reviews; score events feed the
+        score distribution. ``keep`` filters the hardest cards by id (e.g. to
+        skip deleted cards).
+        """
+        with self._lock:
+            columns = self._decks.get(deck_id)
+            reviewed_at, card, correct, score, gap_days, card_ids = (columns or _DeckColumns(0)).view()
+        if since is not None:
+            recent = reviewed_at >= since
+            reviewed_at, card, correct, score, gap_days = (
+                column[recent] for column in (reviewed_at, card, correct, score, gap_days))
+
+        outcome = correct.astype(np.intp)
+        outcome += 1
+        per_card = _outcome_counts(card, outcome, len(card_ids))
+        totals = per_card[:, 1] + per_card[:, 2]
+        reviews = int(totals.sum())
+        return {
+            "events": int(len(reviewed_at)),
+            "reviews": reviews,
+            "accuracy": float(per_card[:, 2].sum() * 100 / reviews) if reviews else 0,
+            "accuracy_over_time": self._accuracy_over_time(reviewed_at, outcome, bucket_seconds),
+            "retention": self._retention(gap_days, outcome),
+            "difficulty": self._difficulty(totals, per_card[:, 2], score),
+            "hardest_cards": self._hardest(card_ids, totals, per_card[:, 2], min_reviews, limit, keep),
+        }
+
+    @staticmethod
+    def _accuracy_over_time(reviewed_at: np.ndarray, outcome: np.ndarray,
+                            bucket_seconds: float) -> List[Dict[str, Any]]:
+        if not len(reviewed_at):
+            return []
+        # Bucket numbers counted from the earliest event's bucket, so no floor pass is needed
+        first = int(np.floor((reviewed_at.min() - _BUCKET_ORIGIN) / bucket_seconds))
+        offsets = reviewed_at - (_BUCKET_ORIGIN + first * bucket_seconds)
+        offsets *= 1 / bucket_seconds
+        buckets = offsets.astype(np.int64)
+        if int(buckets.max()) < _MAX_DENSE_BUCKETS:
+            counts = _outcome_counts(buckets, outcome)
+            starts = np.arange(len(counts))
+        else:
+            starts, inverse = np.unique(buckets, return_inverse=True)
+            counts = _outcome_counts(inverse, outcome)
+        totals = counts[:, 1] + counts[:, 2]
+        present = np.flatnonzero(totals)
+        totals, accuracy = totals[present], _accuracy(totals[present], counts[present, 2])
+        seconds = (starts[present] + first) * bucket_seconds + _BUCKET_ORIGIN
+        labels = np.datetime_as_string(seconds.astype("datetime64[s]"), timezone="UTC")
+        return [
+            {"start": label, "reviews": total, "accuracy": value}
+            for label, total, value in zip(labels.tolist(), totals.tolist(), accuracy.tolist())
+        ]
+
+    @staticmethod
+    def _retention(gap_days: np.ndarray, outcome: np.ndarray) -> List[Dict[str, Any]]:
+        # Counts per whole day of gap (row 0: no previous review), then summed into the bins
+        days = np.minimum(gap_days, RETENTION_BINS[-1]).astype(np.intp)
+        days += 1
+        counts = _outcome_counts(days, outcome, RETENTION_BINS[-1] + 2)[1:]
+        binned = np.add.reduceat(counts, RETENTION_BINS, axis=0)
+        totals = binned[:, 1] + binned[:, 2]
+        retention = _accuracy(totals, binned[:, 2])
+        upper = list(RETENTION_BINS[1:]) + [None]
+        return [
+            {"min_days": low, "max_days": high, "reviews": total, "retention": value}
+            for low, high, total, value in zip(RETENTION_BINS, upper, totals.tolist(), retention.tolist())
+        ]
+
+    @staticmethod
+    def _difficulty(totals: np.ndarray, correct: np.ndarray, score: np.ndarray) -> Dict[str, Any]:
+        reviewed = totals > 0
+        counts, edges = np.histogram(_accuracy(totals[reviewed], correct[reviewed]),
+                                     bins=DIFFICULTY_BINS, range=(0, 100))
+        missing = np.isnan(score)
+        # Difficulty ratings are small integers: count them with ``bincount``, missing ones as -1
+        # (``fmax`` ignores NaN; lower scores take the ``unique`` path)
+        filled = np.fmax(score, np.float32(-1))
+        whole = filled.astype(np.intp)
+        if (len(whole) and (np.floor(filled) == filled).all() and np.fmin(score, 0).min() >= -1
+                and whole.max() < _MAX_DENSE_BUCKETS):
+            whole += 1
+            score_counts = np.bincount(whole)
+            score_counts[0] -= np.count_nonzero(missing)
+            values = np.flatnonzero(score_counts)
+            score_counts = score_counts[values]
+            values = values - 1
+        else:
+            values, score_counts = np.unique(score[~missing], return_counts=True)
+        return {
+            "accuracy_histogram": [
+                {"min_accuracy": low, "max_accuracy": high, "cards": count}
+                for low, high, count in zip(edges[:-1].tolist(), edges[1:].tolist(), counts.tolist())
+            ],
+            "scores": [{"score": value, "events": count}
+                       for value, count in zip(values.tolist(), score_counts.tolist())],
+        }
+
+    @staticmethod
+    def _hardest(card_ids: List[str], totals: np.ndarray, correct: np.ndarray, min_reviews: int, limit: int,
+                 keep: Optional[Callable[[str], bool]]) -> List[Dict[str, Any]]:
+        candidates = np.flatnonzero(totals >= max(min_reviews, 1))
+        accuracy = _accuracy(totals[candidates], correct[candidates])
+        # Lowest accuracy first, more reviews first among equals
+        order = np.lexsort((-totals[candidates], accuracy))
+        hardest = []
+        for code, value in zip(candidates[order].tolist(), accuracy[order].tolist()):
+            card_id = card_ids[code]
+            if keep is not None and not keep(card_id):
+                continue
+            hardest.append({
+                "card_id": card_id,
+                "reviews": int(totals[code]),
+                "correct_reviews": int(correct[code]),
+                "accuracy": value,
+            })
+            if len(hardest) >= limit:
+                break
+        return hardest
+
+    def close(self):
+        with self._lock:
+            for f in (self._events_file, self._ids_file):
+                if f is not None:
+                    f.close()
+            self._events_file = self._ids_file = None
@@ -0,0 +1,156 @@
+import os
+import re
+import json
+import math
+import heapq
+import hashlib
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from how in is it of on or that the this to was what when where which who why with"
+    .split()
+)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _text_digest(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class SearchIndex:
+    """In-memory inverted index over card text with BM25 ranking.
+
+    Postings are kept per deck (``term -> deck_id -> {card_id: tf}``) so a
+    deck-scoped query never walks other decks' cards; document frequencies
+    are global. ``save`` writes every card's term counts to disk and
+    ``restore`` loads them back, so cards whose text did not change since the
+    last save are re-indexed at startup without being tokenized again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[Optional[str], Dict[str, int]]] = {}
+        self._df: Counter = Counter()
+        self._docs: Dict[str, Tuple[Optional[str], str, Dict[str, int], int]] = {}
+        self._total_length = 0
+        self._restored: Dict[str, Tuple[str, Dict[str, int]]] = {}
+        self.dirty = False
+
+    def add(self, deck_id: Optional[str], card_id: str, text: str):
+        """Index the text of a card; a no-op if it is already indexed with the same text"""
+        digest = _text_digest(text)
+        doc = self._docs.get(card_id)
+        if doc is not None and doc[0] == deck_id and doc[1] == digest:
+            return
+        restored = self._restored.pop(card_id, None)
+        if restored is not None and restored[0] == digest:
+            terms = restored[1]
+        else:
+            terms = dict(Counter(tokenize(text)))
+        with self._lock:
+            self._remove_locked(card_id)
+            length = sum(terms.values())
+            self._docs[card_id] = (deck_id, digest, terms, length)
+            self._total_length += length
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {}).setdefault(deck_id, {})[card_id] = tf
+                self._df[term] += 1
+            self.dirty = True
+
+    def remove(self, card_id: str):
+        with self._lock:
+            self._remove_locked(card_id)
+
+    def _remove_locked(self, card_id: str):
+        doc = self._docs.pop(card_id, None)
+        if doc is None:
+            return
+        deck_id, _, terms, length = doc
+        self._total_length -= length
+        for term in terms:
+            decks = self._postings[term]
+            cards = decks[deck_id]
+            del cards[card_id]
+            if not cards:
+                del decks[deck_id]
+                if not decks:
+                    del self._postings[term]
+            self._df[term] -= 1
+            if not self._df[term]:
+                del self._df[term]
+        self.dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._df.clear()
+            self._docs.clear()
+            self._total_length = 0
+            self.dirty = True
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def search(self, query: str, deck_id: Optional[str] = None, limit: int = 20) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` ``(card_id, score)`` pairs ranked by BM25, optionally within one deck"""
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._docs)
+            if not terms or not count:
+                return []
+            average_length = self._total_length / count or 1
+            scores: Dict[str, float] = {}
+            for term in terms:
+                decks = self._postings.get(term)
+                if not decks:
+                    continue
+                df = self._df[term]
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                groups = [decks.get(deck_id, {})] if deck_id is not None else decks.values()
+                for cards in groups:
+                    for card_id, tf in cards.items():
+                        length = self._docs[card_id][3]
+                        norm = tf + K1 * (1 - B + B * length / average_length)
+                        scores[card_id] = scores.get(card_id, 0.0) + idf * tf * (K1 + 1) / norm
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def save(self, path: str):
+        """Write the indexed term counts atomically to ``path``"""
+        with self._lock:
+            docs = {card_id: [digest, terms] for card_id, (_, digest, terms, _) in self._docs.items()}
+            self.dirty = False
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "docs": docs}, f, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def restore(self, path: str):
+        """Load term counts saved by ``save``; they are used by the next ``add`` of each card"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Ignoring unreadable search index %s: %s", path, e)
+            return
+        if data.get("version") != 1:
+            return
+        self._restored = {card_id: (digest, terms) for card_id, (digest, terms) in data["docs"].items()}
+
+    def forget_restored(self):
+        """Drop restored entries of cards that were not loaded again"""
+        self._restored = {}
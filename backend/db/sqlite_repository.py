@@ -0,0 +1,212 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from .due_queue import card_due_timestamp
+from .repository import Changes, Collections, Repository, to_record
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decks (
+    id TEXT PRIMARY KEY,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id TEXT PRIMARY KEY,
+    deck_id TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    due_at REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cards_deck ON cards (deck_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_cards_updated_at ON cards (updated_at);
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    card_id TEXT NOT NULL,
+    deck_id TEXT,
+    reviewed_at REAL NOT NULL,
+    correct INTEGER,
+    score REAL
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_deck ON reviews (deck_id, reviewed_at);
+CREATE INDEX IF NOT EXISTS idx_reviews_card ON reviews (card_id, reviewed_at);
+"""
+# Created after the due_at column is added to databases from before it existed
+DUE_INDEX = "CREATE INDEX IF NOT EXISTS idx_cards_due ON cards (deck_id, due_at, id)"
+
+# Statements are module constants so sqlite3's per-connection statement cache
+# reuses the prepared form on every call
+UPSERT_DECK = """
+INSERT INTO decks (id, updated_at, data) VALUES (?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at, data = excluded.data
+"""
+UPSERT_CARD = """
+INSERT INTO cards (id, deck_id, created_at, updated_at, due_at, data) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET deck_id = excluded.deck_id, created_at = excluded.created_at,
+    updated_at = excluded.updated_at, due_at = excluded.due_at, data = excluded.data
+"""
+DELETE_DECK = "DELETE FROM decks WHERE id = ?"
+DELETE_CARD = "DELETE FROM cards WHERE id = ?"
+INSERT_REVIEW = """
+INSERT INTO reviews (card_id, deck_id, reviewed_at, correct, score) VALUES (?, ?, ?, ?, ?)
+"""
+UPDATE_CARD_DUE = "UPDATE cards SET due_at = ? WHERE id = ?"
+SELECT_DECK_PAGE = """
+SELECT created_at, id, data FROM cards
+WHERE deck_id = ? AND (created_at, id) > (?, ?)
+ORDER BY created_at, id LIMIT ?
+"""
+SELECT_DUE_CARDS = """
+SELECT due_at, data FROM cards
+WHERE deck_id = ?
+ORDER BY due_at, id LIMIT ?
+"""
+
+
+class SQLiteRepository(Repository):
+    """Embedded SQLite storage in WAL mode with transactional batch writes.
+
+    Each thread gets its own connection. On first use an empty database
+    imports the existing JSON data files, if any. The apps still load every
+    deck and card at startup for search, duplicate detection and stats, but
+    deck pages and due cards are read with keyset queries on the
+    ``(deck_id, created_at, id)`` and ``(deck_id, due_at, id)`` indexes.
+    """
+
+    def __init__(self, path: str, import_files: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.import_files = import_files or {}
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cards)")}
+        self._backfill_due = "due_at" not in columns
+        if self._backfill_due:
+            conn.execute("ALTER TABLE cards ADD COLUMN due_at REAL")
+        conn.execute(DUE_INDEX)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def load(self) -> Collections:
+        conn = self._connection()
+        decks = {row[0]: json.loads(row[1]) for row in conn.execute("SELECT id, data FROM decks")}
+        cards = {row[0]: json.loads(row[1]) for row in conn.execute("SELECT id, data FROM cards")}
+        if self._backfill_due:
+            with conn:
+                conn.executemany(UPDATE_CARD_DUE, [(card_due_timestamp(card), key) for key, card in cards.items()])
+            self._backfill_due = False
+        if not decks and not cards and self.import_files:
+            imported = self._import_json_files()
+            if imported is not None:
+                return imported
+        logger.info("Loaded %s decks and %s cards from %s", len(decks), len(cards), self.path)
+        return {"decks": decks, "flashcards": cards}
+
+    def _import_json_files(self) -> Optional[Collections]:
+        collections = {}
+        for name, path in self.import_files.items():
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    collections[name] = json.load(f)
+            else:
+                collections[name] = {}
+        if not any(collections.values()):
+            return None
+        self.save(collections)
+        logger.info("Imported %s decks and %s cards from JSON files",
+                    len(collections.get('decks', {})), len(collections.get('flashcards', {})))
+        return collections
+
+    def save(self, collections: Collections, changes: Optional[Changes] = None):
+        decks = collections["decks"]
+        cards = collections["flashcards"]
+        if changes is None:
+            deck_puts = list(decks.items())
+            card_puts = list(cards.items())
+            deck_deletes, card_deletes = [], []
+        else:
+            deck_puts, card_puts, deck_deletes, card_deletes = [], [], [], []
+            for collection, key in changes:
+                source = decks if collection == "decks" else cards
+                item = source.get(key)
+                if item is None:
+                    (deck_deletes if collection == "decks" else card_deletes).append((key,))
+                else:
+                    (deck_puts if collection == "decks" else card_puts).append((key, item))
+
+        deck_rows = []
+        for key, item in deck_puts:
+            record = to_record(item)
+            deck_rows.append((key, record.get("updated_at"), json.dumps(record, separators=(',', ':'))))
+        card_rows = []
+        for key, item in card_puts:
+            record = to_record(item)
+            card_rows.append((key, record.get("deck_id"), record.get("created_at") or "",
+                              record.get("updated_at"), card_due_timestamp(record),
+                              json.dumps(record, separators=(',', ':'))))
+
+        self.bytes_written += sum(len(row[-1]) for row in deck_rows) + sum(len(row[-1]) for row in card_rows)
+        conn = self._connection()
+        with conn:
+            if changes is None:
+                conn.execute("DELETE FROM decks")
+                conn.execute("DELETE FROM cards")
+            conn.executemany(UPSERT_DECK, deck_rows)
+            conn.executemany(UPSERT_CARD, card_rows)
+            conn.executemany(DELETE_DECK, deck_deletes)
+            conn.executemany(DELETE_CARD, card_deletes)
+
+    def record_reviews(self, events: List[Dict[str, Any]]):
+        rows = [
+            (event["card_id"], event.get("deck_id"), event["reviewed_at"],
+             None if event.get("correct") is None else int(bool(event["correct"])),
+             event.get("score"))
+            for event in events
+        ]
+        conn = self._connection()
+        with conn:
+            conn.executemany(INSERT_REVIEW, rows)
+
+    def deck_page(self, deck_id: str, after: Optional[Tuple[str, str]] = None,
+                  limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        after = after or ("", "")
+        # LIMIT -1 is unbounded; one extra row tells whether another page follows
+        rows = self._connection().execute(
+            SELECT_DECK_PAGE, (deck_id, after[0], after[1], -1 if limit is None else limit + 1)
+        ).fetchall()
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            return [json.loads(row[2]) for row in rows], (rows[-1][0], rows[-1][1])
+        return [json.loads(row[2]) for row in rows], None
+
+    def due_cards(self, deck_id: str, limit: int, now: float) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        rows = self._connection().execute(SELECT_DUE_CARDS, (deck_id, limit + 1)).fetchall()
+        cards = []
+        for due_at, data in rows:
+            if due_at > now or len(cards) >= limit:
+                return cards, due_at
+            cards.append(json.loads(data))
+        return cards, None
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
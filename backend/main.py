@@ -1,15 +1,26 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import Dict, List, Optional
+import os
+import json
 import uuid
+import time
 import logging
-from services.ai_service import generate_answer
+from services.ai_service import generate_answer, test_api_key
 from models.flashcard import Flashcard, FlashcardBase
+from db.card_store import CardStore, decode_cursor, encode_cursor, iter_pages
+from db.repository import create_repository
+from services.health import HealthMonitor
+from services.jobs import JobManager, JobQueueFull
+from services.log_config import configure_logging, payload
+from services.metrics import (
+    CONTENT_TYPE, HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS, REGISTRY, STORAGE_LATENCY
+)
 from pydantic import BaseModel
 
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+configure_logging(logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Models
@@ -19,9 +30,40 @@ class Deck(BaseModel):
     description: str
     is_public: bool = True
 
-# Storage
-decks: Dict[str, Deck] = {}
-flashcards: Dict[str, Dict] = {}
+# Storage: in memory only unless STORAGE_BACKEND selects a persistent backend
+DATA_DIR = os.getenv("STUDYBUDDY_DATA_DIR", os.path.join(os.path.dirname(__file__), 'data'))
+repository = create_repository(os.getenv("STORAGE_BACKEND", "memory"), DATA_DIR)
+with STORAGE_LATENCY.time(operation="load"):
+    collections = repository.load()
+decks: Dict[str, Deck] = {deck_id: Deck.model_validate(deck) for deck_id, deck in collections["decks"].items()}
+# Cards are kept as compact CardRecord objects unless CARD_RECORDS=dict
+flashcards: CardStore = CardStore(collections["flashcards"], compact=os.getenv("CARD_RECORDS", "compact") == "compact")
+repository.bind(lambda: {"decks": decks, "flashcards": flashcards})
+
+def save_data(changes=None):
+    """Persist the (collection, key) pairs in ``changes`` through the repository"""
+    try:
+        with STORAGE_LATENCY.time(operation="save"):
+            repository.save({"decks": decks, "flashcards": flashcards}, changes)
+    except Exception as e:
+        logger.error("Error saving data: %s", e)
+
+def read_deck_page(deck_id: str, after=None, limit=None):
+    """Keyset page of a deck, read from storage when the backend serves reads and from memory otherwise"""
+    page = repository.deck_page(deck_id, after, limit)
+    return page if page is not None else flashcards.deck_page(deck_id, after, limit)
+
+# Background answer generation for async card creation
+jobs = JobManager(
+    max_workers=int(os.getenv("JOB_WORKERS", "4")),
+    max_pending=int(os.getenv("JOB_QUEUE_SIZE", "100"))
+)
+
+# Provider checks run in the background once the app has started
+provider_health = HealthMonitor(
+    {"openai": test_api_key},
+    interval=float(os.getenv("HEALTH_CHECK_INTERVAL", "300"))
+)
 
 # Add test data
 test_deck = Deck(
@@ -30,9 +72,10 @@ test_deck = Deck(
     description="A test deck",
     is_public=True
 )
-decks["test-123"] = test_deck
-logger.info(f"Initialized test deck: {test_deck}")
-logger.debug(f"Available decks: {decks}")
+if "test-123" not in decks:
+    decks["test-123"] = test_deck
+logger.info("Initialized test deck: %s", payload(test_deck))
+logger.debug("Available decks: %s", payload(decks))
 
 # Create app
 app = FastAPI(
@@ -50,10 +93,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request metrics: latency and status per route template, plus in-flight requests
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        route = route.path if route is not None else "unmatched"
+        HTTP_LATENCY.observe(time.perf_counter() - started, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=status)
+
+REGISTRY.add_collector(lambda: [(
+    "studybuddy_storage_bytes_written_total", "counter", "Bytes written by the storage backend",
+    [({"backend": os.getenv("STORAGE_BACKEND", "memory")}, repository.bytes_written)]
+)])
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.on_event("startup")
+async def start_health_checks():
+    provider_health.start()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to SmartStudy Flashcards API"}
 
+@app.get("/health/providers")
+async def get_provider_health():
+    """Get the cached result of the latest background provider checks"""
+    return provider_health.results()
+
 @app.get("/decks", response_model=List[Deck])
 @app.get("/decks/", response_model=List[Deck])
 async def get_decks():
@@ -65,7 +144,7 @@ async def get_decks():
 @app.post("/decks/", response_model=Deck)
 async def create_deck(deck: Deck):
     """Create a new deck"""
-    logger.debug(f"Creating deck: {deck}")
+    logger.debug("Creating deck: %s", payload(deck))
     try:
         deck_id = str(uuid.uuid4())
         new_deck = Deck(
@@ -75,51 +154,190 @@ async def create_deck(deck: Deck):
             is_public=deck.is_public
         )
         decks[deck_id] = new_deck
-        logger.info(f"Created deck with ID: {deck_id}")
+        save_data([("decks", deck_id)])
+        logger.info("Created deck with ID: %s", deck_id)
         return new_deck
     except Exception as e:
-        logger.error(f"Error creating deck: {str(e)}")
+        logger.error("Error creating deck: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/decks/{deck_id}", response_model=Deck)
 @app.get("/decks/{deck_id}/", response_model=Deck)
 async def get_deck(deck_id: str):
     """Get a specific deck"""
-    logger.debug(f"Getting deck: {deck_id}")
+    logger.debug("Getting deck: %s", deck_id)
     if deck_id not in decks:
-        logger.error(f"Deck not found: {deck_id}")
+        logger.error("Deck not found: %s", deck_id)
         raise HTTPException(status_code=404, detail="Deck not found")
     return decks[deck_id]
 
-@app.get("/decks/{deck_id}/flashcards", response_model=List[Dict])
-@app.get("/decks/{deck_id}/flashcards/", response_model=List[Dict])
-async def get_deck_flashcards(deck_id: str):
-    """Get all flashcards in a deck"""
-    logger.debug(f"Getting flashcards for deck: {deck_id}")
+@app.get("/decks/{deck_id}/flashcards")
+@app.get("/decks/{deck_id}/flashcards/")
+async def get_deck_flashcards(
+    deck_id: str,
+    request: Request,
+    after: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    format: Optional[str] = None
+):
+    """Get the flashcards in a deck, optionally paginated or streamed as NDJSON"""
+    logger.debug("Getting flashcards for deck: %s", deck_id)
+    if deck_id not in decks:
+        logger.error("Deck not found: %s", deck_id)
+        raise HTTPException(status_code=404, detail="Deck not found")
+    try:
+        after_key = decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Stream one card per line so large decks never sit in memory as one payload
+    if format == "ndjson" or request.headers.get("accept") == "application/x-ndjson":
+        def stream():
+            for card in iter_pages(lambda key, size: read_deck_page(deck_id, key, size), after_key, limit):
+                yield json.dumps(dict(card)) + "\n"
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    # Keyset pagination over the deck's stable card order
+    if after_key is not None or limit is not None:
+        cards, next_key = read_deck_page(deck_id, after_key, limit)
+        return {
+            "cards": cards,
+            "next_cursor": encode_cursor(next_key) if next_key is not None else None
+        }
+    return flashcards.deck_cards(deck_id)
+
+@app.get("/stats")
+async def get_stats():
+    """Get global and per-deck card and review totals"""
+    stats = flashcards.stats.totals()
+    stats["total_decks"] = len(decks)
+    stats["decks"] = {deck_id: flashcards.stats.deck(deck_id) for deck_id in decks}
+    return stats
+
+@app.get("/decks/{deck_id}/stats")
+async def get_deck_stats(deck_id: str):
+    """Get card and review totals for a deck"""
     if deck_id not in decks:
-        logger.error(f"Deck not found: {deck_id}")
         raise HTTPException(status_code=404, detail="Deck not found")
-    return [card for card in flashcards.values() if card.get("deck_id") == deck_id]
+    stats = flashcards.stats.deck(deck_id)
+    stats["deck_id"] = deck_id
+    return stats
+
+@app.get("/search")
+async def search_flashcards(q: str, deck_id: Optional[str] = None, limit: int = Query(20, ge=1, le=100)):
+    """Full-text search over card questions and answers, optionally within one deck"""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Missing query parameter: q")
+    if deck_id is not None and deck_id not in decks:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    matches = flashcards.search.search(q, deck_id, limit)
+    return {
+        "query": q,
+        "deck_id": deck_id,
+        "results": [
+            {"card": flashcards[card_id], "score": round(score, 4)}
+            for card_id, score in matches if card_id in flashcards
+        ]
+    }
+
+def fill_pending_card(job_id: str, card_id: str) -> dict:
+    """Job body: generate the answer of a card created in async mode"""
+    card = flashcards.get(card_id)
+    if card is None:
+        raise ValueError(f"Flashcard {card_id} was deleted before its answer was generated")
+    try:
+        answer = generate_answer(card["question"], card["type"])
+    except Exception:
+        # Leave the card in an end state for clients polling it instead of the job
+        card = flashcards.get(card_id)
+        if card is not None:
+            card["status"] = "failed"
+            flashcards.refresh(card_id)
+            save_data([("flashcards", card_id)])
+        raise
+    # The store may hold a compact copy of the card, so read it back before updating it
+    card = flashcards.get(card_id)
+    if card is None:
+        raise ValueError(f"Flashcard {card_id} was deleted while its answer was generated")
+    card["answer"] = answer
+    card.pop("status", None)
+    card.pop("job_id", None)
+    flashcards.refresh(card_id)
+    save_data([("flashcards", card_id)])
+    logger.info("Generated answer for pending flashcard %s", card_id)
+    return {"card": dict(card)}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status of a background job"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Stream job status changes as Server-Sent Events until the job finishes"""
+    if jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    def stream():
+        for job in jobs.events(job_id):
+            if job is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.post("/flashcards")
 @app.post("/flashcards/")
-async def create_flashcard(flashcard: FlashcardBase):
+async def create_flashcard(flashcard: FlashcardBase, async_mode: bool = Query(False, alias="async")):
     """Create a new flashcard with AI-generated answer"""
     try:
-        logger.debug(f"Creating flashcard: {flashcard.dict()}")
+        logger.debug("Creating flashcard: %s", payload(flashcard))
         
         # Validate deck exists
-        logger.debug(f"Checking if deck {flashcard.deck_id} exists")
+        logger.debug("Checking if deck %s exists", flashcard.deck_id)
         if flashcard.deck_id not in decks:
             error_msg = f"Deck {flashcard.deck_id} not found"
             logger.error(error_msg)
             return JSONResponse(status_code=404, content={"detail": error_msg})
         
+        # In async mode store the card as pending and let a worker fill in the answer
+        if async_mode:
+            card_id = str(uuid.uuid4())
+            new_card = {
+                "id": card_id,
+                "question": flashcard.question,
+                "answer": None,
+                "type": flashcard.type,
+                "deck_id": flashcard.deck_id,
+                "status": "pending"
+            }
+            flashcards[card_id] = new_card
+            try:
+                job = jobs.submit(fill_pending_card, card_id, kind="generate_answer")
+            except JobQueueFull:
+                flashcards.pop(card_id, None)
+                return JSONResponse(status_code=503, content={"detail": "Too many pending flashcards, try again later"})
+            # The store may hold a compact copy of the card, so record the job there
+            flashcards[card_id]["job_id"] = job["id"]
+            new_card["job_id"] = job["id"]
+            flashcards.touch(flashcard.deck_id)
+            save_data([("flashcards", card_id)])
+            logger.info("Queued answer generation job %s for flashcard %s", job['id'], card_id)
+            return JSONResponse(
+                status_code=202,
+                content={"job_id": job["id"], "card": new_card},
+                headers={"Location": f"/jobs/{job['id']}"}
+            )
+
         # Generate answer
         logger.debug("Generating answer")
         try:
             answer = generate_answer(flashcard.question, flashcard.type)
-            logger.debug(f"Generated answer: {answer}")
+            logger.debug("Generated answer: %s", payload(answer))
         except Exception as e:
             error_msg = f"Error generating answer: {str(e)}"
             logger.error(error_msg)
@@ -136,12 +354,13 @@ async def create_flashcard(flashcard: FlashcardBase):
                 "type": flashcard.type,
                 "deck_id": flashcard.deck_id
             }
-            logger.debug(f"Created flashcard object: {new_card}")
+            logger.debug("Created flashcard object: %s", payload(new_card))
             
             # Store flashcard
-            logger.debug(f"Storing flashcard with ID: {card_id}")
+            logger.debug("Storing flashcard with ID: %s", card_id)
             flashcards[card_id] = new_card
-            logger.info(f"Successfully created flashcard with ID: {card_id}")
+            save_data([("flashcards", card_id)])
+            logger.info("Successfully created flashcard with ID: %s", card_id)
             
             # Return the created flashcard
             return JSONResponse(status_code=201, content=new_card)
@@ -149,15 +368,15 @@ async def create_flashcard(flashcard: FlashcardBase):
         except Exception as e:
             error_msg = f"Error creating flashcard: {str(e)}"
             logger.error(error_msg)
-            logger.error(f"Exception type: {type(e)}")
-            logger.error(f"Exception details: {e.__dict__ if hasattr(e, '__dict__') else 'No details available'}")
+            logger.error("Exception type: %s", type(e))
+            logger.error("Exception details: %s", payload(e.__dict__) if hasattr(e, '__dict__') else 'No details available')
             return JSONResponse(status_code=500, content={"detail": error_msg})
         
     except Exception as e:
         error_msg = f"Error creating flashcard: {str(e)}"
         logger.error(error_msg)
-        logger.error(f"Exception type: {type(e)}")
-        logger.error(f"Exception details: {e.__dict__ if hasattr(e, '__dict__') else 'No details available'}")
+        logger.error("Exception type: %s", type(e))
+        logger.error("Exception details: %s", payload(e.__dict__) if hasattr(e, '__dict__') else 'No details available')
         return JSONResponse(status_code=500, content={"detail": error_msg})
 
 @app.exception_handler(Exception)
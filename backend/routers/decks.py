@@ -41,4 +41,4 @@ async def get_deck_flashcards(deck_id: str):
     """Get all flashcards in a deck"""
     if deck_id not in decks:
         raise HTTPException(status_code=404, detail="Deck not found")
-    return [card for card in flashcards.values() if card.deck_id == deck_id]
+    return flashcards.deck_cards(deck_id)
@@ -1,63 +1,70 @@
 import json
 import logging
+import threading
 from typing import List, Dict, Any, Optional
 from openai import OpenAI
 import os
 from models.flashcard import FlashcardGeneration
+from services.batching import estimate_tokens, split_json_array
+from services.http_clients import httpx_client, provider_timeout
+from services.llm import LLM_PROVIDER, PRIORITY_BULK, OpenAIProvider, create_llm_client
+from services.log_config import payload
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
 # Load environment variables from the correct path
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
-logger.debug(f"Loading .env file from: {env_path}")
+logger.debug("Loading .env file from: %s", env_path)
 load_dotenv(env_path)
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
-
-# Initialize OpenAI client with better error handling
-client = None
+# The OpenAI client is built on first use so importing this module does no I/O
 api_key = os.getenv('OPENAI_API_KEY')
+_client = None
+_client_lock = threading.Lock()
+OPENAI_TIMEOUT = provider_timeout("openai", 60)
 
-if api_key:
-    try:
-        client = OpenAI(api_key=api_key)
-        logger.info("OpenAI client initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize OpenAI client: {str(e)}")
-else:
-    logger.error("OPENAI_API_KEY not found in environment variables")
+def get_client() -> Optional[OpenAI]:
+    """Return the shared OpenAI client, creating it on first call (None without an API key)"""
+    global _client
+    if _client is None and api_key:
+        with _client_lock:
+            if _client is None:
+                try:
+                    # Pooled keep-alive transport; OpenAIProvider retries transient errors
+                    # itself, so the SDK does not retry on top of it
+                    _client = OpenAI(
+                        api_key=api_key,
+                        http_client=httpx_client("openai", OPENAI_TIMEOUT),
+                        timeout=OPENAI_TIMEOUT,
+                        max_retries=0
+                    )
+                    logger.info("OpenAI client initialized successfully")
+                except Exception as e:
+                    logger.error("Failed to initialize OpenAI client: %s", e)
+    return _client
+
+# Completions go through the provider selected by LLM_PROVIDER within the LLM_RPM/LLM_TPM quota
+llm = create_llm_client(lambda: OpenAIProvider(get_client), "gpt-3.5-turbo")
 
 def test_api_key():
-    """Test if the OpenAI API key is valid"""
+    """Test if the OpenAI API key is valid (lists models, so no tokens are spent)"""
     try:
         if not api_key:
             return False, "OpenAI API key not found in environment variables"
-            
+
+        client = get_client()
         if not client:
             return False, "OpenAI client not initialized"
-            
-        # Make a simple test request
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": "Hi"}],
-            max_tokens=5
-        )
+
+        client.models.list()
         return True, "API key is valid"
     except Exception as e:
         return False, f"API key error: {str(e)}"
 
-# Test the API key on startup
-valid, message = test_api_key()
-if not valid:
-    logger.error(message)
-else:
-    logger.info(message)
-
 def generate_mock_answer(question: str, card_type: str = "basic") -> str:
     """Generate a mock answer for testing purposes."""
-    logger.info(f"Generating mock answer for question: {question}")
+    logger.debug("Generating mock answer for question: %s", payload(question))
     
     if card_type == "basic":
         return "This is a mock answer for testing purposes."
@@ -72,21 +79,27 @@ def generate_answer(question: str, card_type: str = "basic") -> str:
     Falls back to mock data if OpenAI is unavailable.
     """
     try:
-        logger.info(f"Starting generate_answer for question: {question}, type: {card_type}")
+        logger.debug("Starting generate_answer for question: %s, type: %s", payload(question), card_type)
         
         # For now, let's use mock data to isolate the issue
         logger.info("Using mock data for testing")
         return "Python is a high-level programming language known for its simple syntax and readability."
         
     except Exception as e:
-        logger.error(f"Error in generate_answer: {str(e)}")
-        logger.error(f"Exception type: {type(e)}")
-        logger.error(f"Exception details: {e.__dict__ if hasattr(e, '__dict__') else 'No details available'}")
+        logger.error("Error in generate_answer: %s", e)
+        logger.error("Exception type: %s", type(e))
+        logger.error("Exception details: %s", payload(getattr(e, '__dict__', 'No details available')))
         return "Error generating answer"
 
+# Questions generated from one text are requested together; the text is sent
+# once per request and the replies must fit the token budget
+QUESTIONS_TOKEN_BUDGET = int(os.getenv("QUESTIONS_TOKEN_BUDGET", "6000"))
+TOKENS_PER_QUESTION = 150
+MAX_QUESTIONS_PER_REQUEST = 20
+
 def generate_questions_from_text(text: str, num_questions: int = 5) -> List[FlashcardGeneration]:
-    """Generate flashcard questions from a given text."""
-    try:
+    """Generate flashcard questions from a given text, all of them in as few requests as the token budget allows."""
+    if LLM_PROVIDER == "openai" and not get_client():
         return [
             FlashcardGeneration(
                 question=f"Mock question {i} about the text",
@@ -94,14 +107,47 @@ def generate_questions_from_text(text: str, num_questions: int = 5) -> List[Flas
             )
             for i in range(num_questions)
         ]
+
+    per_request = (QUESTIONS_TOKEN_BUDGET - estimate_tokens(text)) // TOKENS_PER_QUESTION
+    per_request = max(1, min(per_request, MAX_QUESTIONS_PER_REQUEST))
+    cards: List[FlashcardGeneration] = []
+    try:
+        while len(cards) < num_questions:
+            count = min(per_request, num_questions - len(cards))
+            system_prompt = f"""You create study flashcards from the text the user sends.
+            Write exactly {count} question/answer pairs covering different facts of the text.
+            Reply with a JSON array of objects with this structure:
+            [{{"index": 0, "question": "Question text", "answer": "Answer text"}}, ...]"""
+            if cards:
+                asked = "\n".join(card.question for card in cards)
+                system_prompt += f"\nDo not repeat these questions:\n{asked}"
+
+            completion = llm.complete(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": text}
+                ],
+                max_tokens=count * TOKENS_PER_QUESTION,
+                priority=PRIORITY_BULK,
+                operation="generate_questions"
+            )
+            items = split_json_array(completion.text, count)
+            batch = [
+                FlashcardGeneration(question=item["question"], answer=str(item["answer"]))
+                for item in items
+                if item and item.get("question") and item.get("answer")
+            ]
+            if not batch:
+                break
+            cards.extend(batch)
     except Exception as e:
-        logger.error(f"Error generating questions: {e}")
-        return []
+        logger.error("Error generating questions: %s", e)
+    return cards
 
 def enhance_question(question: str, answer: str, card_type: str = "basic") -> str:
     """Enhance a question with additional context or hints"""
     try:
         return f"Enhanced: {question}"
     except Exception as e:
-        logger.error(f"Error enhancing question: {e}")
+        logger.error("Error enhancing question: %s", e)
         return question
@@ -0,0 +1,99 @@
+import re
+import json
+import logging
+from typing import Any, Callable, Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio of English text for OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-bound token estimate used to size batches without a tokenizer"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def plan_batches(costs: Sequence[int], token_budget: int, max_batch_size: int,
+                 overhead: int = 0) -> List[List[int]]:
+    """Group item indices into batches whose summed cost (plus ``overhead``) stays within ``token_budget``.
+
+    Items keep their order. An item too large to share a request gets a batch of its own.
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = overhead
+    for index, cost in enumerate(costs):
+        if current and (used + cost > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(index)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def split_json_array(text: str, expected: int) -> List[Any]:
+    """Split a model reply holding a JSON array of ``{"index": i, ...}`` objects into per-item values.
+
+    Returns a list of length ``expected`` with ``None`` for every item the reply
+    did not contain, so callers can fall back to generating just those. Raises
+    ValueError if the reply is not a JSON array at all.
+    """
+    text = _FENCE.sub("", text.strip())
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Batch reply is not JSON: {str(e)}")
+    if isinstance(data, dict):
+        # Some replies wrap the array, e.g. {"answers": [...]}
+        data = next((value for value in data.values() if isinstance(value, list)), None)
+    if not isinstance(data, list):
+        raise ValueError("Batch reply is not a JSON array")
+
+    items: List[Any] = [None] * expected
+    for position, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            continue
+        entry = dict(entry)
+        index = entry.pop("index", position)
+        try:
+            index = int(index)
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < expected and items[index] is None:
+            items[index] = entry
+    return items
+
+
+def generate_in_batches(prompts: Sequence[str], generate_batch: Callable[[List[int]], List[Any]],
+                        generate_one: Callable[[int], Any], token_budget: int,
+                        max_batch_size: int, tokens_per_item: int = 0, overhead: int = 0,
+                        map_fn: Callable = map) -> Dict[int, Any]:
+    """Run ``generate_batch`` over token-bounded batches of ``prompts``.
+
+    ``generate_batch`` receives the indices of one batch and returns one value
+    (or None) per index; a failed batch or a missing value is retried alone
+    with ``generate_one``. Pass an executor's ``map`` as ``map_fn`` to run
+    batches concurrently.
+    """
+    costs = [estimate_tokens(prompt) + tokens_per_item for prompt in prompts]
+
+    def run(batch: List[int]) -> List[tuple]:
+        if len(batch) == 1:
+            return [(batch[0], generate_one(batch[0]))]
+        try:
+            values = generate_batch(batch)
+        except Exception as e:
+            logger.warning("Batch of %s failed, generating individually: %s", len(batch), e)
+            values = [None] * len(batch)
+        return [(index, value if value is not None else generate_one(index))
+                for index, value in zip(batch, values)]
+
+    results: Dict[int, Any] = {}
+    for pairs in map_fn(run, plan_batches(costs, token_budget, max_batch_size, overhead)):
+        results.update(pairs)
+    return results
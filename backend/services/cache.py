@@ -0,0 +1,235 @@
+import os
+import copy
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different inputs share a key"""
+    return " ".join(text.lower().split())
+
+
+def answer_cache_key(question: str, card_type: str, prompt_version: str) -> str:
+    """Content address of a generated answer"""
+    payload = json.dumps([normalize_text(question), card_type, prompt_version])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store ``value``; ``ttl`` overrides the cache-wide lifetime for this entry"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def info(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0
+        }
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class AnswerCache:
+    """Two-tier (memory LRU + on-disk) cache for generated answers.
+
+    Entries are addressed by ``answer_cache_key`` and expire after ``ttl``
+    seconds. The disk tier keeps at most ``max_disk_entries`` files and drops the
+    oldest ones when it grows past that. ``get_or_compute`` coalesces concurrent
+    lookups of the same key so only one caller runs the upstream request.
+    """
+
+    def __init__(self, cache_dir: str, max_memory_entries: int = 1024,
+                 max_disk_entries: int = 10000, ttl: float = 7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.memory = LRUCache(max_memory_entries, ttl)
+        self.disk_hits = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._flights_lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._disk_entries = sum(1 for _ in self._iter_disk_files())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.json')
+
+    def _iter_disk_files(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    yield os.path.join(root, name)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.memory.get(key, _MISSING)
+        if value is _MISSING:
+            entry = self._read_disk(key)
+            if entry is _MISSING:
+                return default
+            value, remaining = entry
+            self.disk_hits += 1
+            # Promote with the lifetime the disk entry has left, not a fresh TTL
+            self.memory.set(key, value, ttl=remaining)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        self._write_disk(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key`` or compute it once across all waiting callers"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.value)
+
+        try:
+            flight.value = compute()
+            self.set(key, flight.value)
+            return copy.deepcopy(flight.value)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _read_disk(self, key: str) -> Any:
+        """Return ``(value, seconds until it expires)`` of a disk entry, or ``_MISSING``"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return _MISSING
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning("Discarding unreadable answer cache entry %s: %s", key, e)
+            self._remove_disk(path)
+            return _MISSING
+
+        remaining = entry["created_at"] + self.ttl - time.time()
+        if remaining <= 0:
+            self._remove_disk(path)
+            return _MISSING
+        return entry["value"], remaining
+
+    def _write_disk(self, key: str, value: Any):
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            existed = os.path.exists(path)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"created_at": time.time(), "value": value}, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            logger.warning("Could not write answer cache entry %s: %s", key, e)
+            return
+
+        with self._disk_lock:
+            if not existed:
+                self._disk_entries += 1
+            if self._disk_entries > self.max_disk_entries:
+                self._evict_disk()
+
+    def _remove_disk(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._disk_lock:
+            self._disk_entries -= 1
+
+    def _evict_disk(self):
+        """Drop the oldest files until the disk tier is back at 90% of its limit"""
+        files = []
+        for path in self._iter_disk_files():
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        files.sort()
+        target = int(self.max_disk_entries * 0.9)
+        excess = len(files) - target
+        for _, path in files[:max(excess, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+        self._disk_entries = min(len(files), target)
+
+    def info(self) -> Dict[str, Any]:
+        info = self.memory.info()
+        info["disk_entries"] = self._disk_entries
+        info["disk_hits"] = self.disk_hits
+        return info
@@ -0,0 +1,71 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A check returns (healthy, message) and may raise; exceptions count as unhealthy
+Check = Callable[[], Tuple[bool, str]]
+
+
+class HealthMonitor:
+    """Runs provider checks in a background thread and caches their last results.
+
+    Nothing is checked until ``start`` (or ``check_now``) is called, so building
+    a monitor at import time costs no network I/O.
+    """
+
+    def __init__(self, checks: Dict[str, Check], interval: float = 300.0):
+        self.checks = checks
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._results: Dict[str, Dict[str, Any]] = {
+            name: {"status": "unknown", "message": "Not checked yet", "checked_at": None, "latency_ms": None}
+            for name in checks
+        }
+
+    def start(self):
+        """Start the periodic checks; a non-positive interval disables them"""
+        with self._lock:
+            if self._thread is not None or self.interval <= 0:
+                return
+            self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            self.check_now()
+            time.sleep(self.interval)
+
+    def check_now(self):
+        for name, check in self.checks.items():
+            started = time.perf_counter()
+            try:
+                healthy, message = check()
+            except Exception as e:
+                healthy, message = False, str(e)
+            result = {
+                "status": "ok" if healthy else "error",
+                "message": message,
+                "checked_at": datetime.now().isoformat(),
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+            if not healthy:
+                logger.warning("Provider %s is unhealthy: %s", name, message)
+            with self._lock:
+                self._results[name] = result
+
+    def results(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = {name: dict(result) for name, result in self._results.items()}
+        statuses = {result["status"] for result in providers.values()}
+        if statuses <= {"ok"}:
+            status = "ok"
+        elif "error" in statuses:
+            status = "degraded"
+        else:
+            status = "unknown"
+        return {"status": status, "providers": providers}
@@ -0,0 +1,101 @@
+import os
+import time
+import random
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connections kept per provider host, shared by all threads
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def provider_timeout(provider: str, default: float) -> float:
+    """Request timeout in seconds for a provider, overridable with ``<PROVIDER>_TIMEOUT``"""
+    return float(os.getenv(f"{provider.upper()}_TIMEOUT", str(default)))
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff, never shorter than a server-sent Retry-After"""
+    delay = random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, HTTP_BACKOFF_MAX))
+    return delay
+
+
+def get_session(provider: str) -> requests.Session:
+    """Return the shared keep-alive session of a provider, creating it on first use"""
+    session = _sessions.get(provider)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(provider)
+            if session is None:
+                session = requests.Session()
+                # Retries are done by the callers so they can use jittered backoff
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _sessions[provider] = session
+    return session
+
+
+def _retry_after(response: requests.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def request_with_retries(provider: str, method: str, url: str, timeout: float,
+                         retries: int = HTTP_MAX_RETRIES, **kwargs) -> requests.Response:
+    """Send a request over the provider's pooled session, retrying connection errors and 429/5xx replies"""
+    session = get_session(provider)
+    for attempt in range(retries + 1):
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("%s request failed (%s), retrying in %.2fs", provider, e, delay)
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            delay = backoff_delay(attempt, _retry_after(response))
+            logger.warning("%s returned %s, retrying in %.2fs", provider, response.status_code, delay)
+        time.sleep(delay)
+
+
+def call_with_retries(fn: Callable[..., Any], *args, retry_on: Tuple[Type[BaseException], ...],
+                      retries: int = HTTP_MAX_RETRIES, **kwargs) -> Any:
+    """Call an SDK function, retrying the given exception types with jittered backoff"""
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("%s failed (%s), retrying in %.2fs", getattr(fn, '__qualname__', fn), e, delay)
+            time.sleep(delay)
+
+
+def httpx_client(provider: str, timeout: float):
+    """Pooled keep-alive httpx client for SDKs built on httpx (the OpenAI v1 client)"""
+    import httpx
+    return httpx.Client(
+        timeout=httpx.Timeout(timeout, connect=min(timeout, 10.0)),
+        limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+    )
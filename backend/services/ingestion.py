@@ -0,0 +1,166 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO
+
+from services.cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_HEADING = re.compile(r"^(#{1,6}\s|chapter\b|section\b|\d+(\.\d+)*\s+[A-Z])", re.IGNORECASE)
+
+
+def iter_paragraphs(stream: TextIO) -> Iterator[str]:
+    """Yield blank-line separated paragraphs of a text stream, reading it line by line"""
+    lines: List[str] = []
+    for line in stream:
+        line = line.strip()
+        if not line:
+            if lines:
+                yield " ".join(lines)
+                lines = []
+            continue
+        if lines and _HEADING.match(line):
+            # A heading starts a new section even without a blank line before it
+            yield " ".join(lines)
+            lines = []
+        lines.append(line)
+    if lines:
+        yield " ".join(lines)
+
+
+def _split_long(paragraph: str, max_chars: int) -> Iterator[str]:
+    """Split an oversized paragraph at sentence ends, falling back to hard cuts"""
+    piece = ""
+    for sentence in _SENTENCE_END.split(paragraph):
+        while len(sentence) > max_chars:
+            if piece:
+                yield piece
+                piece = ""
+            yield sentence[:max_chars]
+            sentence = sentence[max_chars:]
+        if piece and len(piece) + len(sentence) + 1 > max_chars:
+            yield piece
+            piece = ""
+        piece = f"{piece} {sentence}" if piece else sentence
+    if piece:
+        yield piece
+
+
+def iter_chunks(stream: TextIO, max_chars: int = 4000) -> Iterator[str]:
+    """Yield chunks of at most ``max_chars`` that end on paragraph (or sentence) boundaries"""
+    chunk: List[str] = []
+    size = 0
+    for paragraph in iter_paragraphs(stream):
+        for piece in _split_long(paragraph, max_chars) if len(paragraph) > max_chars else (paragraph,):
+            if chunk and (size + len(piece) + 2 > max_chars or _HEADING.match(piece)):
+                yield "\n\n".join(chunk)
+                chunk, size = [], 0
+            chunk.append(piece)
+            size += len(piece) + 2
+    if chunk:
+        yield "\n\n".join(chunk)
+
+
+# Upload formats converted to plain text before chunking
+CONVERTIBLE_FORMATS = ("pdf", "docx")
+
+
+def convert_to_text(source_path: str, source_format: str, target_path: str):
+    """Write the text of a PDF (page by page) or DOCX (paragraph by paragraph) file to ``target_path``"""
+    tmp_path = f"{target_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        if source_format == "pdf":
+            from PyPDF2 import PdfReader
+            for page in PdfReader(source_path).pages:
+                out.write((page.extract_text() or "") + "\n\n")
+        elif source_format == "docx":
+            from docx import Document
+            for paragraph in Document(source_path).paragraphs:
+                out.write(paragraph.text + "\n\n")
+        else:
+            raise ValueError(f"Unsupported document format: {source_format}")
+    os.replace(tmp_path, target_path)
+
+
+def chunk_hash(text: str) -> str:
+    """Content address of a chunk; whitespace and case differences hash the same"""
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class IngestCheckpoint:
+    """Append-only record of the chunk hashes already turned into cards.
+
+    One hash per line, so marking a chunk is a single small append and a
+    restarted ingestion skips every chunk finished before the interruption.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: Set[str] = set()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.done.update(line.strip() for line in f if line.strip())
+
+    def mark(self, digest: str):
+        with self._lock:
+            if digest in self.done:
+                return
+            self.done.add(digest)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(digest + "\n")
+
+
+def ingest_document(chunks: Iterable[str], generate: Callable[[str], List[Dict[str, Any]]],
+                    store: Callable[[List[Dict[str, Any]]], int],
+                    checkpoint: Optional[IngestCheckpoint] = None,
+                    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                    max_workers: int = 4) -> Dict[str, Any]:
+    """Turn a stream of chunks into cards with a bounded worker pool.
+
+    ``generate`` maps one chunk to question/answer dicts and ``store`` persists
+    them, returning how many cards were created. Duplicate chunks and chunks
+    already in the checkpoint are skipped. At most ``2 * max_workers`` chunks
+    are in flight, so memory stays bounded however long the document is.
+    """
+    seen: Set[str] = set()
+    counts = {"chunks": 0, "generated": 0, "skipped": 0, "failed": 0, "cards": 0}
+    in_flight: Dict[Any, str] = {}
+
+    def report():
+        if progress is not None:
+            progress(dict(counts))
+
+    def finish(futures):
+        for future in futures:
+            digest = in_flight.pop(future)
+            try:
+                counts["cards"] += store(future.result())
+                counts["generated"] += 1
+                if checkpoint is not None:
+                    checkpoint.mark(digest)
+            except Exception as e:
+                logger.error("Failed to ingest chunk %s: %s", digest[:12], e)
+                counts["failed"] += 1
+        report()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest") as executor:
+        for chunk in chunks:
+            counts["chunks"] += 1
+            digest = chunk_hash(chunk)
+            if digest in seen or (checkpoint is not None and digest in checkpoint.done):
+                counts["skipped"] += 1
+                continue
+            seen.add(digest)
+            in_flight[executor.submit(generate, chunk)] = digest
+            if len(in_flight) >= 2 * max_workers:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                finish(done)
+        finish(list(in_flight))
+
+    return counts
@@ -0,0 +1,120 @@
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("done", "failed")
+
+
+class JobQueueFull(Exception):
+    """Raised when the worker pool already has ``max_pending`` unfinished jobs"""
+
+
+class JobManager:
+    """Bounded background worker pool with pollable, subscribable job records.
+
+    A job function receives its job id as the first argument and may call
+    ``update`` to report progress. Its return value becomes the job ``result``.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 100, max_finished: int = 1000):
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending = 0
+
+    def submit(self, fn: Callable[..., Any], *args, kind: str = "job", **kwargs) -> Dict[str, Any]:
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs already pending")
+            job = {
+                "id": job_id,
+                "kind": kind,
+                "status": "queued",
+                "progress": None,
+                "result": None,
+                "error": None,
+                "created_at": datetime.now().isoformat(),
+                "finished_at": None,
+                "version": 0
+            }
+            self._jobs[job_id] = job
+            self._pending += 1
+            snapshot = dict(job)
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return snapshot
+
+    def _run(self, job_id: str, fn: Callable[..., Any], args: tuple, kwargs: dict):
+        self.update(job_id, status="running")
+        try:
+            result = fn(job_id, *args, **kwargs)
+            self.update(job_id, status="done", result=result)
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e)
+            self.update(job_id, status="failed", error=str(e))
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["version"] += 1
+            if fields.get("status") in FINISHED_STATUSES:
+                job["finished_at"] = datetime.now().isoformat()
+                self._pending -= 1
+                self._prune_locked()
+            self._changed.notify_all()
+
+    def _prune_locked(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in FINISHED_STATUSES]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self, job_id: str, after_version: int = -1, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Block until the job changes past ``after_version`` (or finishes) and return its state"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if job["version"] > after_version or job["status"] in FINISHED_STATUSES:
+                    return dict(job)
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return dict(job)
+                self._changed.wait(remaining)
+
+    def events(self, job_id: str, heartbeat: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """Yield each new state of a job until it finishes; yields None as a keep-alive"""
+        version = -1
+        while True:
+            job = self.wait(job_id, version, timeout=heartbeat)
+            if job is None:
+                return
+            if job["version"] == version:
+                yield None
+                continue
+            version = job["version"]
+            yield job
+            if job["status"] in FINISHED_STATUSES:
+                return
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
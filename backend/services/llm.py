@@ -0,0 +1,395 @@
+import os
+import re
+import json
+import time
+import heapq
+import hashlib
+import logging
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from services.batching import estimate_tokens
+from services.http_clients import HTTP_MAX_RETRIES, backoff_delay, call_with_retries
+from services.metrics import PROVIDER_LATENCY, record_token_usage
+
+logger = logging.getLogger(__name__)
+
+# "openai" talks to the OpenAI API; "fake" answers locally and deterministically (offline runs, tests)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+# Client-side quota; 0 disables a limit. Set these to the account's limits to stay clear of 429s
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))
+
+# Lower values are served first when calls queue for quota
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+Messages = List[Dict[str, str]]
+
+
+class RateLimited(Exception):
+    """The provider rejected a call for quota reasons (HTTP 429)"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Completion:
+    """Text and token usage of one chat completion"""
+
+    __slots__ = ("text", "usage", "model")
+
+    def __init__(self, text: str, usage: Optional[Dict[str, int]] = None, model: Optional[str] = None):
+        self.text = text
+        self.usage = usage or {}
+        self.model = model
+
+    @property
+    def total_tokens(self) -> Optional[int]:
+        if not self.usage:
+            return None
+        return self.usage.get("prompt_tokens", 0) + self.usage.get("completion_tokens", 0)
+
+
+class LLMProvider(ABC):
+    """A chat completion backend; raises ``RateLimited`` when the provider returns 429"""
+
+    name = "llm"
+
+    @abstractmethod
+    def complete(self, messages: Messages, model: str, max_tokens: int, **kwargs) -> Completion:
+        """Send one chat completion request and return its text and token usage"""
+
+    def stream(self, messages: Messages, model: str, max_tokens: int, **kwargs) -> Iterator[str]:
+        """Return an iterator of text deltas; the request is sent (and may raise) before returning"""
+        text = self.complete(messages, model, max_tokens, **kwargs).text
+        return iter([text])
+
+
+def _header_retry_after(headers: Any) -> Optional[float]:
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class OpenAILegacyProvider(LLMProvider):
+    """The module-level API of the openai<1 SDK (used by app.py)"""
+
+    name = "openai"
+
+    def __init__(self, timeout: float):
+        import openai
+        self.openai = openai
+        self.timeout = timeout
+        # Connection problems are retried here; 429s go back to the scheduler
+        self.retryable_errors = (
+            openai.error.APIConnectionError,
+            openai.error.ServiceUnavailableError,
+            openai.error.Timeout
+        )
+
+    def _create(self, **kwargs):
+        try:
+            return call_with_retries(
+                self.openai.ChatCompletion.create,
+                retry_on=self.retryable_errors,
+                request_timeout=self.timeout,
+                **kwargs
+            )
+        except self.openai.error.RateLimitError as e:
+            raise RateLimited(str(e), _header_retry_after(getattr(e, "headers", None))) from e
+
+    def complete(self, messages: Messages, model: str, max_tokens: int, **kwargs) -> Completion:
+        response = self._create(model=model, messages=messages, max_tokens=max_tokens, **kwargs)
+        usage = response.get("usage") or {}
+        return Completion(
+            response.choices[0].message.content,
+            {"prompt_tokens": usage.get("prompt_tokens", 0), "completion_tokens": usage.get("completion_tokens", 0)},
+            response.get("model", model)
+        )
+
+    def stream(self, messages: Messages, model: str, max_tokens: int, **kwargs) -> Iterator[str]:
+        response = self._create(model=model, messages=messages, max_tokens=max_tokens, stream=True, **kwargs)
+
+        def deltas():
+            for chunk in response:
+                delta = chunk["choices"][0]["delta"].get("content")
+                if delta:
+                    yield delta
+        return deltas()
+
+
+class OpenAIProvider(LLMProvider):
+    """The client of the openai>=1 SDK (used by services.ai_service).
+
+    Connection errors, timeouts and 5xx responses are retried here with jittered
+    backoff (the SDK client runs with ``max_retries=0``); 429s go back to the scheduler.
+    """
+
+    name = "openai"
+
+    def __init__(self, client_factory: Callable[[], Any]):
+        self.client_factory = client_factory
+
+    def complete(self, messages: Messages, model: str, max_tokens: int, **kwargs) -> Completion:
+        import openai
+        client = self.client_factory()
+        if client is None:
+            raise RuntimeError("OpenAI client not initialized")
+        try:
+            response = call_with_retries(
+                client.chat.completions.create,
+                retry_on=(openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError),
+                model=model,
+                messages=messages,
+                max_tokens=max_tokens,
+                **kwargs
+            )
+        except openai.RateLimitError as e:
+            raise RateLimited(str(e), _header_retry_after(e.response.headers)) from e
+        usage = response.usage
+        return Completion(
+            response.choices[0].message.content,
+            {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens} if usage else {},
+            response.model
+        )
+
+
+class TokenBucket:
+    """Bucket of ``per_minute`` units refilled continuously; not thread-safe on its own"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` units (at most the capacity) are available"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        """Remove units; the level may go negative when a call used more than reserved"""
+        self._refill(now)
+        self.level -= amount
+
+    def give(self, amount: float, now: float):
+        self._refill(now)
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Admits calls against requests- and tokens-per-minute buckets in priority order.
+
+    Waiting calls form a heap ordered by ``(priority, arrival)``; only the head
+    may take capacity, so bulk work never overtakes queued interactive calls.
+    A 429 pauses admission for everyone until the provider's quota recovers.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self._cond = threading.Condition()
+        self._waiting: List[tuple] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+
+    def _delay(self, tokens: int, now: float) -> float:
+        delay = self._paused_until - now
+        if self.requests is not None:
+            delay = max(delay, self.requests.wait_time(1, now))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.wait_time(tokens, now))
+        return delay
+
+    def acquire(self, tokens: int, priority: int = PRIORITY_INTERACTIVE):
+        """Block until the call may be sent, then charge one request and ``tokens`` tokens"""
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._waiting[0] == ticket:
+                        delay = self._delay(tokens, now)
+                        if delay <= 0:
+                            if self.requests is not None:
+                                self.requests.take(1, now)
+                            if self.tokens is not None:
+                                self.tokens.take(tokens, now)
+                            return
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def settle(self, reserved: int, used: int):
+        """Correct the token bucket once the provider reports what a call actually used"""
+        if self.tokens is None or used == reserved:
+            return
+        with self._cond:
+            now = time.monotonic()
+            if used < reserved:
+                self.tokens.give(reserved - used, now)
+            else:
+                self.tokens.take(used - reserved, now)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        """Hold every queued call for ``seconds`` (after a 429)"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def queued(self) -> int:
+        with self._cond:
+            return len(self._waiting)
+
+
+class LLMClient:
+    """Sends completions through a provider within the configured quota, backing off on 429s"""
+
+    def __init__(self, provider: LLMProvider, model: str, limiter: Optional[RateLimiter] = None,
+                 max_retries: int = HTTP_MAX_RETRIES):
+        self.provider = provider
+        self.model = model
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+
+    def _call(self, send: Callable[[], Any], messages: Messages, max_tokens: int, priority: int, operation: str):
+        reserved = estimate_tokens("".join(message["content"] for message in messages)) + max_tokens
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(reserved, priority)
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = send()
+                outcome = "ok"
+                return result, reserved
+            except RateLimited as e:
+                outcome = "rate_limited"
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, e.retry_after)
+                logger.warning("%s rate limited %s, pausing %.2fs", self.provider.name, operation, delay)
+                self.limiter.pause(delay)
+            finally:
+                PROVIDER_LATENCY.observe(time.perf_counter() - started, provider=self.provider.name,
+                                         operation=operation, outcome=outcome)
+
+    def complete(self, messages: Messages, max_tokens: int, priority: int = PRIORITY_INTERACTIVE,
+                 operation: str = "chat", **kwargs) -> Completion:
+        completion, reserved = self._call(
+            lambda: self.provider.complete(messages, self.model, max_tokens, **kwargs),
+            messages, max_tokens, priority, operation
+        )
+        record_token_usage(operation, completion.usage)
+        if completion.total_tokens is not None:
+            self.limiter.settle(reserved, completion.total_tokens)
+        return completion
+
+    def stream(self, messages: Messages, max_tokens: int, priority: int = PRIORITY_INTERACTIVE,
+               operation: str = "chat", **kwargs) -> Iterator[str]:
+        """Iterator of text deltas; quota is reserved for ``max_tokens`` since streams report no usage"""
+        deltas, _ = self._call(
+            lambda: self.provider.stream(messages, self.model, max_tokens, **kwargs),
+            messages, max_tokens, priority, operation
+        )
+        return deltas
+
+
+# "Write exactly 5 ..." / "Write up to 3 ..." in question-generation prompts
+_PAIR_COUNT = re.compile(r"\b(?:exactly|up to) (\d+)")
+
+
+class FakeProvider(LLMProvider):
+    """Deterministic offline provider enforcing its own quota like the real API.
+
+    Replies depend only on the messages: numbered questions ("0. ...") get a
+    JSON array with one answer per question, requests for a JSON array of
+    question/answer pairs get as many as asked for ("exactly N"/"up to N",
+    else ``pairs``) and anything else gets a
+    ``{"answer", "explanation"}`` object. Calls beyond ``rpm``/``tpm`` raise
+    ``RateLimited``, so the scheduler can be exercised without network access.
+    """
+
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, rpm: float = 0, tpm: float = 0, pairs: int = 3):
+        self.latency = latency
+        self.pairs = pairs
+        self._lock = threading.Lock()
+        self._requests = TokenBucket(rpm) if rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.calls = 0
+        self.rate_limited = 0
+
+    def _check_quota(self, tokens: int):
+        with self._lock:
+            now = time.monotonic()
+            waits = [bucket.wait_time(amount, now) for bucket, amount in ((self._requests, 1), (self._tokens, tokens))
+                     if bucket is not None]
+            if any(wait > 0 for wait in waits):
+                self.rate_limited += 1
+                raise RateLimited("Rate limit reached for fake provider", retry_after=max(waits))
+            if self._requests is not None:
+                self._requests.take(1, now)
+            if self._tokens is not None:
+                self._tokens.take(tokens, now)
+            self.calls += 1
+
+    def reply(self, messages: Messages) -> str:
+        system = messages[0]["content"] if messages else ""
+        prompt = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+        numbered = [line.split(". ", 1)[1] for line in prompt.splitlines()
+                    if ". " in line and line.split(". ", 1)[0].isdigit()]
+        if numbered and "JSON array" in system:
+            return json.dumps([
+                {"index": i, "answer": f"Fake answer to: {question}", "explanation": f"fake {digest}"}
+                for i, question in enumerate(numbered)
+            ])
+        if "JSON array" in system:
+            count = _PAIR_COUNT.search(system)
+            return json.dumps([
+                {"index": i, "question": f"Fake question {i} ({digest})", "answer": f"Fake answer {i}"}
+                for i in range(int(count.group(1)) if count else self.pairs)
+            ])
+        return json.dumps({"answer": f"Fake answer ({digest})", "explanation": "Generated by the fake provider"})
+
+    def complete(self, messages: Messages, model: str, max_tokens: int, **kwargs) -> Completion:
+        prompt_tokens = estimate_tokens("".join(message["content"] for message in messages))
+        text = self.reply(messages)
+        completion_tokens = min(estimate_tokens(text), max_tokens)
+        self._check_quota(prompt_tokens + completion_tokens)
+        if self.latency:
+            time.sleep(self.latency)
+        return Completion(text, {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}, model)
+
+    def stream(self, messages: Messages, model: str, max_tokens: int, **kwargs) -> Iterator[str]:
+        text = self.complete(messages, model, max_tokens, **kwargs).text
+        return (text[i:i + 16] for i in range(0, len(text), 16))
+
+
+def create_llm_client(openai_provider: Callable[[], LLMProvider], default_model: str) -> LLMClient:
+    """Build the client selected by ``LLM_PROVIDER``, ``LLM_MODEL``, ``LLM_RPM`` and ``LLM_TPM``"""
+    if LLM_PROVIDER == "fake":
+        provider = FakeProvider(latency=float(os.getenv("LLM_FAKE_LATENCY", "0")))
+    elif LLM_PROVIDER == "openai":
+        provider = openai_provider()
+    else:
+        raise ValueError(f"Unknown LLM_PROVIDER: {LLM_PROVIDER}")
+    return LLMClient(provider, os.getenv("LLM_MODEL", default_model), RateLimiter(LLM_RPM, LLM_TPM))
@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import queue
+import random
+import atexit
+import logging
+import reprlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+# "text" keeps the plain stderr logging; "json" writes one JSON object per line from a background thread
+LOG_MODE = os.getenv("LOG_MODE", "text").lower()
+LOG_LEVEL = os.getenv("LOG_LEVEL")
+# Share of payload-dump records (those logging a ``payload(...)`` argument) kept in json mode
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.01"))
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "2000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+_payload_repr = reprlib.Repr()
+_payload_repr.maxlevel = 3
+_payload_repr.maxdict = 8
+_payload_repr.maxlist = 8
+_payload_repr.maxstring = 120
+_payload_repr.maxother = 120
+
+_listener: Optional[QueueListener] = None
+
+
+class payload:
+    """Log argument for card dicts, answers and other bulky values.
+
+    Rendered with size limits only when the record is actually emitted, so
+    ``logger.debug("Creating flashcard: %s", payload(data))`` costs nothing
+    when debug logging is off and a bounded amount when it is on.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        return _payload_repr.repr(self.value)
+
+    __repr__ = __str__
+
+
+def _has_payload(record: logging.LogRecord) -> bool:
+    args = record.args
+    if isinstance(args, tuple):
+        return any(isinstance(arg, payload) for arg in args)
+    return isinstance(args, payload)
+
+
+class PayloadSampler(logging.Filter):
+    """Keeps a random share of the records that dump payloads; every other record passes"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not _has_payload(record) or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            event["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            event["exc"] = record.exc_text
+        return json.dumps(event, ensure_ascii=False, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread, dropping them when the queue is full.
+
+    Only the %-interpolation (bounded by ``payload`` and the message cap) runs on
+    the calling thread, so later mutations of logged objects cannot leak into
+    the line; JSON encoding and the stderr write happen on the listener.
+    """
+
+    def __init__(self, log_queue: queue.Queue, max_chars: int):
+        super().__init__(log_queue)
+        self.max_chars = max_chars
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            message = f"{message[:self.max_chars]}... [{len(message) - self.max_chars} chars truncated]"
+        record.msg = message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(default_level: int = logging.INFO):
+    """Configure the root logger according to ``LOG_MODE``/``LOG_LEVEL``"""
+    global _listener
+    level = LOG_LEVEL.upper() if LOG_LEVEL else default_level
+    if LOG_MODE != "json":
+        logging.basicConfig(level=level)
+        return
+    if _listener is not None:
+        return
+    # Payload dumps are debug-level chatter; production json mode defaults to INFO
+    root = logging.getLogger()
+    root.setLevel(level if LOG_LEVEL else logging.INFO)
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter())
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = _NonBlockingQueueHandler(log_queue, LOG_MAX_MESSAGE_CHARS)
+    queue_handler.addFilter(PayloadSampler(LOG_PAYLOAD_SAMPLE_RATE))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(_listener.stop)
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+DEFAULT_EASE_FACTOR = 2.5
+MIN_EASE_FACTOR = 1.3
+
+
+def review_quality(correct: bool) -> int:
+    """SM-2 quality (0-5) of a /reviewed event"""
+    return 4 if correct else 1
+
+
+def score_quality(score: Any) -> Optional[int]:
+    """SM-2 quality of a /score event; scores are difficulty ratings from 1 (easy) to 3 (hard)"""
+    try:
+        score = int(score)
+    except (TypeError, ValueError):
+        return None
+    return 6 - min(max(score, 1), 3)
+
+
+def sm2_schedule(card: Dict[str, Any], quality: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Apply one SM-2 review to a card's scheduling fields and return the updated fields"""
+    now = now or datetime.now()
+    ease_factor = card.get("ease_factor", DEFAULT_EASE_FACTOR)
+    repetitions = card.get("repetitions", 0)
+    interval = card.get("interval", 0)
+
+    if quality < 3:
+        # Lapse: start the card over but keep its (reduced) ease
+        repetitions = 0
+        interval = 1
+    else:
+        repetitions += 1
+        if repetitions == 1:
+            interval = 1
+        elif repetitions == 2:
+            interval = 6
+        else:
+            interval = round(interval * ease_factor)
+
+    ease_factor += 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+    ease_factor = max(ease_factor, MIN_EASE_FACTOR)
+
+    return {
+        "ease_factor": round(ease_factor, 4),
+        "repetitions": repetitions,
+        "interval": interval,
+        "due_at": (now + timedelta(days=interval)).isoformat()
+    }
@@ -0,0 +1,99 @@
+import pytest
+
+from db.card_store import CardStore, decode_cursor, encode_cursor
+
+
+def make_card(card_id, created_at, deck_id="d", question=None):
+    return {
+        "id": card_id,
+        "question": question or f"Question {card_id}?",
+        "answer": {"answer": "answer", "explanation": ""},
+        "type": "basic",
+        "deck_id": deck_id,
+        "created_at": created_at,
+    }
+
+
+@pytest.fixture(params=[False, True], ids=["dict", "compact"])
+def store(request):
+    store = CardStore(compact=request.param)
+    # Inserted out of order; "b" and "c" share a creation time and sort by id
+    for card_id, created_at in [("c", "2024-01-02T00:00:00"), ("a", "2024-01-01T00:00:00"),
+                                ("e", "2024-01-04T00:00:00"), ("b", "2024-01-02T00:00:00"),
+                                ("d", "2024-01-03T00:00:00")]:
+        store[card_id] = make_card(card_id, created_at)
+    store["x"] = make_card("x", "2024-01-01T00:00:00", deck_id="other")
+    return store
+
+
+def ids(cards):
+    return [card["id"] for card in cards]
+
+
+def test_pages_follow_creation_time_then_id(store):
+    cards, key = store.deck_page("d", None, 2)
+    assert ids(cards) == ["a", "b"]
+    assert key == ("2024-01-02T00:00:00", "b")
+
+    cards, key = store.deck_page("d", key, 2)
+    assert ids(cards) == ["c", "d"]
+    cards, key = store.deck_page("d", key, 2)
+    assert ids(cards) == ["e"]
+    assert key is None
+
+
+def test_last_full_page_has_no_next_key(store):
+    cards, key = store.deck_page("d", ("2024-01-02T00:00:00", "b"), 3)
+    assert ids(cards) == ["c", "d", "e"]
+    assert key is None
+
+
+def test_unlimited_page_and_unknown_deck(store):
+    assert store.deck_page("d") == (store.deck_cards("d"), None)
+    assert ids(store.deck_cards("d")) == ["a", "b", "c", "d", "e"]
+    assert store.deck_page("missing", None, 10) == ([], None)
+
+
+def test_cursor_survives_writes_around_it(store):
+    cards, key = store.deck_page("d", None, 2)
+    # Deleting the cursor card and adding cards on either side of it
+    del store["b"]
+    store["a0"] = make_card("a0", "2024-01-01T12:00:00")
+    store["f"] = make_card("f", "2024-01-05T00:00:00")
+    cards, key = store.deck_page("d", key, 10)
+    assert ids(cards) == ["c", "d", "e", "f"]
+    assert key is None
+
+
+def test_changed_creation_time_moves_the_card(store):
+    card = dict(store["a"])
+    card["created_at"] = "2024-01-03T12:00:00"
+    store["a"] = card
+    assert ids(store.deck_cards("d")) == ["b", "c", "d", "a", "e"]
+
+
+def test_moving_a_card_between_decks(store):
+    card = dict(store["c"])
+    card["deck_id"] = "other"
+    store["c"] = card
+    assert ids(store.deck_cards("d")) == ["a", "b", "d", "e"]
+    assert ids(store.deck_cards("other")) == ["x", "c"]
+
+
+def test_iter_deck_cards_in_chunks(store):
+    assert ids(store.iter_deck_cards("d", chunk_size=2)) == ["a", "b", "c", "d", "e"]
+    assert ids(store.iter_deck_cards("d", limit=3, chunk_size=2)) == ["a", "b", "c"]
+    assert ids(store.iter_deck_cards("d", after=("2024-01-03T00:00:00", "d"))) == ["e"]
+
+
+def test_delete_deck_cards(store):
+    assert sorted(store.delete_deck_cards("d")) == ["a", "b", "c", "d", "e"]
+    assert store.deck_page("d", None, 10) == ([], None)
+    assert list(store) == ["x"]
+
+
+def test_cursor_round_trip():
+    key = ("2024-01-02T00:00:00", "b")
+    assert decode_cursor(encode_cursor(key)) == key
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
@@ -0,0 +1,87 @@
+import random
+
+from db.due_queue import DueQueue, card_due_timestamp
+
+
+def stale_in_heap(queue, deck_id):
+    return sum(1 for item in queue._heaps.get(deck_id, []) if not queue._is_live(item))
+
+
+def test_due_returns_earliest_first_and_next_due():
+    queue = DueQueue()
+    queue.schedule("d", "a", 30)
+    queue.schedule("d", "b", 10)
+    queue.schedule("d", "c", 20)
+
+    assert queue.due("d", 10, now=25) == (["b", "c"], 30)
+    assert queue.due("d", 1, now=100) == (["b"], 20)
+    assert queue.due("d", 10, now=5) == ([], 10)
+    assert queue.due("d", 10, now=100) == (["b", "c", "a"], None)
+
+
+def test_due_does_not_consume_entries():
+    queue = DueQueue()
+    queue.schedule("d", "a", 1)
+    queue.schedule("d", "b", 2)
+    assert queue.due("d", 1, now=10) == (["a"], 2)
+    assert queue.due("d", 1, now=10) == (["a"], 2)
+
+
+def test_unknown_deck_is_empty():
+    assert DueQueue().due("missing", 5, now=0) == ([], None)
+
+
+def test_reschedule_and_remove_hide_old_entries():
+    queue = DueQueue()
+    queue.schedule("d", "a", 10)
+    queue.schedule("d", "b", 20)
+    queue.schedule("d", "a", 30)
+    assert queue.due("d", 10, now=100) == (["b", "a"], None)
+
+    queue.remove("b")
+    assert queue.due("d", 10, now=100) == (["a"], None)
+    queue.remove("b")
+    assert queue.due("d", 10, now=100) == (["a"], None)
+
+
+def test_moving_a_card_to_another_deck():
+    queue = DueQueue()
+    queue.schedule("d1", "a", 5)
+    queue.schedule("d2", "a", 7)
+    assert queue.due("d1", 10, now=100) == ([], None)
+    assert queue.due("d2", 10, now=100) == (["a"], None)
+
+
+def test_stale_count_matches_heap_and_rebuild_bounds_it():
+    queue = DueQueue()
+    cards = [f"c{i}" for i in range(100)]
+    for index, card_id in enumerate(cards):
+        queue.schedule("d", card_id, index)
+
+    rng = random.Random(7)
+    for step in range(2000):
+        card_id = rng.choice(cards)
+        if step % 10 == 0:
+            queue.remove(card_id)
+        else:
+            queue.schedule("d", card_id, rng.randrange(1000))
+        if step % 50 == 0:
+            queue.due("d", 5, now=500)
+        assert queue._stale.get("d", 0) == stale_in_heap(queue, "d")
+
+    live = len(queue._entries)
+    # Stale entries never outnumber live ones past the rebuild threshold
+    assert len(queue._heaps["d"]) <= max(2 * live + 1, 64)
+
+    # Equal due times come out in scheduling order
+    expected = sorted((due, seq, card_id) for card_id, (_, due, seq) in queue._entries.items())
+    card_ids, next_due = queue.due("d", live, now=1000)
+    assert card_ids == [card_id for _, _, card_id in expected]
+    assert next_due is None
+
+
+def test_card_due_timestamp():
+    assert card_due_timestamp({"due_at": "1970-01-02T00:00:00", "created_at": "1970-01-01T00:00:00"}) == \
+        card_due_timestamp({"created_at": "1970-01-02T00:00:00"})
+    assert card_due_timestamp({}) == 0.0
+    assert card_due_timestamp({"due_at": "not a date"}) == 0.0
@@ -0,0 +1,67 @@
+from db.near_duplicates import NUM_PERMUTATIONS, NearDuplicateIndex, minhash, shingles, similarity
+
+
+def test_shingles_normalize_case_punctuation_and_spacing():
+    assert shingles("What  is DNA?") == shingles("what is dna")
+    assert len(shingles("abcd")) == 2
+    # Short texts are padded to one shingle
+    assert shingles("Ab!") == shingles("ab")
+    assert len(shingles("")) == 1
+
+
+def test_signature_similarity():
+    signature = minhash("What is the powerhouse of the cell?")
+    assert len(signature) == NUM_PERMUTATIONS
+    assert minhash("what is the POWERHOUSE of the cell") == signature
+    assert similarity(signature, signature) == 1.0
+
+    left = tuple(range(NUM_PERMUTATIONS))
+    right = left[:NUM_PERMUTATIONS // 4] + tuple(-1 for _ in range(NUM_PERMUTATIONS * 3 // 4))
+    assert similarity(left, right) == 0.25
+
+
+def test_query_finds_rephrasings_within_the_deck_only():
+    index = NearDuplicateIndex()
+    index.add("d", "a", "What is the capital of France?")
+    index.add("d", "b", "Explain photosynthesis in plants")
+    index.add("other", "c", "What is the capital of France?")
+
+    assert index.query("d", "what is the capital of france") == [("a", 1.0)]
+    assert index.query("d", "What is the capital of France?", exclude="a") == []
+    assert index.query("d", "Describe the water cycle") == []
+    assert index.query("missing", "What is the capital of France?") == []
+
+
+def test_readding_replaces_the_old_signature():
+    index = NearDuplicateIndex()
+    index.add("d", "a", "What is the capital of France?")
+    index.add("d", "a", "Explain photosynthesis in plants")
+    assert index.query("d", "What is the capital of France?") == []
+    assert index.query("d", "Explain photosynthesis in plants") == [("a", 1.0)]
+
+    index.add("d2", "a", "Explain photosynthesis in plants")
+    assert index.query("d", "Explain photosynthesis in plants") == []
+    assert index.query("d2", "Explain photosynthesis in plants") == [("a", 1.0)]
+
+
+def test_remove_empties_the_deck_buckets():
+    index = NearDuplicateIndex()
+    index.add("d", "a", "What is the capital of France?")
+    index.remove("a")
+    index.remove("a")
+    assert index.query("d", "What is the capital of France?") == []
+    assert index._buckets == {}
+
+
+def test_clusters_group_duplicates_and_omit_singletons():
+    index = NearDuplicateIndex()
+    index.add("d", "a", "What is the capital of France?")
+    index.add("d", "b", "what is the capital of france")
+    index.add("d", "c", "WHAT IS THE CAPITAL OF FRANCE!")
+    index.add("d", "d", "Explain photosynthesis in plants")
+    index.add("d", "e", "Explain photosynthesis in plants.")
+    index.add("d", "f", "Describe the water cycle")
+    index.add("other", "g", "What is the capital of France?")
+
+    assert sorted(index.clusters("d")) == [["a", "b", "c"], ["d", "e"]]
+    assert index.clusters("other") == []
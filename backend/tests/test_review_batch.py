@@ -0,0 +1,75 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+# The Flask app reads its configuration at import time
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("HEALTH_CHECK_INTERVAL", "0")
+
+import app as flask_app  # noqa: E402
+
+T1 = 1700000000
+T2 = T1 + 3600
+
+
+@pytest.fixture
+def client():
+    flask_app.flashcards.clear()
+    flask_app.decks.clear()
+    flask_app.decks["d"] = {"id": "d", "name": "Deck"}
+    for card_id in ("a", "b"):
+        card = flask_app.make_card(f"Question {card_id}?", "basic", "d", {"answer": "answer", "explanation": ""})
+        card["id"] = card_id
+        flask_app.flashcards[card_id] = card
+    return flask_app.app.test_client()
+
+
+def test_events_apply_in_time_order(client):
+    # Sent newest first: the earlier lapse must be applied before the later success
+    response = client.post("/reviews:batch", json={"events": [
+        {"card_id": "a", "correct": True, "timestamp": T2},
+        {"card_id": "a", "correct": False, "timestamp": T1 * 1000},
+    ]})
+    assert response.status_code == 200
+    assert response.get_json()["applied"] == 2
+
+    card = flask_app.flashcards["a"]
+    # Lapse: 2.5 + 0.1 - 4 * (0.08 + 4 * 0.02) = 1.96; then quality 4 leaves the ease unchanged
+    assert card["ease_factor"] == 1.96
+    assert card["repetitions"] == 1
+    assert card["interval"] == 1
+    assert card["last_reviewed"] == datetime.fromtimestamp(T2).isoformat()
+    assert card["due_at"] == (datetime.fromtimestamp(T2) + timedelta(days=1)).isoformat()
+    assert (card["total_reviews"], card["correct_reviews"], card["accuracy"]) == (2, 1, 50)
+    assert flask_app.flashcards.stats.deck("d")["total_reviews"] == 2
+
+
+def test_score_event(client):
+    response = client.post("/reviews:batch", json={"events": [{"card_id": "b", "score": 1, "timestamp": T1}]})
+    assert response.status_code == 200
+    card = flask_app.flashcards["b"]
+    # Score 1 (easy) is SM-2 quality 5
+    assert (card["difficulty_score"], card["ease_factor"], card["repetitions"]) == (1, 2.6, 1)
+    assert not card.get("total_reviews")
+
+
+def test_invalid_event_rejects_the_whole_batch(client):
+    logged = len(flask_app.review_log)
+    before = dict(flask_app.flashcards["a"])
+    response = client.post("/reviews:batch", json={"events": [
+        {"card_id": "a", "correct": True, "timestamp": T1},
+        {"card_id": "missing", "correct": True},
+        {"card_id": "b"},
+        {"card_id": "b", "correct": True, "timestamp": "yesterday"},
+        "not an event",
+    ]})
+    assert response.status_code == 400
+    assert [error["index"] for error in response.get_json()["events"]] == [1, 2, 3, 4]
+    assert dict(flask_app.flashcards["a"]) == before
+    assert len(flask_app.review_log) == logged
+
+
+def test_body_must_hold_a_list(client):
+    assert client.post("/reviews:batch", json={"events": {}}).status_code == 400
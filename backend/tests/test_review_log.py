@@ -0,0 +1,104 @@
+import pytest
+
+from db.review_log import ReviewLog
+
+DAY = 86400
+# Monday 1970-03-16, the start of a week bucket
+D0 = 74 * DAY
+
+EVENTS = [
+    {"card_id": "a", "deck_id": "d", "reviewed_at": D0 + 3600, "correct": True, "score": None},
+    {"card_id": "a", "deck_id": "d", "reviewed_at": D0 + DAY + 3600, "correct": False, "score": None},
+    {"card_id": "a", "deck_id": "d", "reviewed_at": D0 + 8 * DAY + 3600, "correct": True, "score": None},
+    {"card_id": "b", "deck_id": "d", "reviewed_at": D0 + 3600, "correct": False, "score": None},
+    {"card_id": "b", "deck_id": "d", "reviewed_at": D0 + 2 * DAY + 3600, "correct": False, "score": None},
+    {"card_id": "b", "deck_id": "d", "reviewed_at": D0 + 2 * DAY + 7200, "correct": None, "score": 2},
+    {"card_id": "c", "deck_id": "d", "reviewed_at": D0 + 3600, "correct": None, "score": 3},
+    {"card_id": "x", "deck_id": "other", "reviewed_at": D0, "correct": True, "score": None},
+]
+
+
+@pytest.fixture
+def log():
+    log = ReviewLog()
+    log.append(EVENTS)
+    return log
+
+
+def test_totals(log):
+    analytics = log.deck_analytics("d")
+    assert len(log) == 8
+    # Score-only events are not reviews
+    assert (analytics["events"], analytics["reviews"], analytics["accuracy"]) == (7, 5, 40.0)
+
+
+def test_accuracy_over_time(log):
+    assert log.deck_analytics("d")["accuracy_over_time"] == [
+        {"start": "1970-03-16T00:00:00Z", "reviews": 2, "accuracy": 50.0},
+        {"start": "1970-03-17T00:00:00Z", "reviews": 1, "accuracy": 0.0},
+        {"start": "1970-03-18T00:00:00Z", "reviews": 1, "accuracy": 0.0},
+        {"start": "1970-03-24T00:00:00Z", "reviews": 1, "accuracy": 100.0},
+    ]
+    assert log.deck_analytics("d", bucket_seconds=7 * DAY)["accuracy_over_time"] == [
+        {"start": "1970-03-16T00:00:00Z", "reviews": 4, "accuracy": 25.0},
+        {"start": "1970-03-23T00:00:00Z", "reviews": 1, "accuracy": 100.0},
+    ]
+
+
+def test_retention_by_days_since_previous_review(log):
+    retention = {row["min_days"]: (row["max_days"], row["reviews"], row["retention"])
+                 for row in log.deck_analytics("d")["retention"]}
+    # a: 1 day then 7 days after its previous review; b: 2 days
+    assert retention[1] == (2, 1, 0.0)
+    assert retention[2] == (4, 1, 0.0)
+    assert retention[7] == (14, 1, 100.0)
+    assert retention[120] == (None, 0, 0.0)
+    assert sum(reviews for _, reviews, _ in retention.values()) == 3
+
+
+def test_difficulty(log):
+    difficulty = log.deck_analytics("d")["difficulty"]
+    cards = {row["min_accuracy"]: row["cards"] for row in difficulty["accuracy_histogram"]}
+    # a: 2 of 3 correct, b: 0 of 2, c: never graded
+    assert cards == {0.0: 1, 10.0: 0, 20.0: 0, 30.0: 0, 40.0: 0, 50.0: 0, 60.0: 1, 70.0: 0, 80.0: 0, 90.0: 0}
+    assert difficulty["scores"] == [{"score": 2, "events": 1}, {"score": 3, "events": 1}]
+
+
+def test_hardest_cards(log):
+    hardest = log.deck_analytics("d", min_reviews=2)["hardest_cards"]
+    assert [(row["card_id"], row["reviews"], row["correct_reviews"]) for row in hardest] == [("b", 2, 0), ("a", 3, 2)]
+    assert hardest[1]["accuracy"] == pytest.approx(200 / 3)
+    assert [row["card_id"] for row in log.deck_analytics("d", min_reviews=3)["hardest_cards"]] == ["a"]
+    assert log.deck_analytics("d", min_reviews=2, keep=lambda card_id: card_id != "b",
+                              limit=1)["hardest_cards"][0]["card_id"] == "a"
+
+
+def test_since_and_unknown_deck(log):
+    analytics = log.deck_analytics("d", since=D0 + 2 * DAY)
+    assert (analytics["events"], analytics["reviews"], analytics["accuracy"]) == (3, 2, 50.0)
+    empty = log.deck_analytics("missing")
+    assert (empty["events"], empty["reviews"], empty["accuracy_over_time"], empty["hardest_cards"]) == (0, 0, [], [])
+
+
+def test_replay_matches_the_live_log(tmp_path):
+    path = str(tmp_path / "review_log.bin")
+    # A backdated event neither gets a gap nor moves the card's last review
+    events = EVENTS + [{"card_id": "a", "deck_id": "d", "reviewed_at": D0 + 4 * DAY, "correct": True, "score": None}]
+    live = ReviewLog(path)
+    live.append(events[:4])
+    live.append(events[4:])
+    expected = live.deck_analytics("d")
+    live.close()
+
+    # A partial record left by a crash is dropped
+    with open(path, 'ab') as f:
+        f.write(b"\0\0\0")
+    replayed = ReviewLog(path)
+    assert len(replayed) == len(events)
+    assert replayed.deck_analytics("d") == expected
+
+    # The gap is still measured from the last in-order review, 31 days earlier
+    replayed.append([{"card_id": "a", "deck_id": "d", "reviewed_at": D0 + 39 * DAY + 3600, "correct": False}])
+    retention = {row["min_days"]: row["reviews"] for row in replayed.deck_analytics("d")["retention"]}
+    assert retention[30] == 1
+    replayed.close()
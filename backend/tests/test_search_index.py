@@ -0,0 +1,83 @@
+import math
+
+import pytest
+
+import db.search_index as search_index
+from db.search_index import SearchIndex, tokenize
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.add("d", "a", "Apple banana")
+    index.add("d", "b", "apple, apple; cherry")
+    index.add("d", "c", "Cherry")
+    return index
+
+
+def test_tokenize_lowercases_and_drops_stopwords():
+    assert tokenize("What is the Apple of my eye?") == ["apple", "my", "eye"]
+
+
+def test_bm25_scores(index):
+    # 3 documents, average length 2
+    banana_idf = math.log(1 + (3 - 1 + 0.5) / (1 + 0.5))
+    (card_id, score), = index.search("banana")
+    assert card_id == "a"
+    assert score == pytest.approx(banana_idf)
+
+    apple_idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+    results = index.search("what is an APPLE")
+    assert [card_id for card_id, _ in results] == ["b", "a"]
+    # b: tf 2, length 3 -> 2 * 2.2 / (2 + 1.2 * (0.25 + 0.75 * 1.5)); a: tf 1 at average length -> idf
+    assert results[0][1] == pytest.approx(apple_idf * 4.4 / 3.65)
+    assert results[1][1] == pytest.approx(apple_idf)
+
+
+def test_search_edge_cases(index):
+    assert index.search("the of") == []
+    assert index.search("durian") == []
+    assert SearchIndex().search("apple") == []
+    assert [card_id for card_id, _ in index.search("apple cherry", limit=1)] == ["b"]
+
+
+def test_deck_scope(index):
+    index.add("other", "x", "banana bread")
+    assert [card_id for card_id, _ in index.search("banana", deck_id="d")] == ["a"]
+    assert [card_id for card_id, _ in index.search("banana", deck_id="other")] == ["x"]
+    assert sorted(card_id for card_id, _ in index.search("banana")) == ["a", "x"]
+
+
+def test_readd_and_remove(index):
+    index.add("d", "a", "durian")
+    assert index.search("banana") == []
+    assert [card_id for card_id, _ in index.search("durian")] == ["a"]
+
+    index.remove("a")
+    index.remove("a")
+    assert index.search("durian") == []
+    assert len(index) == 2
+    assert "durian" not in index._df
+
+
+def test_unchanged_text_is_not_reindexed(index, monkeypatch):
+    index.dirty = False
+    monkeypatch.setattr(search_index, "tokenize", lambda text: pytest.fail("text was tokenized again"))
+    index.add("d", "a", "Apple banana")
+    assert index.dirty is False
+
+
+def test_restore_skips_tokenizing_unchanged_cards(index, tmp_path, monkeypatch):
+    path = str(tmp_path / "search_index.json")
+    index.save(path)
+    assert index.dirty is False
+
+    restored = SearchIndex()
+    restored.restore(path)
+    calls = []
+    monkeypatch.setattr(search_index, "tokenize", lambda text: calls.append(text) or tokenize(text))
+    restored.add("d", "a", "Apple banana")
+    restored.add("d", "b", "apple cherry")
+    restored.add("d", "c", "Cherry")
+    assert calls == ["apple cherry"]
+    assert [card_id for card_id, _ in restored.search("banana")] == ["a"]
@@ -87,42 +87,22 @@ function Dashboard() {
         console.log('Fetched decks:', data);  
         setDecks(data);
         
-        // Fetch cards for each deck to calculate overall stats
-        let totalCards = 0;
-        let totalReviews = 0;
-        let correctReviews = 0;
-        
-        for (const deck of data) {
-          const cardsResponse = await fetch(`${API_URL}/decks/${deck.id}/flashcards`);
-          if (cardsResponse.ok) {
-            const cards = await cardsResponse.json();
-            console.log(`Fetched cards for deck ${deck.id}:`, cards);
-            totalCards += cards.length;
-            
-            // Calculate accuracy from card stats
-            cards.forEach(card => {
-              console.log(`Card ${card.id} stats:`, {
-                total_reviews: card.total_reviews,
-                correct_reviews: card.correct_reviews
-              });
-              if (card.total_reviews) {
-                totalReviews += card.total_reviews;
-                correctReviews += card.correct_reviews || 0;
-              }
-            });
+        // Fetch aggregated totals in one request
+        const statsResponse = await fetch(`${API_URL}/stats`, {
+          method: 'GET',
+          headers: {
+            'Accept': 'application/json'
           }
-        }
-        
-        console.log('Final stats:', {
-          totalCards,
-          totalReviews,
-          correctReviews
         });
-        
-        // Calculate overall accuracy
-        const accuracy = totalReviews > 0 
-          ? Math.round((correctReviews / totalReviews) * 100) 
-          : 0;
+        if (!statsResponse.ok) {
+          throw new Error(`Failed to fetch stats: ${statsResponse.status} ${statsResponse.statusText}`);
+        }
+        const totals = await statsResponse.json();
+        console.log('Fetched stats:', totals);
+
+        const totalCards = totals.card_count;
+        const totalReviews = totals.total_reviews;
+        const accuracy = Math.round(totals.accuracy);
         
         // Update stats with real data
         const newStats = {
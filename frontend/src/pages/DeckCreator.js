@@ -238,36 +238,26 @@ function DeckCreator() {
 
       setSuccess('Saving deck...');
 
-      // Save all cards
-      const savePromises = cards.map(async card => {
-        try {
-          if (card.id) {
-            // Update existing card
-            const response = await fetch(`${API_URL}/flashcards/${card.id}`, {
-              method: 'PUT',
-              headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify(card)
-            });
-            if (!response.ok) throw new Error('Failed to update card');
-            return await response.json();
-          } else {
-            // Create new card
-            const response = await fetch(`${API_URL}/flashcards`, {
-              method: 'POST',
-              headers: { 'Content-Type': 'application/json' },
-              body: JSON.stringify({ ...card, deck_id: deckId })
-            });
-            if (!response.ok) throw new Error('Failed to create card');
-            return await response.json();
-          }
-        } catch (error) {
-          console.error('Error saving card:', error);
-          throw error;
-        }
+      // Save all cards in one batch request
+      const response = await fetch(`${API_URL}/decks/${deckId}/flashcards:batch`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          cards: cards.map(card => ({
+            id: card.id,
+            question: card.question,
+            type: card.type
+          }))
+        })
       });
-
-      // Wait for all cards to be saved
-      await Promise.all(savePromises);
+      if (!response.ok) throw new Error('Failed to save cards');
+      const result = await response.json();
+      if (result.failed > 0) {
+        const errors = result.results
+          .filter(item => item.error)
+          .map(item => item.error);
+        throw new Error(`${result.failed} card(s) could not be saved: ${errors.join(', ')}`);
+      }
       
       setSuccess('Deck saved successfully! Redirecting to review page...');
       
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import {
   Container,
@@ -13,6 +13,8 @@ import {
 } from '@mui/material';
 
 const API_URL = 'http://127.0.0.1:8000';
+const DUE_BATCH_SIZE = 50;
+const REVIEW_FLUSH_INTERVAL_MS = 5000;
 
 const renderQuestionContent = (currentCard) => {
   if (currentCard.type === 'fill_in_blank') {
@@ -78,6 +80,7 @@ function ReviewDeck() {
   const [isAnswerChecked, setIsAnswerChecked] = useState(false);
   const [feedback, setFeedback] = useState(null);
   const [canRetry, setCanRetry] = useState(false);
+  const pendingReviews = useRef([]);
 
   useEffect(() => {
     fetchCards();
@@ -100,27 +103,30 @@ function ReviewDeck() {
   const fetchCards = async () => {
     setLoading(true);
     try {
-      console.log('Fetching cards for deck:', deckId);
-      const response = await fetch(`${API_URL}/decks/${deckId}/flashcards`);
-      if (!response.ok) {
+      console.log('Fetching due cards for deck:', deckId);
+      const dueResponse = await fetch(`${API_URL}/decks/${deckId}/due?limit=${DUE_BATCH_SIZE}`);
+      if (!dueResponse.ok) {
         throw new Error('Failed to fetch cards');
       }
-      const data = await response.json();
+      let data = (await dueResponse.json()).cards;
+
+      // Nothing is due yet: fall back to studying the whole deck
+      if (data.length === 0) {
+        const response = await fetch(`${API_URL}/decks/${deckId}/flashcards`);
+        if (!response.ok) {
+          throw new Error('Failed to fetch cards');
+        }
+        data = await response.json();
+      }
       console.log('Fetched cards:', data);
 
       const validCards = data.filter(card => {
         if (!card || !card.question) return false;
         
-        // Process answer data
-        if (typeof card.answer === 'string') {
-          try {
-            card.parsedAnswer = JSON.parse(card.answer);
-          } catch (e) {
-            card.parsedAnswer = { answer: card.answer };
-          }
-        } else {
-          card.parsedAnswer = card.answer;
-        }
+        // Answers arrive structured; plain strings are wrapped for display
+        card.parsedAnswer = typeof card.answer === 'string'
+          ? { answer: card.answer }
+          : card.answer;
         
         console.log('Processed card:', {
           question: card.question,
@@ -158,38 +164,71 @@ function ReviewDeck() {
     if (currentCardIndex >= cards.length - 1) {
       const shouldReview = window.confirm('You have reached the end of the deck. Would you like to review these cards again?');
       if (shouldReview) {
-        // Reset to the beginning of the deck
+        // Reset to the beginning and load the next cards the scheduler says are due
         setCurrentCardIndex(0);
-        // Optionally shuffle the cards
-        const shuffledCards = [...cards].sort(() => Math.random() - 0.5);
-        setCards(shuffledCards);
+        flushReviews().then(fetchCards);
       }
     } else {
       setCurrentCardIndex(prev => prev + 1);
     }
   };
 
-  const handleDifficulty = async (score) => {
+  // Review events are buffered and sent in batches instead of one request per card
+  const flushReviews = async () => {
+    if (pendingReviews.current.length === 0) {
+      return;
+    }
+    const events = pendingReviews.current;
+    pendingReviews.current = [];
+    let response;
     try {
-      const response = await fetch(`${API_URL}/flashcards/${currentCard.id}/score`, {
+      response = await fetch(`${API_URL}/reviews:batch`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ score }),
+        body: JSON.stringify({ events }),
       });
+    } catch (error) {
+      console.error('Error saving reviews:', error);
+      // Network error: keep the events for the next flush
+      pendingReviews.current = events.concat(pendingReviews.current);
+      return;
+    }
 
-      if (!response.ok) {
-        throw new Error('Failed to update difficulty');
+    if (response.status >= 500) {
+      console.error('Error saving reviews: server returned', response.status);
+      pendingReviews.current = events.concat(pendingReviews.current);
+    } else if (!response.ok) {
+      // The batch was rejected as a whole; resending it would fail again, so
+      // drop the events the server named and retry the rest on the next flush
+      const data = await response.json().catch(() => ({}));
+      const rejected = new Set((data.events || []).map(item => item.index));
+      console.error('Dropping rejected review events:', data.events || data.error || response.status);
+      if (rejected.size > 0) {
+        const valid = events.filter((_, index) => !rejected.has(index));
+        pendingReviews.current = valid.concat(pendingReviews.current);
       }
-      
-      handleNextCard();
-    } catch (error) {
-      console.error('Error updating difficulty:', error);
-      setError('Failed to update difficulty: ' + error.message);
     }
   };
 
+  useEffect(() => {
+    const timer = setInterval(flushReviews, REVIEW_FLUSH_INTERVAL_MS);
+    return () => {
+      clearInterval(timer);
+      flushReviews();
+    };
+  }, []);
+
+  const handleDifficulty = (score) => {
+    pendingReviews.current.push({
+      card_id: currentCard.id,
+      score,
+      timestamp: Date.now(),
+    });
+    handleNextCard();
+  };
+
   const checkAnswer = () => {
     console.log('Checking answer:', { 
       selectedAnswer, 